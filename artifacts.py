@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACT_DIR = os.environ.get("HEARTMATE_ARTIFACT_DIR", os.path.join(BASE_DIR, "artifacts"))
+
+# Bump when the layout of the saved payload changes so old files are retrained
+FORMAT_VERSION = 2
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(data_path, params):
+    """Identifies one training run: dataset content + hyperparameters + payload format."""
+    key = json.dumps({"data": file_digest(data_path), "params": params, "format": FORMAT_VERSION},
+                     sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def save_atomic(payload, path):
+    """Writes via a temp file + rename so concurrent workers never read a half-written artifact."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    import joblib
+
+    try:
+        joblib.dump(payload, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def artifact_path(name, directory=ARTIFACT_DIR):
+    return os.path.join(directory, f"{name}.joblib")
+
+
+def load_saved(name, params, directory=ARTIFACT_DIR):
+    """Returns the state of the saved artifact, never training; raises ValueError if it was trained with other params."""
+    import joblib
+
+    payload = joblib.load(artifact_path(name, directory))
+    if payload.get("params") != params or payload.get("format") != FORMAT_VERSION:
+        raise ValueError(f"artifact '{name}' was saved with other parameters or format")
+    return payload["state"]
+
+
+def load_or_train(name, data_path, params, train_fn, directory=ARTIFACT_DIR):
+    """Returns the state saved for (data_path, params), calling train_fn() only when it is missing or stale.
+
+    train_fn must return a picklable object (typically a dict with the model
+    and scaler). A matching file size/mtime skips re-hashing the CSV, so a warm
+    start costs one stat() and one joblib.load().
+    """
+    import joblib  # imported here so modules that only need file_digest stay light
+
+    path = artifact_path(name, directory)
+    stat_key = _stat_key(data_path)
+    expected = None
+
+    if os.path.exists(path):
+        try:
+            payload = joblib.load(path)
+            if payload.get("params") == params and payload.get("format") == FORMAT_VERSION:
+                if payload.get("source_stat") == stat_key:
+                    return payload["state"]
+                expected = fingerprint(data_path, params)
+                if payload.get("fingerprint") == expected:
+                    # Same content, new mtime (e.g. a fresh checkout): remember the new stat
+                    payload["source_stat"] = stat_key
+                    save_atomic(payload, path)
+                    return payload["state"]
+            print(f"Artifact '{name}' is stale, retraining...")
+        except Exception as e:
+            print(f"Could not read artifact '{name}' ({e}), retraining...")
+
+    start = time.perf_counter()
+    state = train_fn()
+    payload = {
+        "fingerprint": expected or fingerprint(data_path, params),
+        "params": params,
+        "format": FORMAT_VERSION,
+        "source_stat": stat_key,
+        "train_seconds": round(time.perf_counter() - start, 3),
+        "state": state,
+    }
+    save_atomic(payload, path)
+    print(f"Artifact '{name}' trained in {payload['train_seconds']}s and saved to {path}")
+    return state
@@ -0,0 +1,156 @@
+"""ASGI entry point: the ai_app1 routes and ensemble engine behind an event loop.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8000 --workers 2
+
+Under gunicorn's sync workers a connection holds a whole worker process while
+the client sends its request and reads the response, so a few slow clients
+stall everyone else. Here uvicorn's event loop does all socket I/O: accepting,
+keep-alive, and slow uploads and downloads, for thousands of connections per
+process. A request reaches the Flask app only after its body has fully
+arrived. The app then runs in a bounded thread pool (HEARTMATE_ASGI_THREADS),
+and the loop writes the response back. The routes, templates, engine, cache
+and risk grid are exactly those of ai_app1.
+
+Requests waiting for a thread are capped at HEARTMATE_ASGI_BACKLOG; past it
+the loop answers 503 with Retry-After at once instead of queueing without
+bound. A body larger than HEARTMATE_ASGI_MAX_BODY bytes (whether announced by
+Content-Length or sent chunked) is answered with 413 as soon as it crosses
+the limit, so no client can make the loop buffer more than that.
+"""
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_app1 import app, create_app
+
+THREADS = int(os.environ.get("HEARTMATE_ASGI_THREADS", "4"))
+BACKLOG = int(os.environ.get("HEARTMATE_ASGI_BACKLOG", "1024"))
+# A MAX_BATCH_ROWS batch of JSON records is about 20 MB
+MAX_BODY = int(os.environ.get("HEARTMATE_ASGI_MAX_BODY", str(32 * 2**20)))
+
+
+def wsgi_environ(scope, body):
+    """The PEP 3333 environ of one ASGI http scope and its complete body."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name, value = name.decode("latin-1").upper().replace("-", "_"), value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    # The body is complete, whatever the client announced; a chunked request has no
+    # Content-Length header and Flask would otherwise read it as empty
+    environ["CONTENT_LENGTH"] = str(len(body))
+    environ.pop("HTTP_TRANSFER_ENCODING", None)
+    return environ
+
+
+def call_wsgi(wsgi_app, environ):
+    """Runs the WSGI app to completion; returns (status code, headers, body)."""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"], response["headers"] = int(status.split(" ", 1)[0]), headers
+
+    chunks = wsgi_app(environ, start_response)
+    try:
+        body = b"".join(chunks)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+    headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in response["headers"]]
+    return response["status"], headers, body
+
+
+class AsgiAdapter:
+    """Serves a WSGI app over ASGI, running each request in a bounded thread pool."""
+
+    def __init__(self, wsgi_app, startup=None, threads=THREADS, backlog=BACKLOG, max_body=MAX_BODY):
+        self.wsgi_app = wsgi_app
+        self.startup = startup
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="asgi")
+        self.backlog = backlog
+        self.max_body = max_body
+        self.pending = 0  # requests handed to the pool and not finished yet; only touched on the loop
+        self.rejected = 0
+        self.too_large = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    if self.startup is not None:
+                        await asyncio.get_running_loop().run_in_executor(self.executor, self.startup)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def http(self, scope, receive, send):
+        announced = dict(scope["headers"]).get(b"content-length", b"")
+        too_large = announced.isdigit() and int(announced) > self.max_body
+        body, size, more = [], 0, not too_large
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body:
+                too_large = True
+                break
+            body.append(chunk)
+            more = message.get("more_body", False)
+
+        if too_large:
+            self.too_large += 1
+            status, headers = 413, [(b"content-type", b"text/plain"), (b"connection", b"close")]
+            payload = f"request body over {self.max_body} bytes\n".encode()
+        elif self.pending >= self.backlog:
+            self.rejected += 1
+            status, headers, payload = 503, [(b"content-type", b"text/plain"), (b"retry-after", b"1")], b"busy\n"
+        else:
+            self.pending += 1
+            try:
+                status, headers, payload = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, call_wsgi, self.wsgi_app, wsgi_environ(scope, b"".join(body)))
+            finally:
+                self.pending -= 1
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": payload})
+
+
+application = AsgiAdapter(app, startup=create_app)
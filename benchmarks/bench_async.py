@@ -0,0 +1,143 @@
+"""Sync (gunicorn sync workers) vs async (uvicorn + asgi.py) under many keep-alive clients.
+
+Starts each server with the same number of processes, then opens --clients
+HTTP/1.1 connections that each POST /result forms drawn from the dataset,
+back to back on the same connection, for --seconds. A sync worker closes
+the connection after every response, so those clients reconnect (the
+connect time counts towards their latency). --slow adds clients that
+trickle their request a few bytes at a time, holding a connection the whole
+time, the way a client on a bad mobile link does.
+
+    python benchmarks/bench_async.py --clients 1000 --seconds 20
+    python benchmarks/bench_async.py --clients 200 --slow 4
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import time
+import urllib.parse
+
+from bench_workers import wait_until_up
+from common import ROOT, latency_summary, print_row, sample_records
+
+SERVERS = {
+    "sync": lambda port, procs: [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                                 "--log-level", "warning", "--backlog", "4096"],
+    "async": lambda port, procs: [sys.executable, "-m", "uvicorn", "asgi:application", "--port", str(port),
+                                  "--workers", str(procs), "--log-level", "warning", "--backlog", "4096"],
+}
+
+
+def form_requests(n, port):
+    requests = []
+    for r in sample_records(n):
+        body = urllib.parse.urlencode({
+            "age": int(r["age_years"]), "gender": int(r["gender"]), "hi": int(r["ap_hi"]), "lo": int(r["ap_lo"]),
+            "chol": int(r["cholesterol"]), "gluc": int(r["gluc"]), "active": int(r["active"]),
+            "height": int(r["height"]), "weight": r["weight"]}).encode()
+        head = (f"POST /result HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nConnection: keep-alive\r\n"
+                f"Content-Type: application/x-www-form-urlencoded\r\nContent-Length: {len(body)}\r\n\r\n")
+        requests.append(head.encode() + body)
+    return requests
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {k.strip().lower(): v.strip() for k, v in (line.split(":", 1) for line in lines[1:] if ":" in line)}
+    await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def client(port, requests, offset, deadline, stats):
+    reader = writer = None
+    i = offset
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                stats["connects"] += 1
+            writer.write(requests[i % len(requests)])
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError):
+            stats["errors"] += 1
+            writer = None
+            await asyncio.sleep(0.05)
+            continue
+        i += 1
+        stats["latencies"].append((time.perf_counter() - start) * 1000)
+        stats["status"][status] = stats["status"].get(status, 0) + 1
+        if not keep_alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def slow_client(port, request, deadline, delay=0.25):
+    """Sends one request a few bytes at a time, again and again, until the deadline."""
+    while time.perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            for pos in range(0, len(request), 8):
+                writer.write(request[pos:pos + 8])
+                await writer.drain()
+                await asyncio.sleep(delay)
+            await read_response(reader)
+            writer.close()
+        except (OSError, asyncio.IncompleteReadError):
+            await asyncio.sleep(0.05)
+
+
+async def run_load(port, n_clients, n_slow, seconds, requests):
+    stats = {"latencies": [], "status": {}, "errors": 0, "connects": 0}
+    deadline = time.perf_counter() + seconds
+    tasks = [client(port, requests, i * 7, deadline, stats) for i in range(n_clients)]
+    tasks += [slow_client(port, requests[0], deadline) for _ in range(n_slow)]
+    start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--slow", type=int, default=0, help="slow clients trickling their requests")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--procs", type=int, default=2, help="worker processes per server")
+    parser.add_argument("--servers", nargs="+", choices=list(SERVERS), default=list(SERVERS))
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    print(f"{args.clients} keep-alive clients, {args.slow} slow, {args.seconds}s, "
+          f"{args.procs} processes per server, {os.cpu_count()} core(s)")
+
+    for i, name in enumerate(args.servers):
+        port = 8780 + i
+        env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(args.procs), PYTHONWARNINGS="ignore")
+        proc = subprocess.Popen(SERVERS[name](port, args.procs), cwd=ROOT, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_up(f"http://127.0.0.1:{port}/", timeout=120)
+            stats = asyncio.run(run_load(port, args.clients, args.slow, args.seconds, form_requests(5000, port)))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+        done = len(stats["latencies"])
+        print(f"{name}: {done / stats['elapsed']:.0f} req/s, {stats['connects']} connections opened, "
+              f"{stats['errors']} errors, status {stats['status']}")
+        if done:
+            print_row(f"  {name} latency", latency_summary(stats["latencies"]))
+
+
+if __name__ == "__main__":
+    main()
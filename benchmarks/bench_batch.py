@@ -0,0 +1,52 @@
+"""Throughput (rows/second) of the batch scoring path and the /api/v1/predict/batch endpoint.
+
+    python benchmarks/bench_batch.py --rows 10000 --repeat 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from common import latency_summary, print_row, sample_records
+from ensemble import EnsembleEngine, records_to_columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    records = sample_records(args.rows)
+    engine = EnsembleEngine().load()
+    columns = records_to_columns(records)
+
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        engine.predict_batch(columns, args.rows)
+        samples.append((time.perf_counter() - start) * 1000)
+    summary = latency_summary(samples)
+    print_row(f"engine.predict_batch rows={args.rows}", summary)
+    print(f"{'':<32} throughput={args.rows / (summary['p50'] / 1000):,.0f} rows/s")
+
+    # Same roster through the HTTP endpoint, JSON and CSV bodies (includes encode/decode)
+    import ai_app1
+    client = ai_app1.create_app().test_client()
+    csv_body = "\n".join([",".join(records[0].keys())] +
+                         [",".join(str(v) for v in r.values()) for r in records])
+    for label, kwargs in (("json", {"json": records}),
+                          ("csv", {"data": csv_body, "content_type": "text/csv"})):
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            response = client.post("/api/v1/predict/batch", **kwargs)
+            samples.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.get_json()
+        summary = latency_summary(samples)
+        print_row(f"POST batch ({label}) rows={args.rows}", summary)
+        print(f"{'':<32} throughput={args.rows / (np.median(samples) / 1000):,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
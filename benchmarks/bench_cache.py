@@ -0,0 +1,78 @@
+"""Latency of EnsembleEngine.predict with and without the prediction cache.
+
+Replays a stream of form records in which a share of the submissions
+repeat an earlier one (refreshes, "Restart Analysis"). It reports the
+latency with no cache, with the per-process LRU, and with the LRU in front
+of a SharedCache whose table a second process (standing in for another
+gunicorn worker) filled beforehand.
+
+    python benchmarks/bench_cache.py --requests 5000 --repeat 0.6
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import latency_summary, print_row, sample_records
+from ensemble import EnsembleEngine
+from prediction_cache import PredictionCache, SharedCache
+
+
+def workload(n, repeat, seed=0):
+    """n records; each is, with probability repeat, a resubmission of an earlier one."""
+    rng = np.random.default_rng(seed)
+    fresh = iter(sample_records(n, seed=seed))
+    stream = []
+    for _ in range(n):
+        if stream and rng.random() < repeat:
+            stream.append(stream[rng.integers(len(stream))])
+        else:
+            stream.append(next(fresh))
+    return stream
+
+
+def replay(engine, stream):
+    samples = []
+    for record in stream:
+        start = time.perf_counter()
+        engine.predict(record)
+        samples.append((time.perf_counter() - start) * 1000)
+    return latency_summary(samples)
+
+
+def fill_shared(path, stream):
+    """Runs in another process: scores the stream once so the shared table holds its answers."""
+    engine = EnsembleEngine(cache=PredictionCache(shared=SharedCache(path))).load()
+    for record in stream:
+        engine.predict(record)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--repeat", type=float, default=0.6, help="share of resubmitted records")
+    args = parser.parse_args()
+
+    stream = workload(args.requests, args.repeat)
+    print(f"{args.requests} requests, {len({tuple(r.values()) for r in stream})} distinct records")
+
+    print_row("no cache", replay(EnsembleEngine().load(), stream))
+    engine = EnsembleEngine(cache=PredictionCache()).load()
+    print_row("process LRU", replay(engine, stream))
+    print(f"  {engine.cache.stats()}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "predictions.sqlite")
+        other = multiprocessing.get_context("spawn").Process(target=fill_shared, args=(path, stream))
+        other.start()
+        other.join()
+        engine = EnsembleEngine(cache=PredictionCache(shared=SharedCache(path))).load()
+        print_row("LRU + shared, filled elsewhere", replay(engine, stream))
+        print(f"  {engine.cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Loading cardio_train_cleaned.csv: pd.read_csv vs the columnar cache in dataset.py.
+
+Reports load time and private memory growth per load, and the size on disk.
+"Memory-mapped" loads return the moment the columns are mapped; the
+"+ touch" rows also read every value, which is what training or the
+dashboard aggregates actually do.
+
+    python benchmarks/bench_dataset.py
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import DATA_FILE
+from dataset import cache_path, ensure_cache, load_columns, load_frame
+from procinfo import memory_info
+
+
+def private_bytes():
+    info = memory_info()
+    return info.get("Private_Dirty", info["Rss"]) + info.get("Private_Clean", 0)
+
+
+def touch(columns):
+    """Reads every value of a DataFrame or a {column: array} dict."""
+    return sum(float(np.asarray(columns[name]).sum()) for name in columns)
+
+
+def measure(label, load, repeat=7):
+    times, grown = [], 0
+    for _ in range(repeat):
+        before = private_bytes()
+        start = time.perf_counter()
+        data = load()
+        times.append((time.perf_counter() - start) * 1000)
+        grown = max(grown, private_bytes() - before)
+        del data
+    print(f"{label:<36} load={np.median(times):8.2f}ms  private memory +{grown / 2**20:6.2f}MB")
+
+
+def main():
+    ensure_cache(DATA_FILE)
+    directory = cache_path(DATA_FILE)
+    cache_bytes = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+    print(f"CSV {os.path.getsize(DATA_FILE) / 2**20:.2f}MB, columnar cache {cache_bytes / 2**20:.2f}MB")
+
+    measure("pd.read_csv", lambda: pd.read_csv(DATA_FILE))
+    measure("load_columns (memory-mapped)", lambda: load_columns(DATA_FILE))
+    measure("load_columns (memory-mapped) + touch", lambda: touch(load_columns(DATA_FILE)))
+    measure("load_columns (copied)", lambda: load_columns(DATA_FILE, mmap=False))
+    measure("load_frame (read_csv dtypes)", lambda: load_frame(DATA_FILE))
+    measure("load_frame (compact dtypes)", lambda: load_frame(DATA_FILE, compact=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Per-request latency of the ai_app1 ensemble, single-threaded and under concurrent load.
+
+    python benchmarks/bench_ensemble.py --requests 5000 --threads 8
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import latency_summary, print_row, sample_records
+from ensemble import EnsembleEngine
+
+
+def run(engine, records, threads):
+    def one(record):
+        start = time.perf_counter()
+        engine.predict(record)
+        return (time.perf_counter() - start) * 1000
+
+    wall = time.perf_counter()
+    if threads == 1:
+        samples = [one(r) for r in records]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            samples = list(pool.map(one, records))
+    wall = time.perf_counter() - wall
+    return samples, len(records) / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    engine = EnsembleEngine().load()
+    print(f"Models loaded: {', '.join(engine.model_ids)}")
+    records = sample_records(args.requests)
+    run(engine, records[:200], 1)  # warm-up
+
+    for threads in sorted({1, args.threads}):
+        samples, rps = run(engine, records, threads)
+        print_row(f"ensemble threads={threads}", latency_summary(samples))
+        print(f"{'':<32} throughput={rps:,.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""KNN latency against training set size: KD-tree index vs brute force, single rows and batches.
+
+The cleaned dataset itself comes first, searched by category group as well
+(knn_index.build_groups). The other training sets are synthetic: dataset
+rows resampled with a little gaussian noise in scaled space, which leaves no
+categories to group by.
+
+    python benchmarks/bench_knn.py --sizes 10000 55000 200000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from common import latency_summary, print_row
+from compiled_models import KNNModel, export_knn
+from dataset import load_frame
+from ensemble import FEATURE_COLUMNS
+
+
+def scaled_dataset():
+    df = load_frame()
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    X = (X - X.mean(axis=0)) / X.std(axis=0)
+    return X, df["cardio"].to_numpy() == 1
+
+
+def synthetic(X, y, n, rng):
+    idx = rng.integers(0, len(X), size=n)
+    return X[idx] + rng.normal(scale=0.05, size=(n, X.shape[1])), y[idx]
+
+
+def per_row(fn, queries):
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q[None, :])
+        samples.append((time.perf_counter() - start) * 1000)
+    return latency_summary(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 55000, 200000, 1000000])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--batch", type=int, default=10000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X, y = scaled_dataset()
+    queries = X[rng.integers(0, len(X), size=args.queries)]
+    batch = X[rng.integers(0, len(X), size=args.batch)]
+
+    model = KNNModel(*export_knn(X, y, n_neighbors=5))
+    print(f"cardio dataset n={len(X):,}, {len(model.arrays['group_start']) - 1} category groups")
+    print_row("  single row, by category group", per_row(model.predict_proba_grouped, queries))
+    print_row("  single row, brute force", per_row(model.predict_proba_brute, queries))
+    for name, fn in (("by category group", model.predict_proba_grouped),
+                     ("blocked brute force", model.predict_proba_brute)):
+        start = time.perf_counter()
+        fn(batch)
+        elapsed = time.perf_counter() - start
+        print(f"  batch of {args.batch:,}, {name}: {elapsed * 1000:.1f}ms ({args.batch / elapsed:,.0f} rows/s)")
+
+    for n in args.sizes:
+        fit_X, fit_y = synthetic(X, y, n, rng)
+        start = time.perf_counter()
+        model = KNNModel(*export_knn(fit_X, fit_y, n_neighbors=5))
+        build_s = time.perf_counter() - start
+        print(f"n={n:,}  index build {build_s:.2f}s, depth {model.meta['depth']}")
+        print_row("  single row, KD-tree", per_row(model.predict_proba_tree, queries))
+        print_row("  single row, brute force", per_row(model.predict_proba_brute, queries))
+        print_row("  single row, KD-tree max_leaves=8",
+                  per_row(lambda q: model.predict_proba_tree(q, max_leaves=8), queries))
+
+        start = time.perf_counter()
+        model.predict_proba_brute(batch)
+        elapsed = time.perf_counter() - start
+        print(f"  batch of {args.batch:,}, blocked brute force: {elapsed * 1000:.1f}ms "
+              f"({args.batch / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Throughput vs tail latency of EnsembleEngine.predict with and without micro-batching.
+
+Each of --threads threads scores dataset records back to back (a closed loop,
+like request threads under peak load) for --seconds. The prediction cache is
+off, so every call reaches the models.
+
+    python benchmarks/bench_microbatch.py --threads 1 8 32 64 --waits 0 1 2 5
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from common import latency_summary, sample_records
+from ensemble import EnsembleEngine, feature_row
+from microbatch import MicroBatcher
+
+
+def closed_loop(engine, records, n_threads, seconds):
+    latencies = [[] for _ in range(n_threads)]
+    deadline = time.perf_counter() + seconds
+
+    def worker(t):
+        i = t * 97
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            engine.predict(records[i % len(records)])
+            latencies[t].append((time.perf_counter() - start) * 1000)
+            i += 1
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    samples = [ms for per_thread in latencies for ms in per_thread]
+    return len(samples) / (time.perf_counter() - start), latency_summary(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--waits", type=float, nargs="+", default=[0, 1, 2, 5], help="batch windows (ms)")
+    parser.add_argument("--rows", type=int, default=64, help="rows per batch at most")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    records = sample_records(5000)
+    engine = EnsembleEngine().load()
+
+    # Batching must not change the answers
+    batched = engine.predict_proba(np.vstack([feature_row(r) for r in records[:256]]))
+    single = np.hstack([engine.predict_proba(feature_row(r)) for r in records[:256]])
+    print(f"max |batched - single| over 256 rows: {np.abs(batched - single).max():.3g}")
+
+    print(f"{'threads':>7} {'mode':<14} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'mean batch':>10}")
+    for n_threads in args.threads:
+        engine.batcher = None
+        rate, lat = closed_loop(engine, records, n_threads, args.seconds)
+        print(f"{n_threads:>7} {'unbatched':<14} {rate:>8.0f} {lat['p50']:>8.3f} {lat['p99']:>8.3f} {'-':>10}")
+        for wait in args.waits:
+            engine.batcher = MicroBatcher(engine, args.rows, wait)
+            rate, lat = closed_loop(engine, records, n_threads, args.seconds)
+            sizes = engine.batcher.batch_size.snapshot()
+            mean = sizes["sum"] / sizes["count"] if sizes["count"] else 0
+            print(f"{n_threads:>7} {f'batch {wait:g}ms':<14} {rate:>8.0f} {lat['p50']:>8.3f} {lat['p99']:>8.3f} {mean:>10.1f}")
+    engine.batcher = None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Load time and private memory: joblib pickles vs memory-mapped model bundles.
+
+Uses the shipped decision tree and a KNN fitted on the cleaned dataset (the
+largest artifact: the whole training matrix), written to a temp directory in
+both formats.
+
+    python benchmarks/bench_model_load.py
+"""
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+from common import ROOT
+from compiled_models import export_model, load_compiled
+from dataset import load_frame
+from ensemble import FEATURE_COLUMNS
+from model_store import save_bundle
+from procinfo import memory_info
+
+
+def private_bytes():
+    info = memory_info()
+    return info.get("Private_Dirty", info["Rss"]) + info.get("Private_Clean", 0)
+
+
+def measure(label, load, repeat=5):
+    times, grown = [], 0
+    for _ in range(repeat):
+        before = private_bytes()
+        start = time.perf_counter()
+        model = load()
+        times.append((time.perf_counter() - start) * 1000)
+        grown = max(grown, private_bytes() - before)
+        del model
+    print(f"{label:<28} load={np.median(times):8.3f}ms  private memory +{grown / 2**20:6.2f}MB")
+
+
+def main():
+    from sklearn.neighbors import KNeighborsClassifier
+
+    df = load_frame()
+    knn = KNeighborsClassifier(n_neighbors=5).fit(df[FEATURE_COLUMNS].to_numpy(), df["cardio"].to_numpy())
+    dt = joblib.load(os.path.join(ROOT, "cardio_dt_model.pkl"))
+    scaler = joblib.load(os.path.join(ROOT, "dt_scaler.pkl"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, estimator in (("dt", dt), ("knn", knn)):
+            pickle_path = os.path.join(tmp, f"{name}.pkl")
+            joblib.dump(estimator, pickle_path)
+            arrays, meta = export_model(estimator, scaler if name == "dt" else None)
+            save_bundle(os.path.join(tmp, name), arrays, meta)
+
+            measure(f"{name} joblib.load", lambda: joblib.load(pickle_path))
+            measure(f"{name} bundle (mmap)", lambda: load_compiled(os.path.join(tmp, name)))
+            measure(f"{name} bundle (copy)", lambda: load_compiled(os.path.join(tmp, name), mmap=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""ModelManager.predict (NumPy fast path) against predict_frame (pandas path) in qwe and temp_cardio_whole_app.
+
+    python benchmarks/bench_model_manager.py --calls 5000
+"""
+import argparse
+import importlib
+import time
+
+from common import latency_summary, print_row, sample_records
+
+
+def form_payload(record):
+    data = dict(record)
+    data["BMI"] = data["weight"] / ((data["height"] / 100) ** 2)
+    data["pulse_pressure"] = data["ap_hi"] - data["ap_lo"]
+    return data
+
+
+def time_calls(fn, payloads):
+    samples = []
+    for payload in payloads:
+        start = time.perf_counter()
+        fn(payload)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--apps", nargs="+", default=["qwe", "temp_cardio_whole_app"])
+    args = parser.parse_args()
+
+    payloads = [form_payload(r) for r in sample_records(args.calls)]
+    for name in args.apps:
+        manager = importlib.import_module(name).manager
+        worst = max(abs(manager.predict(p) - manager.predict_frame(p)) for p in payloads[:500])
+        print(f"{name}: max |fast - pandas| over 500 rows = {worst:.2e}")
+
+        frame = latency_summary(time_calls(manager.predict_frame, payloads))
+        fast = latency_summary(time_calls(manager.predict, payloads))
+        print_row(f"{name} predict_frame", frame)
+        print_row(f"{name} predict", fast)
+        print(f"{'':<32} speed-up at p50: {frame['p50'] / fast['p50']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
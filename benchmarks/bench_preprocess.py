@@ -0,0 +1,97 @@
+"""Time and peak memory of preprocess.py vs the notebook's whole-file pandas code.
+
+Builds synthetic raw exports of --scales times the rows of cardio_train.csv:
+the raw rows are resampled, about 1% are repeated as duplicates, and the
+rest get a random shift of age (in days) and weight so the rows stay
+distinct. Each pipeline then runs in a fresh subprocess, and the peak
+resident memory of that subprocess is reported.
+
+    python benchmarks/bench_preprocess.py --scales 1 10 100
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from common import ROOT
+
+RAW_FILE = os.path.join(ROOT, "cardio_train.csv")
+
+NOTEBOOK = """
+import sys, pandas as pd
+df = pd.read_csv(sys.argv[1], sep=';')
+df = df.drop(columns=['id'])
+df.drop_duplicates(inplace=True)
+df['age_years'] = (df['age'] / 365).astype(int)
+df.drop(columns=['age'], inplace=True)
+df.fillna(df.mean(numeric_only=True), inplace=True)
+df = df[df['ap_lo'] <= df['ap_hi']]
+df['BMI'] = df['weight'] / ((df['height']/100) ** 2)
+df['pulse_pressure'] = df['ap_hi'] - df['ap_lo']
+df.to_csv(sys.argv[2], index=False)
+"""
+STREAMING = "import sys; sys.path.insert(0, %r); import preprocess; preprocess.preprocess(sys.argv[1], sys.argv[2])" % ROOT
+
+
+def synthetic_export(path, scale, seed=0):
+    raw = pd.read_csv(RAW_FILE, sep=";")
+    rng = np.random.default_rng(seed)
+    next_id = 0
+    with open(path, "w", newline="") as out:
+        for block in range(scale):
+            rows = raw.sample(n=len(raw), replace=True, random_state=seed + block).reset_index(drop=True)
+            if block:
+                fresh = rng.random(len(rows)) > 0.01
+                rows.loc[fresh, "age"] += rng.integers(-180, 180, size=int(fresh.sum()))
+                rows.loc[fresh, "weight"] = (rows.loc[fresh, "weight"]
+                                             + rng.integers(-50, 50, size=int(fresh.sum())) / 10).round(1)
+            rows["id"] = np.arange(next_id, next_id + len(rows))
+            next_id += len(rows)
+            rows.to_csv(out, sep=";", index=False, header=block == 0)
+
+
+def run(code, raw_path, out_path):
+    """Runs code in a fresh interpreter; returns (seconds, peak RSS in MB)."""
+    script = ("import resource, sys, time; _t = time.perf_counter()\n" + code +
+              "\nprint(time.perf_counter() - _t, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)")
+    proc = subprocess.run([sys.executable, "-W", "ignore", "-c", script, raw_path, out_path],
+                          capture_output=True, text=True, check=True)
+    seconds, max_rss_kb = proc.stdout.split()[-2:]
+    return float(seconds), int(max_rss_kb) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--skip-notebook-above", type=int, default=100,
+                        help="do not run the whole-file version on larger scales")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            raw_path = os.path.join(tmp, f"raw_{scale}.csv")
+            if scale == 1:
+                raw_path = RAW_FILE
+            else:
+                synthetic_export(raw_path, scale)
+            size = os.path.getsize(raw_path) / 2**20
+            print(f"{scale}x: {size:,.0f}MB raw export")
+
+            stream_out, notebook_out = os.path.join(tmp, "stream.csv"), os.path.join(tmp, "notebook.csv")
+            seconds, peak = run(STREAMING, raw_path, stream_out)
+            print(f"  streaming preprocess.py   {seconds:8.2f}s  peak RSS {peak:8.1f}MB")
+            if scale <= args.skip_notebook_above:
+                seconds, peak = run(NOTEBOOK, raw_path, notebook_out)
+                with open(stream_out, "rb") as a, open(notebook_out, "rb") as b:
+                    same = a.read() == b.read()
+                print(f"  notebook (whole file)     {seconds:8.2f}s  peak RSS {peak:8.1f}MB  identical output: {same}")
+            if raw_path != RAW_FILE:
+                os.remove(raw_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Cost of a hot model reload (hot_reload.py) while requests keep coming.
+
+Request threads score dataset records back to back (cache off) for --seconds,
+once without reloads and once while the models are reloaded every --every
+seconds. Reports request latency for both runs, failed requests (there should
+be none), and per reload the build, validation and swap times and the
+resident memory held while the old and new models coexisted.
+
+    python benchmarks/bench_reload.py --threads 1 8 --seconds 10 --every 1
+    python benchmarks/bench_reload.py --pickles   # sklearn pickles instead of compiled bundles
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from common import ROOT, latency_summary, print_row, sample_records
+from ensemble import EnsembleEngine, feature_matrix, records_to_columns
+from hot_reload import Reloader
+from warmup import WARMUP_ROWS, synthetic_records
+
+
+def run(engine, records, n_threads, seconds, reloader=None, every=1.0):
+    latencies = [[] for _ in range(n_threads)]
+    errors = []
+    reports = []
+    stop = threading.Event()
+
+    def worker(t):
+        i = t * 97
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                engine.predict(records[i % len(records)], use_cache=False)
+            except Exception as e:
+                errors.append(e)
+            latencies[t].append((time.perf_counter() - start) * 1000)
+            i += 1
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        time.sleep(min(every, max(0.0, deadline - time.perf_counter())))
+        if reloader is not None and time.perf_counter() < deadline:
+            reports.append(reloader.reload("benchmark"))
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latency_summary([ms for per_thread in latencies for ms in per_thread]), errors, reports
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--every", type=float, default=1.0, help="seconds between reloads")
+    parser.add_argument("--pickles", action="store_true", help="load the sklearn pickles, not compiled/")
+    args = parser.parse_args()
+
+    compiled_dir = os.path.join(ROOT, "no-compiled-bundles") if args.pickles else os.path.join(ROOT, "compiled")
+    engine = EnsembleEngine(compiled_dir=compiled_dir).load()
+    synthetic = synthetic_records(WARMUP_ROWS)
+    X = feature_matrix(records_to_columns(synthetic), len(synthetic))
+    reloader = Reloader(engine.registry, engine.build_model_set, lambda model_set: engine.validate(model_set, X),
+                        engine.artifact_paths)
+    records = sample_records(5000)
+    print(f"models: {engine.model_ids} ({', '.join(sorted(set(engine.sources.values())))})")
+
+    for n_threads in args.threads:
+        baseline, errors, _ = run(engine, records, n_threads, args.seconds)
+        print_row(f"{n_threads} threads, no reload", baseline)
+        during, reload_errors, reports = run(engine, records, n_threads, args.seconds, reloader, args.every)
+        print_row(f"{n_threads} threads, reloading", during)
+        ok = [r for r in reports if r["ok"]]
+        print(f"  failed requests: {len(errors)} without reloads, {len(reload_errors)} with; "
+              f"reloads: {len(ok)} of {len(reports)} ok")
+        if ok:
+            def mean(key):
+                return float(np.mean([r[key] for r in ok]))
+            print(f"  build {mean('build_seconds') * 1000:.1f}ms  check {mean('check_seconds') * 1000:.1f}ms  "
+                  f"swap {mean('swap_seconds') * 1e6:.2f}us (max {max(r['swap_seconds'] for r in ok) * 1e6:.2f}us)")
+            print(f"  overlap {mean('overlap_bytes') / 2**20:.2f}MB (max {max(r['overlap_bytes'] for r in ok) / 2**20:.2f}MB)  "
+                  f"rss after - before {float(np.mean([r['rss_after'] - r['rss_before'] for r in ok])) / 2**20:.2f}MB")
+
+
+if __name__ == "__main__":
+    main()
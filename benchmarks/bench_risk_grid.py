@@ -0,0 +1,86 @@
+"""Risk-grid lookups vs the live ensemble: latency and agreement.
+
+Uses artifacts/risk_grid/ when it is current; otherwise builds a table for a
+few ages into a temp folder first (the full table takes a while, see
+risk_grid.py). Records are drawn from the cleaned dataset and moved onto the
+table's ages and form defaults, so every one of them is on the grid.
+
+    python benchmarks/bench_risk_grid.py --records 2000
+    python benchmarks/bench_risk_grid.py --ages 50 5    # temp table for ages 50-54
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from common import latency_summary, print_row, sample_records
+from ensemble import EnsembleEngine, majority_vote
+from model_store import load_bundle, read_meta
+from risk_grid import AXES, GRID_DIR, RiskGrid, build
+
+
+def compare(grid, engine, records):
+    timings, live_probs, grid_probs = [], [], []
+    for record in records:
+        start = time.perf_counter()
+        probs = grid.lookup(record)
+        timings.append((time.perf_counter() - start) * 1000)
+        grid_probs.append(probs[:, 0])
+        live_probs.append(engine.predict(record)["probs"].values())
+    live, approx = np.array([list(p) for p in live_probs]).T, np.array(grid_probs).T
+    labels_live, _, score_live = majority_vote(live)
+    labels_grid, _, score_grid = majority_vote(approx)
+    return latency_summary(timings), {
+        "score_mae": round(float(np.abs(score_live - score_grid).mean() * 100), 3),
+        "score_max_error": round(float(np.abs(score_live - score_grid).max() * 100), 3),
+        "label_agreement": round(float((labels_live == labels_grid).mean()), 4),
+        "model_vote_agreement": round(float(((live > 0.5) == (approx > 0.5)).mean()), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--ages", type=int, nargs=2, metavar=("FIRST", "COUNT"), default=(50, 5),
+                        help="ages of the temp table when artifacts/risk_grid is missing or stale")
+    args = parser.parse_args()
+
+    engine = EnsembleEngine().load()
+    directory = GRID_DIR
+    meta = read_meta(GRID_DIR)
+    tmp = None
+    if meta is None or meta["model_version"] != engine.version:
+        tmp = tempfile.TemporaryDirectory()
+        axes = dict(AXES, age_years=(args.ages[0], 1, args.ages[1]))
+        directory = build(engine, f"{tmp.name}/risk_grid", axes)
+        print(f"Built a temp table for ages {args.ages[0]}-{sum(args.ages) - 1} "
+              f"in {read_meta(directory)['build_seconds']}s")
+    arrays, meta = load_bundle(directory)
+    first, _, n_ages = meta["axes"]["age_years"]
+
+    rng = np.random.default_rng(0)
+    records = []
+    for record in sample_records(args.records * 2):
+        record = dict(record, smoke=0, alco=0, age_years=int(rng.integers(first, first + n_ages)))
+        if RiskGrid(arrays, meta, "nearest").lookup(record) is not None:
+            records.append(record)
+    records = records[:args.records]
+    print(f"{len(records)} on-grid records")
+
+    live = []
+    for record in records:
+        start = time.perf_counter()
+        engine.predict(record)
+        live.append((time.perf_counter() - start) * 1000)
+    print_row("live ensemble", latency_summary(live))
+    for mode in ("nearest", "interpolate"):
+        timings, agreement = compare(RiskGrid(arrays, meta, mode), engine, records)
+        print_row(f"grid {mode}", timings)
+        print(f"  {agreement}")
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Requests per second for each ai_app1 page.
+
+By default requests go through Flask's test client in this process, so
+the number covers routing, rendering and response building but not the
+network. With --url, persistent HTTP connections are opened against a
+running server (e.g. gunicorn -c gunicorn.conf.py) from --threads threads.
+
+    python benchmarks/bench_routes.py
+    python benchmarks/bench_routes.py --url http://127.0.0.1:8000 --threads 16 --seconds 5
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+import common  # noqa: F401  (puts the repository root on sys.path)
+
+RESULT_FORM = {"age": "55", "gender": "1", "hi": "140", "lo": "90", "chol": "2", "gluc": "1",
+               "active": "1", "height": "165", "weight": "80"}
+ROUTES = [("GET", "/"), ("GET", "/predict"), ("GET", "/models"), ("GET", "/about"),
+          ("GET", "/dashboard"), ("POST", "/result")]
+
+
+def in_process(method, path, seconds, revalidate):
+    from ai_app1 import create_app
+
+    client = create_app().test_client()
+    headers = {}
+    if revalidate:
+        etag = client.get(path).headers.get("ETag")
+        if etag is None:
+            return None
+        headers["If-None-Match"] = etag
+
+    count, status = 0, None
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        if method == "POST":
+            response = client.post(path, data=RESULT_FORM)
+        else:
+            response = client.get(path, headers=headers)
+        status = response.status_code
+        count += 1
+    return count / (time.perf_counter() - start), status
+
+
+def over_http(url, method, path, seconds, threads, revalidate):
+    parts = urlsplit(url)
+    body = urlencode(RESULT_FORM) if method == "POST" else None
+    headers = {"Content-Type": "application/x-www-form-urlencoded"} if body else {}
+    if revalidate:
+        conn = http.client.HTTPConnection(parts.hostname, parts.port)
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        etag = response.getheader("ETag")
+        conn.close()
+        if etag is None:
+            return None
+        headers["If-None-Match"] = etag
+
+    counts, statuses = [0] * threads, set()
+    deadline = time.perf_counter() + seconds
+
+    def worker(i):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port)
+        while time.perf_counter() < deadline:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            statuses.add(response.status)
+            counts[i] += 1
+        conn.close()
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return sum(counts) / (time.perf_counter() - start), ",".join(map(str, sorted(statuses)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process test client")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent connections with --url")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent on each route")
+    args = parser.parse_args()
+
+    for method, path in ROUTES:
+        for revalidate in (False, True):
+            if revalidate and method == "POST":
+                continue
+            if args.url:
+                measured = over_http(args.url, method, path, args.seconds, args.threads, revalidate)
+            else:
+                measured = in_process(method, path, args.seconds, revalidate)
+            if measured is None:
+                continue  # no ETag on this route
+            rate, status = measured
+            label = f"{method} {path}" + (" (If-None-Match)" if revalidate else "")
+            print(f"{label:<32} {rate:10,.0f} req/s  status={status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Cold-start time of a worker: python -X importtime of the app plus model loading.
+
+Each run is a fresh interpreter, so nothing is cached in-process (the OS file
+cache stays warm, which is what a worker restart sees too).
+
+    python benchmarks/bench_startup.py                      # ai_app1:create_app()
+    python benchmarks/bench_startup.py --target ai_app1:app --runs 10
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+from common import ROOT, latency_summary, print_row
+
+# Modules serving should not need; reported when a target imports them
+HEAVY = ("sklearn", "scipy", "pandas", "joblib", "matplotlib")
+IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def statement(target):
+    module, _, attr = target.partition(":")
+    code = f"import {module}"
+    if attr:
+        code += f"; {module}.{attr}"
+    return code + "; import sys; print(','.join(sorted(sys.modules)))"
+
+
+def cold_start(target):
+    """Runs target once in a fresh interpreter; returns (wall ms, {module: cumulative us}, modules).
+
+    The per-module times cover what the target imports directly (the
+    second level of the importtime tree), each including its own imports.
+    """
+    wrapper = ("import time; _t = time.perf_counter(); " + statement(target)
+               + "; print((time.perf_counter() - _t) * 1000)")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-W", "ignore", "-c", wrapper],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    modules, wall = proc.stdout.strip().splitlines()[-2:]
+    cumulative = {}
+    for match in IMPORTTIME.finditer(proc.stderr):
+        _, cum_us, indent, name = match.groups()
+        if len(indent) == 3:  # importtime indents two spaces per level below the target
+            cumulative[name] = int(cum_us)
+    return float(wall), cumulative, set(modules.split(","))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="ai_app1:create_app()",
+                        help="module or module:expression to start, as gunicorn would")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest direct imports to list")
+    args = parser.parse_args()
+
+    samples, cumulative, modules = [], {}, set()
+    for _ in range(args.runs):
+        wall, cumulative, modules = cold_start(args.target)
+        samples.append(wall)
+
+    print_row(f"cold start {args.target}", latency_summary(samples))
+    print(f"{len(modules)} modules loaded; heavy: "
+          f"{', '.join(m for m in HEAVY if m in modules) or 'none'}")
+    print("Slowest imports made by the target (last run, cumulative):")
+    for name, us in sorted(cumulative.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<40} {us / 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
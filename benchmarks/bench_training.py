@@ -0,0 +1,39 @@
+"""Wall-clock time of train_models.py for several pool sizes.
+
+Each run writes into a temporary folder, so the model files in the repo are
+left alone. "task" is the summed time of every fit and fold; wall/task
+shows how much of it the pool overlapped. The search runs (the notebooks'
+grids, 90 random-forest fits alone) are the ones that scale with cores; the
+fixed-parameter runs are bounded by the random forest's single fit.
+
+    python benchmarks/bench_training.py --workers 1 2 4 8
+    python benchmarks/bench_training.py --search --models svm knn dt
+"""
+import argparse
+import os
+import tempfile
+
+import common  # noqa: F401  (puts the repo root on sys.path)
+from train_models import MODEL_SPECS, train_all
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--search", action="store_true", help="run the notebooks' grid searches")
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_SPECS))
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} core(s); search={args.search}")
+    baseline = None
+    for n_workers in args.workers:
+        with tempfile.TemporaryDirectory() as out:
+            manifest = train_all(out, n_workers, args.search, args.models)
+        wall, task = manifest["wall_seconds"], manifest["task_seconds"]
+        baseline = baseline or wall
+        print(f"workers={n_workers:<3} wall {wall:8.2f}s  task {task:8.2f}s  "
+              f"overlap {task / wall:5.2f}x  speedup vs first {baseline / wall:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
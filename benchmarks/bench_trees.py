@@ -0,0 +1,85 @@
+"""Compiled tree evaluators vs sklearn predict_proba: single-row and 10k-row latency.
+
+Uses the shipped decision tree, and the tuned random forest if
+cardio_rf_tuned_model.pkl exists; otherwise a forest is fitted with the
+first configuration in rendom_forest.ipynb (100 trees, entropy, max_depth=10).
+Also checks that both give identical probabilities.
+
+    python benchmarks/bench_trees.py
+"""
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+
+from common import ROOT, latency_summary, print_row
+from compiled_models import TreeModel, export_model
+from dataset import load_frame
+from ensemble import FEATURE_COLUMNS
+
+
+def load_forest(df):
+    path = os.path.join(ROOT, "cardio_rf_tuned_model.pkl")
+    if os.path.exists(path):
+        return joblib.load(path), joblib.load(os.path.join(ROOT, "rf_scaler.pkl"))
+
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    X_train, _, y_train, _ = train_test_split(df[FEATURE_COLUMNS], df["cardio"], test_size=0.2, random_state=0)
+    scaler = StandardScaler().fit(X_train.to_numpy())
+    forest = RandomForestClassifier(n_estimators=100, criterion="entropy", max_depth=10, random_state=0)
+    return forest.fit(scaler.transform(X_train.to_numpy()), y_train.to_numpy()), scaler
+
+
+def per_row(fn, rows):
+    samples = []
+    for row in rows:
+        start = time.perf_counter()
+        fn(row[None, :])
+        samples.append((time.perf_counter() - start) * 1000)
+    return latency_summary(samples)
+
+
+def batch(fn, X, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        samples.append((time.perf_counter() - start) * 1000)
+    return latency_summary(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500, help="single-row requests to time")
+    parser.add_argument("--batch", type=int, default=10000)
+    args = parser.parse_args()
+
+    df = load_frame()
+    models = {"dt": (joblib.load(os.path.join(ROOT, "cardio_dt_model.pkl")),
+                     joblib.load(os.path.join(ROOT, "dt_scaler.pkl"))),
+              "rf": load_forest(df)}
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(0)
+
+    for name, (estimator, scaler) in models.items():
+        compiled = TreeModel(*export_model(estimator, scaler))
+        scaled = scaler.transform(X)
+        same = np.array_equal(compiled.predict_proba(scaled), estimator.predict_proba(scaled)[:, 1])
+        print(f"{name}: {compiled.meta['n_trees']} tree(s), {compiled.meta['n_nodes']:,} nodes, "
+              f"max_depth {compiled.meta['max_depth']}, identical probabilities: {same}")
+
+        rows = scaled[rng.integers(0, len(scaled), size=args.rows)]
+        block = scaled[rng.integers(0, len(scaled), size=args.batch)]
+        print_row("  single row, sklearn", per_row(estimator.predict_proba, rows))
+        print_row("  single row, compiled", per_row(compiled.predict_proba, rows))
+        print_row(f"  {args.batch:,} rows, sklearn", batch(estimator.predict_proba, block))
+        print_row(f"  {args.batch:,} rows, compiled", batch(compiled.predict_proba, block))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Memory per gunicorn worker with the preload-and-fork config, for several worker counts.
+
+Starts gunicorn with gunicorn.conf.py, sends a few /result requests so every
+worker has touched the models, then reads /proc/<pid>/smaps_rollup for the
+master and each worker. Pss splits shared pages fairly between processes;
+Private_* is what a worker holds on its own.
+
+    python benchmarks/bench_workers.py --workers 1 2 4 8
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+from common import ROOT
+from procinfo import memory_info
+
+FORM = {"age": 55, "gender": 2, "hi": 140, "lo": 90, "chol": 2, "gluc": 1,
+        "active": 1, "height": 170, "weight": 80}
+
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not start")
+
+
+def measure(n_workers, port, preload):
+    env = dict(os.environ, WEB_CONCURRENCY=str(n_workers), PORT=str(port),
+               HEARTMATE_PRELOAD="1" if preload else "0", PYTHONWARNINGS="ignore")
+    cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    try:
+        wait_until_up(f"http://127.0.0.1:{port}/")
+        body = urllib.parse.urlencode(FORM).encode()
+        for _ in range(n_workers * 20):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/result", data=body).read()
+        time.sleep(0.5)
+        master = memory_info(proc.pid)
+        workers = [memory_info(pid) for pid in children(proc.pid)]
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    total_pss = master["Pss"] + sum(w["Pss"] for w in workers)
+    private = sum(w["Private_Dirty"] + w["Private_Clean"] for w in workers) / max(len(workers), 1)
+    return total_pss, private
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    for preload in (True, False):
+        print(f"preload_app={preload}")
+        for n in args.workers:
+            total_pss, private = measure(n, args.port, preload)
+            print(f"  workers={n:<3} total PSS={total_pss / 2**20:7.1f}MB  "
+                  f"private per worker={private / 2**20:6.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
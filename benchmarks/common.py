@@ -0,0 +1,33 @@
+"""Shared helpers for the benchmark scripts in this folder."""
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ensemble import RAW_COLUMNS  # noqa: E402 (needs ROOT on sys.path)
+
+DATA_FILE = os.path.join(ROOT, "cardio_train_cleaned.csv")
+
+
+def sample_records(n, seed=0):
+    """Draws n patient records (raw form fields only) from the cleaned dataset."""
+    from dataset import load_frame
+    df = load_frame(DATA_FILE, columns=RAW_COLUMNS)
+    rows = df.sample(n=n, replace=n > len(df), random_state=seed)
+    return rows.to_dict(orient="records")
+
+
+def latency_summary(samples_ms):
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"count": int(samples.size), "mean": round(float(samples.mean()), 4),
+            "p50": round(float(p50), 4), "p95": round(float(p95), 4), "p99": round(float(p99), 4)}
+
+
+def print_row(label, summary, unit="ms"):
+    print(f"{label:<32} n={summary['count']:<7} mean={summary['mean']:.3f}{unit} "
+          f"p50={summary['p50']:.3f}{unit} p95={summary['p95']:.3f}{unit} p99={summary['p99']:.3f}{unit}")
@@ -0,0 +1,332 @@
+"""Benchmark suite for every serving entry point and every model, saved as JSON for comparing commits.
+
+The routes of ai_app1, temp_cardio_whole_app and qwe are driven with form
+payloads replayed from cardio_train_cleaned.csv:
+
+  --mode inprocess  Flask's test client, each app in a fresh process of its
+                    own so their memory figures do not mix (no network).
+  --mode gunicorn   HTTP against gunicorn with --workers processes, from
+                    --threads client connections (ai_app1 runs with
+                    gunicorn.conf.py, as in Procfile.txt).
+
+Every route reports req/s, p50/p95/p99 latency and memory after it ran: the
+RSS of the process in-process, the PSS summed over master and workers under
+gunicorn. The model section times each ensemble model's predict_proba on
+single rows and on one --batch-rows batch.
+
+Results are written to benchmarks/results/<date>-<commit>-<mode>.json;
+--compare with an earlier file prints the change per route and per model
+and flags anything slower by more than --threshold percent.
+
+    python benchmarks/run_suite.py
+    python benchmarks/run_suite.py --mode gunicorn --workers 2 --threads 8
+    python benchmarks/run_suite.py --compare benchmarks/results/2026-10-01-abc1234-inprocess.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from urllib.parse import urlencode
+
+import numpy as np
+
+from common import ROOT, latency_summary, sample_records
+from procinfo import memory_info
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+BATCH_RECORDS = 100  # records per POST /api/v1/predict/batch
+
+
+def ai_app1_form(r):
+    return {"age": int(r["age_years"]), "gender": int(r["gender"]), "hi": int(r["ap_hi"]), "lo": int(r["ap_lo"]),
+            "chol": int(r["cholesterol"]), "gluc": int(r["gluc"]), "active": int(r["active"]),
+            "height": int(r["height"]), "weight": r["weight"]}
+
+
+def full_form(r):
+    # temp_cardio_whole_app and qwe ask for every raw input under its column name
+    return {col: (r[col] if col in ("weight", "age_years") else int(r[col])) for col in r}
+
+
+def batch_json(records):
+    return [dict(r) for r in records]
+
+
+# app -> (gunicorn command after the module path, routes as (method, path, payload builder or None))
+APPS = {
+    "ai_app1": (["-c", "gunicorn.conf.py", "ai_app1:create_app()"], [
+        ("GET", "/", None), ("GET", "/predict", None), ("GET", "/models", None), ("GET", "/about", None),
+        ("GET", "/dashboard", None), ("POST", "/result", ai_app1_form),
+        ("POST", "/api/v1/predict/batch", batch_json), ("GET", "/metrics", None),
+    ]),
+    "temp_cardio_whole_app": (["temp_cardio_whole_app:app"], [
+        ("GET", "/", None), ("GET", "/predict", None), ("POST", "/predict", full_form),
+        ("GET", "/model-stats", None), ("GET", "/about", None),
+    ]),
+    "qwe": (["qwe:app"], [
+        ("GET", "/", None), ("POST", "/", full_form),
+    ]),
+}
+
+
+def payloads(builder, records):
+    """Request bodies for one route: form dicts, or JSON lists of BATCH_RECORDS records."""
+    if builder is None:
+        return [None]
+    if builder is batch_json:
+        return [batch_json(records[i:i + BATCH_RECORDS]) for i in range(0, len(records) - BATCH_RECORDS + 1,
+                                                                          BATCH_RECORDS)]
+    return [builder(r) for r in records]
+
+
+def route_result(method, path, latencies, elapsed, statuses, memory):
+    return {"route": f"{method} {path}", "requests_per_s": round(len(latencies) / elapsed, 1),
+            "latency_ms": latency_summary(latencies), "status": sorted(statuses), "memory_bytes": memory}
+
+
+# --- in-process: Flask test client ---
+def run_in_process(app_name, seconds, n_records):
+    """Runs in a fresh child process; returns one result per route of app_name."""
+    import importlib
+
+    os.chdir(ROOT)  # the apps read cardio_train_cleaned.csv relative to the working directory
+    module = importlib.import_module(app_name)
+    app = module.create_app() if hasattr(module, "create_app") else module.app
+    client = app.test_client()
+    records = sample_records(n_records)
+
+    results = []
+    for method, path, builder in APPS[app_name][1]:
+        bodies = payloads(builder, records)
+
+        def send(body):
+            if method == "GET":
+                return client.get(path)
+            if builder is batch_json:
+                return client.post(path, json=body)
+            return client.post(path, data=body)
+
+        for body in bodies[:5]:
+            send(body)  # warm-up: template compilation, first cache entries
+        latencies, statuses = [], set()
+        deadline = time.perf_counter() + seconds
+        start = time.perf_counter()
+        i = 0
+        while time.perf_counter() < deadline:
+            t = time.perf_counter()
+            response = send(bodies[i % len(bodies)])
+            latencies.append((time.perf_counter() - t) * 1000)
+            statuses.add(response.status_code)
+            i += 1
+        elapsed = time.perf_counter() - start
+        results.append(route_result(method, path, latencies, elapsed, statuses, {"rss": memory_info()["Rss"]}))
+    return results
+
+
+# --- gunicorn: HTTP from client threads ---
+def server_memory(pid):
+    """PSS summed over the gunicorn master and its workers, and the largest worker RSS."""
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        workers = [int(p) for p in f.read().split()]
+    infos = [memory_info(p) for p in workers]
+    return {"pss_total": memory_info(pid)["Pss"] + sum(i["Pss"] for i in infos),
+            "worker_rss_max": max((i["Rss"] for i in infos), default=0)}
+
+
+def wait_until_up(port, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not start")
+
+
+def run_gunicorn(app_name, seconds, n_records, workers, threads, port):
+    args, routes = APPS[app_name]
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), PYTHONWARNINGS="ignore")
+    cmd = [sys.executable, "-m", "gunicorn", "--log-level", "warning",
+           "--bind", f"127.0.0.1:{port}", "--workers", str(workers)] + args
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    records = sample_records(n_records)
+    results = []
+    try:
+        wait_until_up(port)
+        for method, path, builder in routes:
+            bodies = []
+            for body in payloads(builder, records):
+                if body is None:
+                    bodies.append((None, {}))
+                elif builder is batch_json:
+                    bodies.append((json.dumps(body), {"Content-Type": "application/json"}))
+                else:
+                    bodies.append((urlencode(body), {"Content-Type": "application/x-www-form-urlencoded"}))
+
+            latencies = [[] for _ in range(threads)]
+            statuses = set()
+            deadline = time.perf_counter() + seconds
+
+            def client(t):
+                conn = http.client.HTTPConnection("127.0.0.1", port)
+                i = t * 97
+                while time.perf_counter() < deadline:
+                    body, headers = bodies[i % len(bodies)]
+                    start = time.perf_counter()
+                    conn.request(method, path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    latencies[t].append((time.perf_counter() - start) * 1000)
+                    statuses.add(response.status)
+                    i += 1
+                conn.close()
+
+            pool = [threading.Thread(target=client, args=(t,)) for t in range(threads)]
+            start = time.perf_counter()
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            samples = [ms for per_thread in latencies for ms in per_thread]
+            results.append(route_result(method, path, samples, elapsed, statuses, server_memory(proc.pid)))
+    finally:
+        proc.terminate()
+        proc.wait()
+    return results
+
+
+# --- models: single-row and batch predict_proba ---
+def run_models(n_rows, batch_rows):
+    """Times every loaded ensemble model, and the whole ensemble, on single rows and one batch."""
+    from ensemble import EnsembleEngine, feature_matrix, records_to_columns
+
+    engine = EnsembleEngine().load()
+    records = sample_records(max(n_rows, batch_rows), seed=1)
+    X = feature_matrix(records_to_columns(records), len(records))
+
+    def measure(predict, rows):
+        single = []
+        for i in range(n_rows):
+            start = time.perf_counter()
+            predict(rows[i:i + 1])
+            single.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        predict(rows[:batch_rows])
+        batch_s = time.perf_counter() - start
+        return {"single_row_ms": latency_summary(single), "batch_rows": batch_rows,
+                "batch_ms": round(batch_s * 1000, 3), "batch_rows_per_s": round(batch_rows / batch_s, 1)}
+
+    results = {}
+    for model_id, model, group in engine.models:
+        mean, scale = engine.scalers[group]
+        results[model_id] = dict(measure(model.predict_proba, (X - mean) / scale), source=engine.sources[model_id])
+    results["ensemble"] = dict(measure(engine.predict_proba, X), source="all")
+    return results
+
+
+# --- results ---
+def environment():
+    def git(*args):
+        out = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() if out.returncode == 0 else ""
+
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    return {"commit": commit + ("-dirty" if dirty else ""), "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+            "cpus": os.cpu_count()}
+
+
+def compare(old, new, threshold):
+    """Prints the change of every route and model present in both result files."""
+    print(f"\ncompared with {old['environment']['commit']} ({old['environment']['date']}, {old['mode']})")
+    if old["mode"] != new["mode"] or old["environment"]["cpus"] != new["environment"]["cpus"]:
+        print("  note: different mode or core count, so the figures are not directly comparable")
+
+    def flag(worse_pct):
+        return "  REGRESSION" if worse_pct > threshold else ""
+
+    for app_name, routes in new["apps"].items():
+        before = {r["route"]: r for r in old["apps"].get(app_name, [])}
+        for r in routes:
+            b = before.get(r["route"])
+            if b is None:
+                continue
+            rate = (r["requests_per_s"] / b["requests_per_s"] - 1) * 100 if b["requests_per_s"] else 0.0
+            p99 = (r["latency_ms"]["p99"] / b["latency_ms"]["p99"] - 1) * 100 if b["latency_ms"]["p99"] else 0.0
+            print(f"  {app_name:<22} {r['route']:<28} req/s {rate:+6.1f}%  p99 {p99:+6.1f}%{flag(max(-rate, p99))}")
+    for model_id, m in new["models"].items():
+        b = old["models"].get(model_id)
+        if b is None:
+            continue
+        p50 = (m["single_row_ms"]["p50"] / b["single_row_ms"]["p50"] - 1) * 100 if b["single_row_ms"]["p50"] else 0.0
+        rows = (m["batch_rows_per_s"] / b["batch_rows_per_s"] - 1) * 100 if b["batch_rows_per_s"] else 0.0
+        print(f"  model {model_id:<16} single-row p50 {p50:+6.1f}%  batch rows/s {rows:+6.1f}%{flag(max(p50, -rows))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "gunicorn"], default="inprocess")
+    parser.add_argument("--apps", nargs="+", choices=list(APPS), default=list(APPS))
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent on each route")
+    parser.add_argument("--records", type=int, default=2000, help="dataset records replayed as payloads")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="client connections in gunicorn mode")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--rows", type=int, default=500, help="single rows timed per model")
+    parser.add_argument("--batch-rows", type=int, default=2000, help="rows in the timed batch per model")
+    parser.add_argument("--no-models", action="store_true", help="skip the model micro-benchmarks")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/<date>-<commit>-<mode>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change flagged as a regression")
+    args = parser.parse_args()
+
+    report = {"environment": environment(), "mode": args.mode, "settings": vars(args), "apps": {}, "models": {}}
+    print(f"commit {report['environment']['commit']}, {args.mode}, {os.cpu_count()} core(s)")
+    # Fresh spawned processes: no app shares memory or loaded modules with another
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"), max_tasks_per_child=1) as pool:
+        for i, app_name in enumerate(args.apps):
+            if args.mode == "inprocess":
+                results = pool.submit(run_in_process, app_name, args.seconds, args.records).result()
+            else:
+                results = run_gunicorn(app_name, args.seconds, args.records, args.workers, args.threads,
+                                       args.port + i)
+            report["apps"][app_name] = results
+            for r in results:
+                lat, mem = r["latency_ms"], r["memory_bytes"]
+                memory = " ".join(f"{k}={v / 2**20:.1f}MB" for k, v in mem.items())
+                print(f"{app_name:<22} {r['route']:<28} {r['requests_per_s']:>9,.1f} req/s  p50={lat['p50']:.3f}ms "
+                      f"p95={lat['p95']:.3f}ms p99={lat['p99']:.3f}ms  {memory}  status={r['status']}")
+        if not args.no_models:
+            report["models"] = pool.submit(run_models, args.rows, args.batch_rows).result()
+            for model_id, m in report["models"].items():
+                single = m["single_row_ms"]
+                print(f"model {model_id:<16} ({m['source']:<8}) single row p50={single['p50']:.4f}ms "
+                      f"p99={single['p99']:.4f}ms  batch of {m['batch_rows']}: {m['batch_ms']:.1f}ms "
+                      f"({m['batch_rows_per_s']:,.0f} rows/s)")
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"{report['environment']['date'][:10]}-{report['environment']['commit']}-{args.mode}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Exports the model pickles into memory-mappable bundles under compiled/.
+
+    python compile_models.py            # recompile stale bundles only
+    python compile_models.py --force    # recompile everything
+
+A bundle records the digests of the files it came from; EnsembleEngine
+only uses a bundle whose digests still match, and falls back to the pickle
+otherwise.
+
+knn.pkl from KNN.ipynb holds the tuned accuracy rather than the fitted
+model, so while that is the case the KNN bundle is built straight from the
+dataset with the notebook's split, on standardized features, together with
+its KD-tree index.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from artifacts import file_digest
+from compiled_models import EXPORT_VERSION, KINDS, export_knn, export_model
+from dataset import load_frame
+from ensemble import BASE_DIR, COMPILED_DIR, FEATURE_COLUMNS, MODEL_ARTIFACTS
+from model_store import read_meta, save_bundle, sources_current
+
+# How KNN.ipynb fits its model, used when knn.pkl has no fitted model in it
+KNN_DATA_FILE = "cardio_train_cleaned.csv"
+KNN_PARAMS = {"n_neighbors": 5, "test_size": 0.2, "random_state": 42}
+# Largest |P(1)| difference from sklearn a compiled model may show; KNN is left
+# out because neighbours at equal distance may be picked in a different order
+PARITY_KINDS = ("tree", "linear", "gaussian_nb")
+PARITY_TOLERANCE = 1e-9
+PARITY_ROWS = 2000
+
+
+def source_digests(model_file, scaler_file, base_dir=BASE_DIR, extra=()):
+    """Digests of the files a bundle is compiled from (missing files raise OSError)."""
+    files = [f for f in (model_file, scaler_file, *extra) if f]
+    return {f: file_digest(os.path.join(base_dir, f)) for f in files}
+
+
+def is_stale(model_id, base_dir=BASE_DIR, compiled_dir=COMPILED_DIR):
+    model_file, scaler_file = MODEL_ARTIFACTS[model_id]
+    files = [f for f in (model_file, scaler_file) if f]
+    if not all(os.path.exists(os.path.join(base_dir, f)) for f in files):
+        return False  # nothing to compile from
+    meta = read_meta(os.path.join(compiled_dir, model_id))
+    return (meta is None or meta.get("export_version") != EXPORT_VERSION
+            or not sources_current(meta, base_dir, required=files))
+
+
+def build_knn(base_dir=BASE_DIR):
+    """Fits the KNN the way KNN.ipynb does and returns its (arrays, meta).
+
+    The notebook searched raw features, where height and weight swamp the
+    binary columns; the index is built on standardized features instead.
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    df = load_frame(os.path.join(base_dir, KNN_DATA_FILE))
+    X_train, _, y_train, _ = train_test_split(
+        df[FEATURE_COLUMNS].to_numpy(dtype=np.float64), df["cardio"].to_numpy(),
+        test_size=KNN_PARAMS["test_size"], random_state=KNN_PARAMS["random_state"], stratify=df["cardio"])
+    scaler = StandardScaler().fit(X_train)
+    arrays, meta = export_knn(scaler.transform(X_train), y_train == 1, KNN_PARAMS["n_neighbors"], scaler)
+    meta["params"] = KNN_PARAMS
+    return arrays, meta
+
+
+def check_parity(arrays, meta, reference, scaler):
+    """Scores random raw rows with the compiled model and with reference (raw rows -> P(1)).
+
+    The rows are drawn around the training distribution the scaler recorded;
+    raises ValueError if any probability differs by more than PARITY_TOLERANCE.
+    """
+    n_features = arrays["scaler_mean"].shape[0]
+    mean = scaler.mean_ if scaler is not None else np.zeros(n_features)
+    scale = scaler.scale_ if scaler is not None else np.ones(n_features)
+    X = np.random.default_rng(0).normal(mean, 2 * scale, size=(PARITY_ROWS, n_features))
+
+    model = KINDS[meta["kind"]](arrays, meta)
+    compiled = model.predict_proba((X - model.scaler_mean) / model.scaler_scale)
+    error = float(np.max(np.abs(compiled - reference(X))))
+    if error > PARITY_TOLERANCE:
+        raise ValueError(f"compiled {meta['kind']} model differs from sklearn by {error:.3g}")
+    return error
+
+
+def compile_model(model_id, base_dir=BASE_DIR, compiled_dir=COMPILED_DIR):
+    """Exports one model and returns the bundle path.
+
+    Models without a compiled evaluator get a meta-only bundle of kind
+    "pickle", which tells EnsembleEngine to keep using the pickle. Exports of
+    PARITY_KINDS must match sklearn's predict_proba (check_parity) or the
+    model is not compiled.
+    """
+    import joblib
+
+    model_file, scaler_file = MODEL_ARTIFACTS[model_id]
+    estimator = joblib.load(os.path.join(base_dir, model_file))
+    if scaler_file is None:
+        pipeline = estimator
+        scaler, estimator = pipeline.steps[0][1], pipeline.steps[-1][1]
+        reference = lambda X: pipeline.predict_proba(X)[:, 1]
+    else:
+        scaler = joblib.load(os.path.join(base_dir, scaler_file))
+        reference = lambda X: estimator.predict_proba(scaler.transform(X))[:, 1]
+
+    extra = []
+    if model_id == "knn" and not hasattr(estimator, "classes_"):
+        exported = build_knn(base_dir)
+        extra.append(KNN_DATA_FILE)
+    else:
+        exported = export_model(estimator, scaler)
+    if exported is None:
+        exported = {}, {"kind": "pickle", "estimator": type(estimator).__name__}
+    arrays, meta = exported
+    if meta["kind"] in PARITY_KINDS:
+        meta["parity_error"] = check_parity(arrays, meta, reference, scaler)
+    meta.update(model_id=model_id, export_version=EXPORT_VERSION, sources=source_digests(model_file, scaler_file, base_dir, extra),
+                created=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    path = os.path.join(compiled_dir, model_id)
+    save_bundle(path, arrays, meta)
+    return path
+
+
+def compile_all(force=False, model_ids=None, base_dir=BASE_DIR, compiled_dir=COMPILED_DIR):
+    """Compiles every stale bundle; returns {model_id: path or None on failure}."""
+    results = {}
+    for model_id in model_ids or MODEL_ARTIFACTS:
+        if not force and not is_stale(model_id, base_dir, compiled_dir):
+            continue
+        try:
+            results[model_id] = compile_model(model_id, base_dir, compiled_dir)
+        except Exception as e:
+            print(f"Could not compile '{model_id}': {e}")
+            results[model_id] = None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="recompile even if the bundle is up to date")
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_ARTIFACTS), help="only these model ids")
+    args = parser.parse_args()
+
+    for model_id, path in compile_all(args.force, args.models).items():
+        kind = read_meta(path)["kind"] if path else "failed"
+        print(f"{model_id}: {kind} -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+"""Plain-NumPy evaluators for models exported into model_store bundles.
+
+Every evaluator takes a scaled float64 matrix and returns P(cardio=1) per
+row, like predict_proba(X)[:, 1] of the sklearn model it was exported from.
+Exporting only reads fitted attributes, so nothing here imports sklearn.
+"""
+import numpy as np
+
+from knn_index import build_groups, build_index, query
+from model_store import load_bundle
+
+# Bump when export_model learns a new estimator or changes what it writes, so
+# compile_models.py recompiles existing bundles
+EXPORT_VERSION = 2
+
+
+class CompiledModel:
+    kind = None
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self.scaler_mean = arrays["scaler_mean"]
+        self.scaler_scale = arrays["scaler_scale"]
+
+    def predict_proba(self, X):
+        raise NotImplementedError
+
+
+class TreeModel(CompiledModel):
+    """A decision tree or a forest of them, flattened into one set of node arrays.
+
+    The trees' nodes are concatenated (feature, threshold, leaf P(1)), with
+    node i's children at children[2i] (left) and children[2i+1] (right) and
+    "roots" holding the index of each tree's root. Leaves point back to
+    themselves, so rows can descend a fixed max_depth levels without checking
+    for leaves. A forest averages its trees' leaf probabilities in tree order,
+    the same sum sklearn computes.
+    """
+    kind = "tree"
+
+    # Up to this many rows descend all trees at once, one level per step; larger
+    # batches go tree by tree, which keeps each tree's nodes in cache
+    LEVEL_ROWS = 2048
+
+    def predict_proba(self, X):
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[0] <= self.LEVEL_ROWS:
+            leaf_proba = self._descend_levels(X)
+        else:
+            leaf_proba = self._descend_trees(X)
+        if len(leaf_proba) == 1:
+            return leaf_proba[0]
+        out = leaf_proba[0].copy()
+        for tree_proba in leaf_proba[1:]:
+            out += tree_proba
+        return out / len(leaf_proba)
+
+    def _descend_levels(self, X):
+        """(n_trees, n_rows) leaf probabilities; every tree advances one level per step."""
+        children, feature, threshold = self.arrays["children"], self.arrays["feature"], self.arrays["threshold"]
+        flat = X.ravel()
+        offsets = np.arange(X.shape[0]) * X.shape[1]
+        node = np.repeat(self.arrays["roots"][:, None].astype(np.intp), X.shape[0], axis=1)
+        for _ in range(self.meta["max_depth"]):
+            go_right = flat[offsets + feature[node]] > threshold[node]
+            node = children[2 * node + go_right]
+        return self.arrays["proba"][node]
+
+    def _descend_trees(self, X):
+        """Same as _descend_levels, one tree at a time over a column-major copy of X."""
+        children, feature, threshold = self.arrays["children"], self.arrays["feature"], self.arrays["threshold"]
+        n_rows = X.shape[0]
+        flat = np.ascontiguousarray(X.T).ravel()
+        cols = np.arange(n_rows)
+        leaf_proba = np.empty((len(self.arrays["roots"]), n_rows), dtype=np.float64)
+        for i, root in enumerate(self.arrays["roots"]):
+            node = np.full(n_rows, root, dtype=np.intp)
+            for _ in range(self.meta["max_depth"]):
+                go_right = flat[feature[node] * n_rows + cols] > threshold[node]
+                node = children[2 * node + go_right]
+            leaf_proba[i] = self.arrays["proba"][node]
+        return leaf_proba
+
+
+class LinearModel(CompiledModel):
+    """Logistic regression with its StandardScaler folded into the weights.
+
+    For scaled x' = (x - mean) / scale the decision is x' @ coef + intercept,
+    which equals x @ w + b with w = coef / scale and
+    b = intercept - sum(coef * mean / scale). The bundle therefore carries an
+    identity scaler and the model scores raw features directly.
+    """
+    kind = "linear"
+
+    def predict_proba(self, X):
+        z = X @ self.arrays["weights"] + self.arrays["bias"][0]
+        # 1 / (1 + exp(-z)) without overflow for large |z|
+        return np.exp(-np.logaddexp(0.0, -z))
+
+
+class GaussianNBModel(CompiledModel):
+    """Gaussian naive Bayes: per-class feature means and variances plus class priors."""
+    kind = "gaussian_nb"
+
+    def predict_proba(self, X):
+        theta, var = self.arrays["theta"], self.arrays["var"]
+        # Same terms, in the same order, as GaussianNB._joint_log_likelihood
+        jll = []
+        for i in range(2):
+            n_ij = self.arrays["log_norm"][i] - 0.5 * np.sum(((X - theta[i]) ** 2) / var[i], 1)
+            jll.append(self.arrays["log_prior"][i] + n_ij)
+        return np.exp(jll[1] - np.logaddexp(jll[0], jll[1]))
+
+
+class KNNModel(CompiledModel):
+    """k-nearest neighbours (uniform weights, euclidean) over the scaled training matrix.
+
+    Bundles exported with category groups (knn_index.build_groups) are
+    searched group by group: each row is compared against the points sharing
+    its categories, and only when another group's lower bound is within its
+    k-th distance against those groups as well. Within a group one matrix
+    product scores all points; the k-th distance among a sample of them
+    bounds the row's k-th distance, and only the few points under that bound
+    are re-ranked by exact distance, so no distance row is ever sorted. On
+    the cardio data a row scans about a sixth of the training set.
+    Small requests against a large training set walk the KD-tree stored in
+    the bundle (knn_index.py); anything else uses blocked brute force over
+    all points: one matrix product per block beats per-row tree walks for
+    batches, and below ~100k points a single brute-force pass is as fast as
+    the tree (benchmarks/bench_knn.py).
+    """
+    kind = "knn"
+
+    # Requests up to this many rows use the KD-tree...
+    TREE_QUERY_ROWS = 8
+    # ...once the training set has at least this many points
+    TREE_MIN_SAMPLES = 100_000
+    # Leaves a tree query may scan before it stops; None keeps queries exact
+    MAX_LEAVES = None
+    # Upper bound on the distance block held in memory at once (bytes)
+    BLOCK_BYTES = 32 * 2**20
+    # Candidates kept per row beyond the k nearest, to catch near-ties without a full scan
+    TIE_SLACK = 3
+    # Points of a group sampled to bound a row's k-th distance before the full comparison
+    SAMPLE_POINTS = 1024
+
+    def __init__(self, arrays, meta):
+        super().__init__(arrays, meta)
+        if "group_points" in arrays:
+            # Rows [-2p; |p|^2]: [x, 1] times this is |p|^2 - 2 x.p, the squared distance less |x|^2
+            points, sq_norms = np.asarray(arrays["group_points"]), np.asarray(arrays["group_sq_norms"])
+            self._group_product = np.vstack([-2.0 * points.T, sq_norms])
+            self._group_max_sq_norm = float(sq_norms.max()) if len(sq_norms) else 0.0
+
+    def predict_proba(self, X):
+        finite = np.isfinite(X).all(axis=1)
+        if not finite.all():
+            # A row with NaN or inf has no nearest neighbours: its probability is NaN
+            out = np.full(X.shape[0], np.nan)
+            if finite.any():
+                out[finite] = self.predict_proba(X[finite])
+            return out
+        if (X.shape[0] <= self.TREE_QUERY_ROWS and "node_start" in self.arrays
+                and self.meta["n_samples"] >= self.TREE_MIN_SAMPLES):
+            return self.predict_proba_tree(X, self.MAX_LEAVES)
+        if "group_start" in self.arrays:
+            return self.predict_proba_grouped(X)
+        return self.predict_proba_brute(X)
+
+    def predict_proba_tree(self, X, max_leaves=None):
+        positive = self.arrays["positive"]
+        k, depth = self.meta["n_neighbors"], self.meta["depth"]
+        return np.array([positive[query(row, k, self.arrays, depth, max_leaves)].mean() for row in X])
+
+    def predict_proba_brute(self, X):
+        nearest, _ = self._brute(X, self.arrays["points"], self.arrays["sq_norms"])
+        return self.arrays["positive"][nearest].mean(axis=1)
+
+    def predict_proba_grouped(self, X):
+        # Plain views: indexing a memmap many times costs more than the arithmetic
+        a = {name: np.asarray(self.arrays[name]) for name in ("group_dims", "group_levels", "group_start")}
+        k, n = self.meta["n_neighbors"], X.shape[0]
+        start = a["group_start"]
+        large = np.diff(start) >= k
+        if not large.any():
+            return self.predict_proba_brute(X)
+        diff = X[:, None, a["group_dims"]] - a["group_levels"]
+        bounds = np.einsum("ijk,ijk->ij", diff, diff)  # squared distance to each group's categories, at most
+        # The row's own group, or the closest one with at least k points
+        own = np.where(large, bounds, np.inf).argmin(axis=1)
+
+        rows, pos = [], []
+        for g in np.unique(own):
+            in_group = np.flatnonzero(own == g)
+            r, p = self._candidates(X[in_group], start[g], start[g + 1])
+            rows.append(in_group[r])
+            pos.append(p)
+        nearest, kth = self._select(X, np.concatenate(rows), np.concatenate(pos), np.arange(n))
+
+        # Other groups whose lower bound reaches the k-th distance may hold closer
+        # (or tied, lower-index) points; the slack covers the bound's rounding
+        reach = bounds <= kth[:, None] * (1 + 1e-9)
+        reach[np.arange(n), own] = False
+        again = np.flatnonzero(reach.any(axis=1))
+        if again.size:
+            rows, pos = [np.repeat(again, k)], [nearest[again].ravel()]
+            for g in np.flatnonzero(reach[again].any(axis=0)):
+                near = np.flatnonzero(reach[:, g])
+                r, p = self._candidates(X[near], start[g], start[g + 1], kth[near])
+                rows.append(near[r])
+                pos.append(p)
+            nearest[again], _ = self._select(X, np.concatenate(rows), np.concatenate(pos), again)
+        return self.arrays["positive"][np.asarray(self.arrays["group_members"])[nearest]].mean(axis=1)
+
+    def _candidates(self, X, lo, hi, limit=None):
+        """(row of X, position in group_points) pairs for the points of group_points[lo:hi] near each row.
+
+        That is every point whose exact squared distance is at most limit, plus
+        a few a rounding error further that _select() drops. Without a limit,
+        a row's limit is the k-th distance among SAMPLE_POINTS of the group's
+        points, which is at least its k-th distance against the whole group.
+        """
+        k = self.meta["n_neighbors"]
+        product = self._group_product[:, lo:hi]
+        sq_x = np.einsum("ij,ij->i", X, X)
+        # Slack covering the rounding of the expanded form, relative to the magnitudes summed
+        tolerance = 1e-10 * (sq_x + self._group_max_sq_norm)
+        stride = max(1, (hi - lo) // self.SAMPLE_POINTS)
+        block = max(1, self.BLOCK_BYTES // (8 * (hi - lo)))
+        rows, cols = [], []
+        for first in range(0, X.shape[0], block):
+            part = slice(first, first + block)
+            Xb = np.empty((len(X[part]), X.shape[1] + 1))
+            Xb[:, :-1], Xb[:, -1] = X[part], 1.0
+            if limit is None:
+                # Twice the tolerance: the sampled k-th distance is itself rounded
+                sample = np.partition(Xb @ product[:, ::stride], k - 1, axis=1)
+                bound = sample[:, k - 1] + 2 * tolerance[part]
+            else:
+                bound = limit[part] - sq_x[part] + tolerance[part]
+            dist = Xb @ product  # squared distance less |x|^2
+            flat = np.flatnonzero(dist <= bound[:, None])
+            r, c = np.divmod(flat, hi - lo)
+            if limit is None:
+                # The k-th smallest of those is the k-th of the whole group: keep only what reaches it
+                values = dist.ravel()[flat]
+                counts = np.bincount(r, minlength=len(Xb))
+                padded = np.full((len(Xb), counts.max()), np.inf)
+                padded[r, np.arange(len(r)) - np.repeat(np.cumsum(counts) - counts, counts)] = values
+                keep = values <= (np.partition(padded, k - 1, axis=1)[:, k - 1] + 2 * tolerance[part])[r]
+                r, c = r[keep], c[keep]
+            rows.append(first + r)
+            cols.append(lo + c)
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def _select(self, X, rows, pos, wanted):
+        """The k nearest candidates of each row in wanted (sorted) and their exact k-th distances.
+
+        Candidates are (row, position in group_points) pairs, possibly
+        repeated; ties go to the lower index of the bundle's point order.
+        """
+        k = self.meta["n_neighbors"]
+        members = np.asarray(self.arrays["group_members"])
+        diff = np.asarray(self.arrays["group_points"])[pos] - X[rows]
+        exact = np.einsum("ij,ij->i", diff, diff)
+        order = np.lexsort((members[pos], exact, rows))
+        rows, pos, exact = rows[order], pos[order], exact[order]
+        # Drop repeats of the same point, which are adjacent after sorting
+        fresh = np.ones(len(rows), dtype=bool)
+        fresh[1:] = (rows[1:] != rows[:-1]) | (pos[1:] != pos[:-1])
+        rows, pos, exact = rows[fresh], pos[fresh], exact[fresh]
+        first = np.searchsorted(rows, wanted)
+        if np.any(np.searchsorted(rows, wanted, side="right") - first < k):
+            raise ValueError(f"fewer than {k} candidate neighbours for a row")
+        take = first[:, None] + np.arange(k)
+        return pos[take], exact[take[:, -1]]
+
+    def _brute(self, X, points, sq_norms):
+        """The k nearest of points for each row of X (indices into points) and the exact k-th distances."""
+        k = self.meta["n_neighbors"]
+        max_sq_norm = float(sq_norms.max())
+        nearest = np.empty((X.shape[0], k), dtype=np.int64)
+        block = max(1, self.BLOCK_BYTES // (8 * points.shape[0]))
+        for start in range(0, X.shape[0], block):
+            Xb = X[start:start + block]
+            sq_x = np.einsum("ij,ij->i", Xb, Xb)
+            dist = sq_norms - 2.0 * (Xb @ points.T)
+            dist += sq_x[:, None]
+            # Slack covering the rounding of the expanded form, relative to the magnitudes summed
+            tolerance = 1e-10 * (sq_x + max_sq_norm)
+            nearest[start:start + block] = self._nearest(Xb, dist, points, k, tolerance)
+        diff = points[nearest] - X[:, None, :]
+        return nearest, np.einsum("ijk,ijk->ij", diff, diff).max(axis=1)
+
+    def _nearest(self, Xb, dist, points, k, tolerance):
+        """The k nearest points of each row of Xb, ties going to the lower index.
+
+        dist comes from |x|^2 - 2 x.p + |p|^2, whose rounding depends on how
+        BLAS splits the product, so a row scored alone or in a batch could
+        pick different neighbours among (near-)equal distances. Every point
+        within tolerance of the k-th distance is therefore re-ranked by its
+        exact distance and then its index, the same order query() uses.
+        Those points are normally among the k + TIE_SLACK smallest; only rows
+        with more near-ties than that are scanned in full.
+        """
+        m = min(k + self.TIE_SLACK, dist.shape[1])
+        cols = np.argpartition(dist, m - 1, axis=1)[:, :m]
+        cand = np.take_along_axis(dist, cols, axis=1)
+        limit = np.partition(cand, k - 1, axis=1)[:, k - 1] + tolerance
+        # Complete unless a point left out could also lie within the limit
+        complete = (cand.max(axis=1) > limit) | (m == dist.shape[1])
+
+        diff = Xb[:, None, :] - points[cols]
+        exact = np.where(cand <= limit[:, None], np.einsum("ijk,ijk->ij", diff, diff), np.inf)
+        order = np.lexsort((cols, exact), axis=1)[:, :k]
+        nearest = np.take_along_axis(cols, order, axis=1)
+        for i in np.flatnonzero(~complete):
+            nearest[i] = self._nearest_row(Xb[i], dist[i], points, k, limit[i])
+        return nearest
+
+    def _nearest_row(self, x, dist, points, k, limit):
+        cols = np.flatnonzero(dist <= limit)
+        if cols.size < k:
+            raise ValueError(f"only {cols.size} candidate neighbours for a row, need {k}")
+        diff = points[cols] - x
+        exact = np.einsum("ij,ij->i", diff, diff)
+        return cols[np.lexsort((cols, exact))[:k]]
+
+
+KINDS = {cls.kind: cls for cls in (TreeModel, LinearModel, GaussianNBModel, KNNModel)}
+
+
+def _scaler_arrays(scaler, n_features):
+    if scaler is None:
+        return {"scaler_mean": np.zeros(n_features), "scaler_scale": np.ones(n_features)}
+    return {"scaler_mean": np.asarray(scaler.mean_, dtype=np.float64),
+            "scaler_scale": np.asarray(scaler.scale_, dtype=np.float64)}
+
+
+def export_model(estimator, scaler=None):
+    """Returns (arrays, meta) for a fitted estimator, or None when it has no compiled evaluator.
+
+    scaler is the StandardScaler the estimator was trained behind (None if it
+    was trained on raw features).
+    """
+    name = type(estimator).__name__
+    classes = list(getattr(estimator, "classes_", []))
+    if classes != [0, 1]:
+        return None
+
+    if name in ("DecisionTreeClassifier", "RandomForestClassifier", "ExtraTreesClassifier"):
+        trees = [estimator] if name == "DecisionTreeClassifier" else estimator.estimators_
+        arrays = export_trees([tree.tree_ for tree in trees])
+        arrays.update(_scaler_arrays(scaler, estimator.n_features_in_))
+        meta = {"kind": "tree", "estimator": name, "n_trees": len(trees),
+                "n_nodes": int(arrays["feature"].shape[0]),
+                "max_depth": max(int(tree.tree_.max_depth) for tree in trees)}
+        return arrays, meta
+
+    if name == "LogisticRegression":
+        coef = np.asarray(estimator.coef_, dtype=np.float64)[0]
+        intercept = float(estimator.intercept_[0])
+        scaling = _scaler_arrays(scaler, coef.shape[0])
+        weights = coef / scaling["scaler_scale"]
+        arrays = {
+            "weights": weights,
+            "bias": np.array([intercept - np.dot(weights, scaling["scaler_mean"])]),
+            "scaler_mean": np.zeros_like(weights),
+            "scaler_scale": np.ones_like(weights),
+        }
+        return arrays, {"kind": "linear", "estimator": name, "fused_scaler": scaler is not None}
+
+    if name == "GaussianNB":
+        var = np.asarray(estimator.var_, dtype=np.float64)
+        arrays = {
+            "theta": np.asarray(estimator.theta_, dtype=np.float64),
+            "var": var,
+            "log_prior": np.log(estimator.class_prior_),
+            "log_norm": -0.5 * np.sum(np.log(2.0 * np.pi * var), axis=1),
+        }
+        arrays.update(_scaler_arrays(scaler, var.shape[1]))
+        return arrays, {"kind": "gaussian_nb", "estimator": name}
+
+    if name == "KNeighborsClassifier":
+        if estimator.weights != "uniform" or estimator.effective_metric_ != "euclidean":
+            return None
+        positive = estimator.classes_[estimator._y] == 1
+        return export_knn(estimator._fit_X, positive, estimator.n_neighbors, scaler)
+
+    return None
+
+
+def export_trees(trees):
+    """Concatenates fitted sklearn tree_ objects into the node arrays TreeModel evaluates."""
+    parts, roots, offset = [], [], 0
+    for tree in trees:
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        value = tree.value[:, 0, :]
+        children = np.stack([np.where(is_leaf, nodes, tree.children_left),
+                             np.where(is_leaf, nodes, tree.children_right)], axis=1)
+        parts.append((
+            children.ravel() + offset,
+            np.where(is_leaf, 0, tree.feature),
+            tree.threshold,
+            value[:, 1] / value.sum(axis=1),
+        ))
+        roots.append(offset)
+        offset += tree.node_count
+    children, feature, threshold, proba = (np.concatenate(column) for column in zip(*parts))
+    return {
+        "roots": np.asarray(roots, dtype=np.int32),
+        "children": children.astype(np.int64),
+        "feature": feature.astype(np.int64),
+        "threshold": threshold.astype(np.float64),
+        "proba": proba.astype(np.float64),
+    }
+
+
+def export_knn(fit_X, positive, n_neighbors, scaler=None, leaf_size=64):
+    """Bundle arrays for a KNN over fit_X (already scaled by scaler) with its KD-tree index."""
+    arrays, depth = build_index(fit_X, positive, leaf_size=leaf_size)
+    arrays["sq_norms"] = np.einsum("ij,ij->i", arrays["points"], arrays["points"])
+    arrays.update(build_groups(arrays["points"]))
+    arrays.update(_scaler_arrays(scaler, arrays["points"].shape[1]))
+    meta = {"kind": "knn", "estimator": "KNeighborsClassifier", "n_neighbors": int(n_neighbors),
+            "depth": depth, "leaf_size": leaf_size, "n_samples": int(arrays["points"].shape[0])}
+    return arrays, meta
+
+
+def load_compiled(directory, mmap=True):
+    """Loads a bundle written by compile_models.py and wraps it in its evaluator."""
+    arrays, meta = load_bundle(directory, mmap=mmap)
+    return KINDS[meta["kind"]](arrays, meta)
@@ -0,0 +1,83 @@
+"""Aggregates for the /dashboard page, computed from the cleaned dataset.
+
+The summary is computed once per dataset version and saved under
+artifacts/ (artifacts.load_or_train), so workers share it across restarts.
+In memory it is keyed by the CSV's size and mtime: a request costs one
+stat() call, and a changed CSV is picked up on the next request.
+"""
+import os
+import threading
+
+from artifacts import load_or_train
+from dataset import DATA_FILE, load_columns
+
+# Part of the artifact fingerprint: bump "version" when the summary changes shape
+STATS_PARAMS = {"version": 1}
+
+AGE_GROUPS = [("<40", 0, 40), ("40-50", 40, 50), ("50-60", 50, 60), ("60+", 60, 200)]
+LEVELS = {
+    "chol": ("cholesterol", ["Normal", "Above", "High"]),
+    "gluc": ("gluc", ["Normal", "Prediabetic", "High"]),
+}
+# The cleaned CSV still has readings like 16020/-70; averages only use plausible ones
+PLAUSIBLE_HI = (60, 250)
+PLAUSIBLE_LO = (30, 200)
+
+_cache = {"key": None, "stats": None}
+_lock = threading.Lock()
+
+
+def pct(count, total):
+    return round(100.0 * count / total, 1) if total else 0.0
+
+
+def compute_stats(path=DATA_FILE):
+    """Scans the CSV once and returns the dashboard summary as a small dict of plain numbers."""
+    import numpy as np
+
+    columns = ["gender", "ap_hi", "ap_lo", "cholesterol", "gluc", "smoke", "alco", "active", "cardio", "age_years"]
+    cols = load_columns(path, columns)
+    total = len(cols["cardio"])
+    age = cols["age_years"]
+    hi, lo = cols["ap_hi"].astype(np.int64), cols["ap_lo"].astype(np.int64)
+    plausible = ((hi >= PLAUSIBLE_HI[0]) & (hi <= PLAUSIBLE_HI[1]) &
+                 (lo >= PLAUSIBLE_LO[0]) & (lo <= PLAUSIBLE_LO[1]) & (lo < hi))
+    high_bp = plausible & ((hi >= 140) | (lo >= 90))
+    disease = int(cols["cardio"].sum())
+
+    stats = {
+        "total": total,
+        "disease_pct": pct(disease, total),
+        "healthy_pct": pct(total - disease, total),
+        "avg_age": round(float(age.mean()), 1) if total else 0.0,
+        # gender is coded 1 = female, 2 = male, as on the prediction form
+        "gender": {"Male": pct(int((cols["gender"] == 2).sum()), total),
+                   "Female": pct(int((cols["gender"] == 1).sum()), total)},
+        "vitals": {"avg_hi": int(round(float(hi[plausible].mean()))) if plausible.any() else 0,
+                   "avg_lo": int(round(float(lo[plausible].mean()))) if plausible.any() else 0,
+                   "high_bp_pct": pct(int(high_bp.sum()), int(plausible.sum()))},
+        "lifestyle": {col: pct(int(cols[col].sum()), total) for col in ("smoke", "alco", "active")},
+        "age_groups": {},
+        "age_risk": {},
+    }
+    for key, (column, labels) in LEVELS.items():
+        counts = np.bincount(cols[column], minlength=len(labels) + 1)
+        stats[key] = {label: pct(int(counts[level]), total) for level, label in enumerate(labels, start=1)}
+    cardio = cols["cardio"]
+    for label, low, high in AGE_GROUPS:
+        in_group = (age >= low) & (age < high)
+        stats["age_groups"][label] = pct(int(in_group.sum()), total)
+        stats["age_risk"][label] = pct(int(cardio[in_group].sum()), int(in_group.sum()))
+    return stats
+
+
+def get_stats(path=DATA_FILE):
+    """The current summary; recomputed only when the CSV's size or mtime changes."""
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    if _cache["key"] != key:
+        with _lock:
+            if _cache["key"] != key:
+                _cache["stats"] = load_or_train("dashboard_stats", path, STATS_PARAMS, lambda: compute_stats(path))
+                _cache["key"] = key
+    return _cache["stats"]
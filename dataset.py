@@ -0,0 +1,116 @@
+"""Typed columnar cache of the cardio CSVs.
+
+The first load parses the CSV once and stores every column as its own .npy
+file in a model_store bundle under artifacts/dataset/. Each column gets the
+smallest dtype that holds it exactly: int8 for the 0/1 flags and the 1-3
+levels, int16 for vitals, and float32 only where it round-trips, so BMI stays
+float64. Later loads memory-map the columns: no parsing, and the pages are
+shared by every process reading the same cache.
+
+The cache is keyed by the CSV's size and mtime, falling back to its sha256
+when those changed, and it is rebuilt whenever the content differs.
+"""
+import os
+import threading
+
+import numpy as np
+
+from artifacts import ARTIFACT_DIR, BASE_DIR, file_digest
+from model_store import load_bundle, read_meta, save_bundle
+
+DATA_FILE = os.path.join(BASE_DIR, "cardio_train_cleaned.csv")
+CACHE_DIR = os.path.join(ARTIFACT_DIR, "dataset")
+
+INT_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+_build_lock = threading.Lock()
+
+
+def compact_dtype(values):
+    """Smallest dtype that represents values exactly."""
+    if values.dtype.kind in "iub":
+        low, high = (int(values.min()), int(values.max())) if values.size else (0, 0)
+        for dtype in INT_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return np.dtype(dtype)
+    if values.dtype.kind == "f":
+        narrow = values.astype(np.float32)
+        if np.array_equal(narrow.astype(values.dtype), values, equal_nan=True):
+            return np.dtype(np.float32)
+        return np.dtype(np.float64)
+    raise TypeError(f"column of dtype {values.dtype} is not numeric")
+
+
+def cache_path(path=DATA_FILE, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0])
+
+
+def build_cache(path=DATA_FILE, cache_dir=CACHE_DIR):
+    """Parses the CSV and writes the columnar bundle; returns the bundle directory."""
+    import pandas as pd
+
+    st = os.stat(path)
+    df = pd.read_csv(path)
+    arrays, csv_dtypes = {}, {}
+    for column in df.columns:
+        values = df[column].to_numpy()
+        csv_dtypes[column] = values.dtype.str
+        arrays[column] = values.astype(compact_dtype(values))
+    meta = {
+        "kind": "dataset",
+        "source": os.path.basename(path),
+        "source_digest": file_digest(path),
+        "source_stat": [st.st_size, st.st_mtime_ns],
+        "columns": list(df.columns),
+        "csv_dtypes": csv_dtypes,
+        "n_rows": len(df),
+    }
+    directory = cache_path(path, cache_dir)
+    save_bundle(directory, arrays, meta)
+    return directory
+
+
+def ensure_cache(path=DATA_FILE, cache_dir=CACHE_DIR):
+    """Returns the bundle directory for path, (re)building it if the CSV changed."""
+    directory = cache_path(path, cache_dir)
+    st = os.stat(path)
+    meta = read_meta(directory)
+    if meta is not None and meta.get("source_stat") == [st.st_size, st.st_mtime_ns]:
+        return directory
+    with _build_lock:
+        meta = read_meta(directory)
+        if meta is None or meta.get("source_digest") != file_digest(path):
+            print(f"Building columnar cache for {os.path.basename(path)}...")
+            return build_cache(path, cache_dir)
+        if meta.get("source_stat") != [st.st_size, st.st_mtime_ns]:
+            # Same content, new mtime (e.g. a fresh checkout): record it so the next load is a stat()
+            arrays, _ = load_bundle(directory, mmap=False)
+            save_bundle(directory, arrays, dict(meta, source_stat=[st.st_size, st.st_mtime_ns]))
+    return directory
+
+
+def load_columns(path=DATA_FILE, columns=None, mmap=True, cache_dir=CACHE_DIR):
+    """Returns {column: array} in CSV order, with the compact dtypes; read-only memory maps unless mmap=False."""
+    arrays, meta = load_bundle(ensure_cache(path, cache_dir), mmap=mmap)
+    return {column: arrays[column] for column in (columns or meta["columns"])}
+
+
+def load_frame(path=DATA_FILE, columns=None, compact=False, cache_dir=CACHE_DIR):
+    """The dataset as a DataFrame, like pd.read_csv(path, usecols=columns) but without parsing.
+
+    By default every column is cast back to the dtype read_csv gives it, so
+    arithmetic on the frame (BMI, scaling, training) is bit-for-bit what it
+    was on the CSV. compact=True keeps the small cached dtypes, and the
+    frame then wraps the read-only memory maps without copying them.
+    """
+    import pandas as pd
+
+    directory = ensure_cache(path, cache_dir)
+    arrays, meta = load_bundle(directory, mmap=True)
+    names = columns or meta["columns"]
+    data = {}
+    for column in names:
+        values = arrays[column]
+        data[column] = values if compact else values.astype(meta["csv_dtypes"][column])
+    return pd.DataFrame(data, columns=names, copy=False)
@@ -0,0 +1,466 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from types import MappingProxyType
+
+import numpy as np
+
+from compiled_models import load_compiled
+from model_registry import Registry
+from model_store import META_FILE, read_meta, sources_current
+from prediction_cache import record_key
+from telemetry import StageTimings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Memory-mappable bundles written by compile_models.py; preferred over the pickles
+COMPILED_DIR = os.environ.get("HEARTMATE_COMPILED_DIR", os.path.join(BASE_DIR, "compiled"))
+
+# Column order used by every notebook (df.drop("cardio", axis=1) on the cleaned CSV)
+FEATURE_COLUMNS = [
+    "gender", "height", "weight", "ap_hi", "ap_lo", "cholesterol", "gluc",
+    "smoke", "alco", "active", "age_years", "BMI", "pulse_pressure"
+]
+
+# model id -> (model file, scaler file). svm.pkl is a Pipeline that carries its own scaler.
+MODEL_ARTIFACTS = {
+    "rf": ("cardio_rf_tuned_model.pkl", "rf_scaler.pkl"),
+    "dt": ("cardio_dt_model.pkl", "dt_scaler.pkl"),
+    "svm": ("svm.pkl", None),
+    "lr": ("lr.pkl", "lr_scaler.pkl"),
+    "knn": ("knn.pkl", "knn_scaler.pkl"),
+    "nb": ("cardio_nb_model.pkl", "nb_scaler.pkl"),
+}
+
+# Raw inputs a caller supplies; BMI and pulse_pressure are always derived
+RAW_COLUMNS = [
+    "age_years", "gender", "height", "weight", "ap_hi", "ap_lo",
+    "cholesterol", "gluc", "smoke", "alco", "active"
+]
+
+# Defaults for inputs the ai_app1 form does not ask for
+FORM_DEFAULTS = {"smoke": 0, "alco": 0, "active": 1}
+
+# Category codes and 0/1 flags: the models were trained on whole numbers only
+WHOLE_COLUMNS = {"gender", "cholesterol", "gluc", "smoke", "alco", "active"}
+
+
+def feature_row(record):
+    """Builds one float64 row in FEATURE_COLUMNS order, deriving BMI and pulse pressure."""
+    values = dict(FORM_DEFAULTS)
+    values.update(record)
+    height = float(values["height"])
+    weight = float(values["weight"])
+    values["BMI"] = weight / ((height / 100) ** 2)
+    values["pulse_pressure"] = float(values["ap_hi"]) - float(values["ap_lo"])
+
+    row = np.empty((1, len(FEATURE_COLUMNS)), dtype=np.float64)
+    for i, col in enumerate(FEATURE_COLUMNS):
+        row[0, i] = float(values[col])
+    return row
+
+
+def feature_matrix(columns, n_rows):
+    """Builds an (n_rows, 13) float64 matrix from raw column arrays in one vectorized pass."""
+    X = np.empty((n_rows, len(FEATURE_COLUMNS)), dtype=np.float64)
+    for i, col in enumerate(FEATURE_COLUMNS):
+        if col in ("BMI", "pulse_pressure"):
+            continue
+        if col in columns:
+            X[:, i] = columns[col]
+        elif col in FORM_DEFAULTS:
+            X[:, i] = FORM_DEFAULTS[col]
+        else:
+            raise KeyError(f"missing column '{col}'")
+    height = X[:, FEATURE_COLUMNS.index("height")]
+    weight = X[:, FEATURE_COLUMNS.index("weight")]
+    ap_hi = X[:, FEATURE_COLUMNS.index("ap_hi")]
+    ap_lo = X[:, FEATURE_COLUMNS.index("ap_lo")]
+    X[:, FEATURE_COLUMNS.index("BMI")] = weight / ((height / 100) ** 2)
+    X[:, FEATURE_COLUMNS.index("pulse_pressure")] = ap_hi - ap_lo
+    return X
+
+
+def first_invalid(columns):
+    """(row index, column, problem) of the first value the models cannot score, or None.
+
+    Every value must be a finite number, WHOLE_COLUMNS must hold whole numbers
+    and height must be positive (BMI divides by it).
+    """
+    for col in RAW_COLUMNS:
+        values = columns.get(col)
+        if values is None:
+            continue
+        bad = np.flatnonzero(~np.isfinite(values))
+        if bad.size:
+            return int(bad[0]), col, "must be a finite number"
+        if col in WHOLE_COLUMNS:
+            bad = np.flatnonzero(values != np.round(values))
+            if bad.size:
+                return int(bad[0]), col, "must be a whole number"
+        if col == "height":
+            bad = np.flatnonzero(values <= 0)
+            if bad.size:
+                return int(bad[0]), col, "must be greater than 0"
+    return None
+
+
+def records_to_columns(records):
+    """Turns a list of record dicts into raw column arrays for feature_matrix."""
+    columns = {}
+    for col in RAW_COLUMNS:
+        if col in FORM_DEFAULTS:
+            values = [r.get(col, FORM_DEFAULTS[col]) for r in records]
+        else:
+            try:
+                values = [r[col] for r in records]
+            except KeyError:
+                raise KeyError(f"missing column '{col}'")
+        # np.array would take JSON true/false as 1.0/0.0
+        if bool in set(map(type, values)):
+            raise ValueError(f"column '{col}' must be numeric, not true/false")
+        try:
+            columns[col] = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError(f"column '{col}' must be numeric")
+    return columns
+
+
+def majority_vote(probs):
+    """Majority vote over an (n_models, n_rows) probability matrix.
+
+    Returns (labels, risk votes, mean probability) per row. A tied vote
+    falls back to the averaged probability.
+    """
+    n_models = probs.shape[0]
+    risk_votes = (probs > 0.5).sum(axis=0)
+    mean_prob = probs.mean(axis=0) if n_models else np.zeros(probs.shape[1])
+    labels = np.where(risk_votes * 2 == n_models, mean_prob > 0.5, risk_votes * 2 > n_models)
+    return labels.astype(np.int8), risk_votes, mean_prob
+
+
+class LatencyTracker:
+    """Keeps the most recent request latencies (ms) for percentile reporting."""
+
+    def __init__(self, size=2048):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, ms):
+        with self._lock:
+            self._samples.append(ms)
+
+    def summary(self):
+        with self._lock:
+            samples = np.array(self._samples, dtype=np.float64)
+        if samples.size == 0:
+            return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {"count": int(samples.size), "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3), "p99": round(float(p99), 3)}
+
+
+class SklearnModel:
+    """Adapts a pickled sklearn classifier and its scaler to the compiled-model interface."""
+
+    def __init__(self, estimator, scaler):
+        self.estimator = estimator
+        self.scaler_mean = scaler.mean_
+        self.scaler_scale = scaler.scale_
+
+    def predict_proba(self, X):
+        return self.estimator.predict_proba(X)[:, 1]
+
+
+class ModelSet:
+    """Everything predict() needs from one load: models, scalers, version and risk grid.
+
+    Built completely by EnsembleEngine.load() and never modified once it is
+    swapped in, so a request that picked it up scores against one consistent
+    set of models even while a newer set replaces it (model_registry.py).
+    """
+
+    def __init__(self, models, scalers, sources, missing, load_seconds, load_total_seconds, version, grid=None):
+        self.models = tuple(models)          # (model id, model, scaler group index)
+        self.scalers = tuple(scalers)        # unique (mean, scale) pairs shared by the models
+        self.sources = MappingProxyType(dict(sources))            # model id -> "compiled" or "pickle"
+        self.missing = MappingProxyType(dict(missing))            # model id -> reason it could not be loaded
+        self.load_seconds = MappingProxyType(dict(load_seconds))  # model id -> time it took to load
+        self.load_total_seconds = load_total_seconds              # the whole load, risk grid included
+        self.version = version  # identifies the loaded model files; part of every cache key
+        self.grid = grid        # RiskGrid answering predict() in "nearest"/"interpolate" mode
+
+    @property
+    def model_ids(self):
+        return [model_id for model_id, _, _ in self.models]
+
+
+EMPTY_MODEL_SET = ModelSet((), (), {}, {}, {}, 0.0, "")
+
+
+class EnsembleEngine:
+    """Scores patients with every loaded model; safe to share between request threads.
+
+    The loaded models live in an immutable ModelSet held by self.registry.
+    load() builds a complete new set and swaps it in, and each prediction
+    reads the registry once, so nothing on the request path is mutated.
+    """
+
+    def __init__(self, base_dir=BASE_DIR, artifacts=MODEL_ARTIFACTS, compiled_dir=COMPILED_DIR, cache=None,
+                 grid_mode="exact"):
+        self.base_dir = base_dir
+        self.artifacts = artifacts
+        self.compiled_dir = compiled_dir
+        self.registry = Registry()  # the current ModelSet, None until the first load()
+        self.latency = LatencyTracker()
+        self.stages = StageTimings()        # ms per hot-path stage: cache, grid, features, scale, vote, predict
+                                            # (and parse, render from ai_app1's /result)
+        self.model_times = StageTimings()   # ms per predict_proba call of each model, by model id
+        self.cache = cache      # PredictionCache for predict(), or None
+        self.grid_mode = grid_mode
+        self.batcher = None     # MicroBatcher scoring concurrent predict() calls together
+        self._load_lock = threading.Lock()
+
+    @property
+    def current(self):
+        """The ModelSet in use; an empty one before the first load()."""
+        return self.registry.get() or EMPTY_MODEL_SET
+
+    @property
+    def loaded(self):
+        return self.registry.get() is not None
+
+    # Read-only views of the current set
+    models = property(lambda self: self.current.models)
+    scalers = property(lambda self: self.current.scalers)
+    sources = property(lambda self: self.current.sources)
+    missing = property(lambda self: self.current.missing)
+    load_seconds = property(lambda self: self.current.load_seconds)
+    load_total_seconds = property(lambda self: self.current.load_total_seconds)
+    version = property(lambda self: self.current.version)
+    grid = property(lambda self: self.current.grid)
+    model_ids = property(lambda self: self.current.model_ids)
+
+    def ensure_loaded(self):
+        """Loads on first use when the app was not started through create_app()."""
+        if not self.loaded:
+            with self._load_lock:
+                if not self.loaded:
+                    self.load()
+        return self
+
+    def _load_compiled(self, model_id, model_file, scaler_file):
+        """Memory-maps the compiled bundle if it was built from the current source files."""
+        directory = os.path.join(self.compiled_dir, model_id)
+        meta = read_meta(directory)
+        if meta is None or meta["kind"] == "pickle":
+            return None
+        if not sources_current(meta, self.base_dir, required=[f for f in (model_file, scaler_file) if f]):
+            print(f"Compiled bundle for '{model_id}' is stale; run compile_models.py")
+            return None
+        return load_compiled(directory)
+
+    def _load_pickle(self, model_file, scaler_file):
+        for f in (model_file, scaler_file):
+            if f:
+                os.stat(os.path.join(self.base_dir, f))  # a missing pickle fails here, before joblib is imported
+        import joblib  # with every bundle compiled, neither joblib nor sklearn is imported
+
+        estimator = joblib.load(os.path.join(self.base_dir, model_file))
+        if scaler_file is None:
+            scaler, estimator = estimator.steps[0][1], estimator.steps[-1][1]
+        else:
+            scaler = joblib.load(os.path.join(self.base_dir, scaler_file))
+        if not hasattr(estimator, "predict_proba") or not hasattr(scaler, "mean_"):
+            raise TypeError(f"{model_file} does not contain a fitted classifier")
+        return SklearnModel(estimator, scaler)
+
+    def build_model_set(self):
+        """Loads every model, compiled bundle first, then pickle; unusable artifacts are skipped."""
+        load_started = time.perf_counter()
+        models, scalers, sources, missing, load_seconds = [], [], {}, {}, {}
+        scaler_index = {}
+        for model_id, (model_file, scaler_file) in self.artifacts.items():
+            started = time.perf_counter()
+            try:
+                model = self._load_compiled(model_id, model_file, scaler_file)
+                sources[model_id] = "compiled"
+                if model is None:
+                    model = self._load_pickle(model_file, scaler_file)
+                    sources[model_id] = "pickle"
+            except Exception as e:
+                print(f"Skipping model '{model_id}': {e}")
+                sources.pop(model_id, None)
+                missing[model_id] = str(e)
+                continue
+
+            mean = np.asarray(model.scaler_mean, dtype=np.float64)
+            scale = np.asarray(model.scaler_scale, dtype=np.float64)
+            key = mean.tobytes() + scale.tobytes()
+            if key not in scaler_index:
+                scaler_index[key] = len(scalers)
+                scalers.append((mean, scale))
+            models.append((model_id, model, scaler_index[key]))
+            load_seconds[model_id] = time.perf_counter() - started
+        model_set = ModelSet(models, scalers, sources, missing, load_seconds, 0.0, self._model_version(models))
+        if self.grid_mode != "exact":
+            from risk_grid import open_grid  # checks the table against the set's version
+            model_set.grid = open_grid(model_set, self.grid_mode)
+        model_set.load_total_seconds = time.perf_counter() - load_started
+        return model_set
+
+    def load(self):
+        """Loads a fresh ModelSet and swaps it in; requests in flight finish with the previous one."""
+        self.registry.swap(self.build_model_set())
+        return self
+
+    def artifact_paths(self, pickles=True):
+        """The files build_model_set() reads: pickles, compiled bundle metadata and the risk grid's.
+
+        Each bundle and the grid are replaced as a whole; a model pickle and
+        its scaler are two files, so pickles=False leaves them out.
+        """
+        paths = []
+        if pickles:
+            paths += [os.path.join(self.base_dir, f) for files in self.artifacts.values() for f in files if f]
+        paths += [os.path.join(self.compiled_dir, model_id, META_FILE) for model_id in self.artifacts]
+        if self.grid_mode != "exact":
+            from risk_grid import GRID_DIR
+            paths.append(os.path.join(GRID_DIR, META_FILE))
+        return paths
+
+    def validate(self, model_set, X):
+        """Scores X with model_set row by row and as one batch (which also warms it up).
+
+        Raises ValueError if the set has no models, lacks one the current set
+        has, or returns anything but probabilities. Records no telemetry.
+        """
+        if not model_set.models:
+            raise ValueError("no model could be loaded")
+        lost = [model_id for model_id in self.model_ids if model_id not in model_set.model_ids]
+        if lost:
+            raise ValueError("; ".join(f"'{m}' could not be loaded: {model_set.missing.get(m)}" for m in lost))
+        for rows in [X[i:i + 1] for i in range(len(X))] + [X]:
+            scaled = [(rows - mean) / scale for mean, scale in model_set.scalers]
+            for model_id, model, group in model_set.models:
+                probs = np.asarray(model.predict_proba(scaled[group]), dtype=np.float64)
+                if probs.shape != (len(rows),) or not np.all((probs >= 0) & (probs <= 1)):
+                    raise ValueError(f"model '{model_id}' does not return probabilities")
+
+    def _model_version(self, models):
+        """Short hash of what was loaded: compiled bundles by their source digests, pickles by size and mtime."""
+        parts = []
+        for model_id, model, _ in models:
+            meta = getattr(model, "meta", None)
+            if meta is not None:
+                parts.append([model_id, meta.get("sources")])
+                continue
+            files = [f for f in self.artifacts[model_id] if f]
+            stats = [os.stat(os.path.join(self.base_dir, f)) for f in files]
+            parts.append([model_id, [[f, st.st_size, st.st_mtime_ns] for f, st in zip(files, stats)]])
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:12]
+
+    def reset_telemetry(self):
+        """Forgets the recorded latencies and stage timings, e.g. those of the warm-up."""
+        self.latency = LatencyTracker()
+        self.stages = StageTimings()
+        self.model_times = StageTimings()
+
+    def predict_proba(self, X, model_set=None):
+        """Returns an (n_models, n_rows) matrix of P(cardio=1), scaling each distinct scaler once.
+
+        Uses model_set, or the current set when None.
+        """
+        if model_set is None:
+            model_set = self.ensure_loaded().current
+        start = time.perf_counter()
+        scaled = [(X - mean) / scale for mean, scale in model_set.scalers]
+        self.stages.observe("scale", (time.perf_counter() - start) * 1000)
+        probs = np.empty((len(model_set.models), X.shape[0]), dtype=np.float64)
+        for i, (model_id, model, group) in enumerate(model_set.models):
+            start = time.perf_counter()
+            probs[i] = model.predict_proba(scaled[group])
+            self.model_times.observe(model_id, (time.perf_counter() - start) * 1000)
+        return probs
+
+    def predict(self, record, use_cache=True, batched=True):
+        """Scores one patient against all loaded models and majority-votes the result.
+
+        With a cache, a record seen before is answered from it ("cached": True);
+        use_cache=False neither reads nor fills it. With a risk grid, records on
+        the grid are answered from the table ("source": "grid") instead of the
+        live models. batched=False scores in the calling thread even with a
+        MicroBatcher, whose scheduler thread must not start in a process that
+        is about to fork (warm-up in the gunicorn master).
+        """
+        start = time.perf_counter()
+        current = self.ensure_loaded().current  # this one set serves the whole request
+        grid = current.grid
+        key = None
+        if self.cache is not None and use_cache:
+            # Table answers are approximations, so they get their own keys
+            version = f"{current.version}/{grid.mode}" if grid is not None else current.version
+            key = record_key(record, RAW_COLUMNS, FORM_DEFAULTS, version)
+            outcome = self.cache.get(key)
+            self.stages.observe("cache", (time.perf_counter() - start) * 1000)
+            if outcome is not None:
+                latency_ms = (time.perf_counter() - start) * 1000
+                self.latency.record(latency_ms)
+                self.stages.observe("predict", latency_ms)
+                return dict(outcome, latency_ms=latency_ms, cached=True)
+
+        probs = None
+        if grid is not None:
+            with self.stages.time("grid"):
+                probs = grid.lookup(record)
+        source = "grid" if probs is not None else "models"
+        if probs is None:
+            with self.stages.time("features"):
+                row = feature_row(record)
+            if self.batcher is not None and batched:
+                probs = self.batcher.predict_proba(row, current)
+            else:
+                probs = self.predict_proba(row, current)
+        with self.stages.time("vote"):
+            labels, risk_votes, mean_prob = majority_vote(probs)
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.latency.record(latency_ms)
+        self.stages.observe("predict", latency_ms)
+
+        probs = probs[:, 0]
+        model_ids = current.model_ids
+        outcome = {
+            "label": int(labels[0]),
+            "score": round(float(mean_prob[0]) * 100, 1),
+            "votes": int(risk_votes[0]),
+            "n_models": len(model_ids),
+            "preds": {model_id: int(p > 0.5) for model_id, p in zip(model_ids, probs)},
+            "probs": {model_id: float(p) for model_id, p in zip(model_ids, probs)},
+            "latency_ms": latency_ms,
+            "source": source,
+            "cached": False,
+        }
+        if key is not None:
+            self.cache.put(key, outcome)
+        return outcome
+
+    def predict_batch(self, columns, n_rows):
+        """Scores a whole roster given as raw column arrays; returns column-oriented results."""
+        start = time.perf_counter()
+        current = self.ensure_loaded().current
+        probs = self.predict_proba(feature_matrix(columns, n_rows), current)
+        labels, risk_votes, mean_prob = majority_vote(probs)
+        elapsed = time.perf_counter() - start
+
+        return {
+            "count": n_rows,
+            "models": current.model_ids,
+            "label": labels.tolist(),
+            "score": np.round(mean_prob * 100, 1).tolist(),
+            "votes": risk_votes.tolist(),
+            "probs": {model_id: p.tolist() for model_id, p in zip(current.model_ids, probs)},
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "rows_per_second": round(n_rows / elapsed, 1) if elapsed > 0 else None,
+        }
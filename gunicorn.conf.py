@@ -0,0 +1,42 @@
+# Gunicorn settings for ai_app1 (see Procfile.txt).
+#
+# The app is imported and its models loaded once in the master (preload_app),
+# then the workers are forked from it. gc.freeze() moves everything loaded so
+# far into the permanent generation, so the collectors in the workers never
+# write to those objects and their pages stay shared copy-on-write. Each extra
+# worker therefore costs only its own private heap, not another copy of the models.
+import gc
+import os
+
+from compile_models import compile_all
+from procinfo import format_memory, memory_info
+
+wsgi_app = "ai_app1:create_app()"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+# HEARTMATE_PRELOAD=0 loads the models in each worker instead (for comparison only)
+preload_app = os.environ.get("HEARTMATE_PRELOAD", "1") == "1"
+# HEARTMATE_THREADS > 1 switches to gthread workers: that many request threads per worker
+# share its models, which are never mutated on the request path (model_registry.py)
+threads = int(os.environ.get("HEARTMATE_THREADS", "1"))
+
+
+def on_starting(server):
+    # Refresh compiled/ bundles whose source pickles changed; a no-op when all are current
+    for model_id, path in compile_all().items():
+        server.log.info("Compiled model '%s' -> %s", model_id, path)
+
+
+def when_ready(server):
+    # Runs in the master after the app was preloaded and before any worker is forked
+    gc.freeze()
+    server.log.info("Models preloaded, %d objects frozen; master %s",
+                    gc.get_freeze_count(), format_memory(memory_info()))
+
+
+def post_worker_init(worker):
+    worker.log.info("Worker %s ready: %s", worker.pid, format_memory(memory_info()))
+
+
+def worker_exit(server, worker):
+    server.log.info("Worker %s exiting: %s", worker.pid, format_memory(memory_info()))
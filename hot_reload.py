@@ -0,0 +1,204 @@
+"""Zero-downtime reload of model artifacts.
+
+Replacing a model used to mean restarting every worker. A Reloader instead
+builds the new snapshot next to the one in use, validates it, warms it up by
+scoring synthetic patients with it, and only then swaps it into the app's
+model_registry.Registry. Requests already running finish with the snapshot
+they picked up; the next ones get the new one. If anything goes wrong before
+the swap, the old snapshot simply stays in service and the failure is
+reported.
+
+A reload is started either by a watcher thread that polls the artifact files
+(size and mtime) every HEARTMATE_RELOAD_INTERVAL seconds, or by an
+authenticated POST to the app's /admin/reload. The admin call reloads the
+worker that answered it and touches TRIGGER_FILE, which every watching
+worker sees on its next poll. A change is acted on only once the files have
+stayed the same for one interval, so a copy in progress is never loaded.
+Files that are only valid together (a model and its scaler) should not be
+watched themselves; watch the file written after them instead, such as
+train_models.py's manifest.
+
+    HEARTMATE_RELOAD_WATCH=1          poll the artifact files (off by default)
+    HEARTMATE_RELOAD_INTERVAL=5       seconds between polls
+    HEARTMATE_ADMIN_TOKEN=<secret>    enables /admin/reload ("Authorization: Bearer <secret>")
+
+Each reload records how long the build, validation and swap took and the
+resident memory before, while both snapshots were held (the overlap) and
+after the old one was released. These are RSS readings, so the allocator
+adds a few MB of noise either way; benchmarks/bench_reload.py averages them
+over many reloads under load.
+"""
+import gc
+import hmac
+import os
+import threading
+import time
+
+from artifacts import ARTIFACT_DIR
+from procinfo import memory_info
+
+WATCH = os.environ.get("HEARTMATE_RELOAD_WATCH", "0") == "1"
+RELOAD_INTERVAL = float(os.environ.get("HEARTMATE_RELOAD_INTERVAL", "5"))
+ADMIN_TOKEN = os.environ.get("HEARTMATE_ADMIN_TOKEN", "")
+# Touched by /admin/reload so that the other workers reload too
+TRIGGER_FILE = os.path.join(ARTIFACT_DIR, "reload_request")
+
+
+def file_stamp(paths):
+    """(path, size, mtime) of every path; a missing file counts as (path, None, None)."""
+    stamp = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamp.append((path, st.st_size, st.st_mtime_ns))
+        except OSError:
+            stamp.append((path, None, None))
+    return tuple(stamp)
+
+
+def request_reload(path=TRIGGER_FILE):
+    """Asks every watching worker to reload."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(f"{time.time()}\n")
+
+
+def authorized(header):
+    """True if an Authorization header carries HEARTMATE_ADMIN_TOKEN (never when it is unset)."""
+    return bool(ADMIN_TOKEN) and hmac.compare_digest((header or "").encode(), f"Bearer {ADMIN_TOKEN}".encode())
+
+
+def add_admin_route(app, reloader):
+    """Registers POST /admin/reload on a Flask app, answered with JSON.
+
+    404 while HEARTMATE_ADMIN_TOKEN is unset, 403 for a wrong token.
+    Otherwise it reloads this worker now and touches TRIGGER_FILE so that
+    watching workers follow within two intervals; the reload report comes
+    back with 200, or 409 if the new models were rejected.
+    """
+    from flask import jsonify, request
+
+    def admin_reload():
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "not found"}), 404
+        if not authorized(request.headers.get("Authorization")):
+            return jsonify({"error": "invalid admin token"}), 403
+        request_reload()
+        report = reloader.reload("admin request")
+        return jsonify(report), 200 if report["ok"] else 409
+
+    app.add_url_rule("/admin/reload", "admin_reload", admin_reload, methods=["POST"])
+
+
+def _rss():
+    return memory_info()["Rss"]
+
+
+class Reloader:
+    """Rebuilds, validates and swaps in the snapshot held by one Registry.
+
+    build() returns a complete new snapshot. check(snapshot) scores with it,
+    which also warms it up, and raises if it must not go into service.
+    watch_paths() lists the files a reload reads. on_swap(new, old), if given,
+    runs right after the swap (e.g. to drop pages rendered from the old models).
+    """
+
+    def __init__(self, registry, build, check, watch_paths, on_swap=None, interval=RELOAD_INTERVAL):
+        self.registry = registry
+        self.build = build
+        self.check = check
+        self.watch_paths = watch_paths
+        self.on_swap = on_swap
+        self.interval = interval
+        self.reloads = self.failures = 0
+        self.last = None          # report of the latest attempt
+        self.last_success = None  # and of the latest one that went into service
+        self._stamp = self.fingerprint()
+        self._pending = None
+        self._lock = threading.Lock()  # one reload at a time
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def fingerprint(self):
+        return file_stamp(list(self.watch_paths()) + [TRIGGER_FILE])
+
+    def reload(self, reason="requested"):
+        """Builds, checks and swaps in a new snapshot; returns the report (report["ok"] is False on failure)."""
+        with self._lock:
+            # Taken first: files replaced while this runs are picked up by the next poll
+            stamp = self.fingerprint()
+            report = {"reason": reason, "started_at": time.time()}
+            gc.collect()  # so that garbage freed during the build does not hide the new models
+            rss_before = _rss()
+            start = time.perf_counter()
+            try:
+                snapshot = self.build()
+                built = time.perf_counter()
+                self.check(snapshot)
+                checked = time.perf_counter()
+            except Exception as e:
+                # The files stay broken until they change again; no point retrying them every poll
+                self._stamp = stamp
+                self.failures += 1
+                report.update(ok=False, error=str(e), generation=self.registry.generation)
+                self.last = report
+                print(f"Model reload ({reason}) failed, keeping the current models: {e}")
+                return report
+            rss_peak = _rss()  # old and new snapshot side by side
+
+            swap_start = time.perf_counter()
+            previous = self.registry.swap(snapshot)
+            swap_seconds = time.perf_counter() - swap_start
+            self._stamp = stamp
+            if self.on_swap is not None:
+                self.on_swap(snapshot, previous)
+            # Freed here unless a request in flight still holds it
+            del previous, snapshot
+            gc.collect()
+            rss_after = _rss()
+
+            self.reloads += 1
+            report.update(
+                ok=True, generation=self.registry.generation,
+                build_seconds=round(built - start, 6), check_seconds=round(checked - built, 6),
+                swap_seconds=round(swap_seconds, 9), total_seconds=round(time.perf_counter() - start, 6),
+                rss_before=rss_before, rss_peak=rss_peak, rss_after=rss_after, overlap_bytes=rss_peak - rss_before,
+            )
+            self.last = self.last_success = report
+            print(f"Models reloaded ({reason}): generation {report['generation']}, "
+                  f"build {report['build_seconds']:.3f}s, check {report['check_seconds']:.3f}s, "
+                  f"swap {swap_seconds * 1e6:.1f}us, overlap {report['overlap_bytes'] / 2**20:.1f}MB")
+            return report
+
+    def poll(self):
+        """Reloads if the watched files changed and have stayed unchanged since the previous poll."""
+        stamp = self.fingerprint()
+        if stamp == self._stamp:
+            self._pending = None
+            return None
+        if stamp != self._pending:
+            self._pending = stamp  # still being written, maybe; look again next time
+            return None
+        self._pending = None
+        return self.reload("artifacts changed")
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Model watcher: {e}")
+
+    def start(self):
+        """Starts this process's watcher thread, once per pid (a forked worker starts its own)."""
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    threading.Thread(target=self._watch, name="model-watcher", daemon=True).start()
+                    self._pid = os.getpid()
+
+    def stats(self):
+        return {"watching": self._pid == os.getpid(), "interval_seconds": self.interval,
+                "generation": self.registry.generation, "reloads": self.reloads,
+                "failures": self.failures, "last": self.last}
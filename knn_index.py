@@ -0,0 +1,125 @@
+"""Exact k-nearest-neighbour search over a KD-tree stored as flat arrays.
+
+The tree is a complete binary tree in heap order (children of node i are
+2i+1 and 2i+2) built by median splits on the widest dimension, so it needs
+no pointers. The training points are reordered so every node covers one
+contiguous slice [node_start, node_end), and each node keeps its bounding
+box. All of it is plain arrays that model_store can memory-map.
+"""
+import math
+
+import numpy as np
+
+
+def build_index(points, positive, leaf_size=64):
+    """Builds the KD-tree; returns the arrays for a model bundle and the tree depth."""
+    points = np.asarray(points, dtype=np.float64)
+    n, d = points.shape
+    depth = max(0, math.ceil(math.log2(max(n, 1) / leaf_size)))
+    n_nodes = 2 ** (depth + 1) - 1
+    n_internal = 2 ** depth - 1
+
+    order = np.arange(n)
+    node_start = np.zeros(n_nodes, dtype=np.int64)
+    node_end = np.zeros(n_nodes, dtype=np.int64)
+    node_lo = np.full((n_nodes, d), np.inf)
+    node_hi = np.full((n_nodes, d), -np.inf)
+    node_end[0] = n
+
+    for node in range(n_nodes):
+        start, end = node_start[node], node_end[node]
+        if end <= start:
+            continue
+        idx = order[start:end]
+        pts = points[idx]
+        node_lo[node] = pts.min(axis=0)
+        node_hi[node] = pts.max(axis=0)
+        if node < n_internal:
+            half = (end - start) // 2
+            if half > 0:
+                dim = int(np.argmax(node_hi[node] - node_lo[node]))
+                order[start:end] = idx[np.argpartition(pts[:, dim], half)]
+            left, right = 2 * node + 1, 2 * node + 2
+            node_start[left], node_end[left] = start, start + half
+            node_start[right], node_end[right] = start + half, end
+
+    arrays = {
+        "points": points[order],
+        "positive": np.asarray(positive, dtype=np.float64)[order],
+        "node_start": node_start,
+        "node_end": node_end,
+        "node_lo": node_lo,
+        "node_hi": node_hi,
+    }
+    return arrays, depth
+
+
+def query(q, k, arrays, depth, max_leaves=None, group=8):
+    """Indices (into arrays["points"]) of the k nearest neighbours of one point q.
+
+    Leaves are scanned in order of the distance from q to their bounding box,
+    a few at a time, and the scan stops as soon as the next box cannot hold a
+    point as close as the current k-th neighbour, so the result is exact; among
+    equal distances the lower index wins.
+    max_leaves lets a caller stop earlier still, trading exactness for a
+    latency bound.
+    """
+    points = arrays["points"]
+    first_leaf = 2 ** depth - 1
+    leaf_start = arrays["node_start"][first_leaf:]
+    leaf_end = arrays["node_end"][first_leaf:]
+    gap = np.maximum(arrays["node_lo"][first_leaf:] - q, 0) + np.maximum(q - arrays["node_hi"][first_leaf:], 0)
+    bounds = np.einsum("ij,ij->i", gap, gap)
+    leaf_order = np.argsort(bounds)
+    if max_leaves is not None:
+        leaf_order = leaf_order[:max_leaves]
+
+    best_dist = np.full(k, np.inf)
+    best_idx = np.full(k, -1, dtype=np.int64)
+    kth = np.inf
+    for pos in range(0, len(leaf_order), group):
+        leaves = leaf_order[pos:pos + group]
+        # <= rather than <: a box at exactly the k-th distance may hold a tied point with a lower index
+        leaves = leaves[bounds[leaves] <= kth]
+        if leaves.size == 0:
+            break
+        idx = np.concatenate([np.arange(leaf_start[leaf], leaf_end[leaf]) for leaf in leaves])
+        diff = points[idx] - q
+        cand_dist = np.concatenate((best_dist, np.einsum("ij,ij->i", diff, diff)))
+        cand_idx = np.concatenate((best_idx, idx))
+        # Nearest first, ties to the lower index, so the result does not depend on the scan order
+        keep = np.lexsort((cand_idx, cand_dist))[:k]
+        best_dist, best_idx = cand_dist[keep], cand_idx[keep]
+        kth = best_dist.max()
+    return best_idx
+
+
+def build_groups(points, max_levels=4, max_groups=1024):
+    """Groups the points by their values on the few-valued (categorical) dimensions.
+
+    Once scaled, two categories of a feature such as smoke or cholesterol lie
+    further apart than most k-th neighbour distances, so a query's neighbours
+    nearly always share its categories. Each group's points are copied into
+    one contiguous block, ordered by their original index, and every group
+    records its category values: the squared distance from a query to those
+    values is a lower bound on its distance to any point of the group.
+    Returns {} when no dimension has at most max_levels values or there
+    would be more than max_groups groups.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    dims = [d for d in range(points.shape[1]) if len(np.unique(points[:, d])) <= max_levels]
+    if not dims:
+        return {}
+    levels, group_of = np.unique(points[:, dims], axis=0, return_inverse=True)
+    if len(levels) > max_groups:
+        return {}
+    members = np.argsort(group_of.ravel(), kind="stable")  # stable: ascending index within a group
+    grouped = points[members]
+    return {
+        "group_dims": np.array(dims, dtype=np.int64),
+        "group_levels": levels,
+        "group_start": np.concatenate(([0], np.cumsum(np.bincount(group_of.ravel(), minlength=len(levels))))),
+        "group_members": members,
+        "group_points": grouped,
+        "group_sq_norms": np.einsum("ij,ij->i", grouped, grouped),
+    }
@@ -0,0 +1,119 @@
+"""The metrics manifest written by train_models.py and read by the apps.
+
+models_manifest.json describes the run that produced the model files. For
+each model it records the test-set accuracy, precision, recall, F1 and ROC
+AUC, a downsampled ROC curve, the confusion matrix, the coefficients (linear
+models) or feature importances (trees), and fit/predict timings. ai_app1
+reads it at import and after each model reload and serves the numbers from
+memory. When the file is missing or has another version, it falls back to
+its built-in figures. test_scores() and stats_from_scores() are shared with
+temp_cardio_whole_app.py, which records the same figures for its own model.
+"""
+import json
+import os
+import tempfile
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_FILE = "models_manifest.json"
+MANIFEST_PATH = os.path.join(BASE_DIR, MANIFEST_FILE)
+# Bump when the manifest layout changes; a manifest of another version is ignored
+MANIFEST_VERSION = 2
+
+# Points kept from each ROC curve (evenly spaced false-positive rates)
+ROC_POINTS = 51
+
+# Display names for the FEATURE_COLUMNS of ensemble.py
+FEATURE_LABELS = {
+    "gender": "Gender", "height": "Height", "weight": "Weight", "ap_hi": "Systolic BP",
+    "ap_lo": "Diastolic BP", "cholesterol": "Cholesterol", "gluc": "Glucose", "smoke": "Smoking",
+    "alco": "Alcohol", "active": "Physical Activity", "age_years": "Age", "BMI": "BMI",
+    "pulse_pressure": "Pulse Pressure",
+}
+
+# The logistic curve drawn on the model-stats page; it never changes, so it is computed once
+SIGMOID_X = np.round(np.linspace(-6, 6, 40), 1).tolist()
+SIGMOID_Y = (1 / (1 + np.exp(-np.linspace(-6, 6, 40)))).tolist()
+
+
+def roc_points(fpr, tpr, n=ROC_POINTS):
+    """Resamples a ROC curve at n evenly spaced false-positive rates."""
+    grid = np.linspace(0.0, 1.0, n)
+    return {"fpr": np.round(grid, 4).tolist(), "tpr": np.round(np.interp(grid, fpr, tpr), 4).tolist()}
+
+
+def write_manifest(manifest, path=MANIFEST_PATH):
+    """Writes the manifest via a temp file + rename, so readers never see half of it."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Returns the manifest, or None when it is missing, unreadable or of another version."""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Could not read {path} ({e}); using built-in model metrics")
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        print(f"{path} has version {manifest.get('version')}, expected {MANIFEST_VERSION}; "
+              f"using built-in model metrics")
+        return None
+    return manifest
+
+
+def model_data(models, manifest):
+    """models (dicts with id, acc, prec, rec, f1 in percent) with the manifest's test scores filled in."""
+    trained = (manifest or {}).get("models", {})
+    table = []
+    for m in models:
+        scores = trained.get(m["id"], {}).get("metrics")
+        if scores:
+            m = dict(m, acc=round(scores["accuracy"] * 100, 2), prec=round(scores["precision"] * 100, 1),
+                     rec=round(scores["recall"] * 100, 1), f1=round(scores["f1"] * 100, 1))
+        table.append(m)
+    return table
+
+
+def test_scores(y_test, pred, proba, weights):
+    """The test-set scores train_models.py records per model; weights is {"coefficients": {...}} or similar."""
+    from sklearn import metrics
+    fpr, tpr, _ = metrics.roc_curve(y_test, proba)
+    return {
+        "accuracy": float(metrics.accuracy_score(y_test, pred)),
+        "precision": float(metrics.precision_score(y_test, pred)),
+        "recall": float(metrics.recall_score(y_test, pred)),
+        "f1": float(metrics.f1_score(y_test, pred)),
+        "roc_auc": float(metrics.roc_auc_score(y_test, proba)),
+        "confusion_matrix": metrics.confusion_matrix(y_test, pred).tolist(),
+        "roc": roc_points(fpr, tpr),
+        **weights,
+    }
+
+
+def stats_from_scores(scores):
+    """Scores, confusion counts, ROC curve and feature weights of one model (see test_scores()), ready for a stats page."""
+    (tn, fp), (fn, tp) = scores["confusion_matrix"]
+    weights = scores.get("coefficients") or scores.get("feature_importances") or {}
+    return {
+        "accuracy": round(scores["accuracy"] * 100, 2),
+        "precision": scores["precision"],
+        "recall": scores["recall"],
+        "f1": scores["f1"],
+        "roc_auc": scores["roc_auc"],
+        "roc": scores.get("roc"),
+        "tn": tn, "fp": fp, "fn": fn, "tp": tp,
+        "features": [FEATURE_LABELS.get(name, name) for name in weights],
+        "weights": [round(w, 4) for w in weights.values()],
+        "weight_kind": "coefficients" if "coefficients" in scores else "feature importances",
+    }
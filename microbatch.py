@@ -0,0 +1,119 @@
+"""Micro-batching of concurrent single-row predictions.
+
+Every model call has a fixed cost (Python dispatch, NumPy setup, one scaler
+pass) on top of its per-row work, so scoring 32 rows at once costs little
+more than scoring one. When several threads of one process are scoring
+(asgi.py's pool, gunicorn gthread workers), the MicroBatcher takes their
+rows off a queue, stacks them, runs EnsembleEngine.predict_proba once, and
+hands each caller its own column.
+
+A batch closes when it has max_rows rows or max_wait_ms after its first row
+arrived, whichever comes first. The window only applies under load, that is
+when the previous batch held more than one row; an idle process scores a
+lone request at once instead of waiting for company.
+
+    HEARTMATE_MICROBATCH=1            turn it on (ai_app1)
+    HEARTMATE_MICROBATCH_ROWS=64      rows per batch at most
+    HEARTMATE_MICROBATCH_WAIT_MS=2    window for collecting a batch
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from telemetry import Histogram
+
+ENABLED = os.environ.get("HEARTMATE_MICROBATCH", "0") == "1"
+MAX_ROWS = int(os.environ.get("HEARTMATE_MICROBATCH_ROWS", "64"))
+MAX_WAIT_MS = float(os.environ.get("HEARTMATE_MICROBATCH_WAIT_MS", "2"))
+
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+DELAY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+class MicroBatcher:
+    """Scores rows submitted by many threads in shared batches on one scheduler thread."""
+
+    def __init__(self, engine, max_rows=MAX_ROWS, max_wait_ms=MAX_WAIT_MS):
+        self.engine = engine
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self.batch_size = Histogram(BATCH_BUCKETS)
+        self.queue_delay_ms = Histogram(DELAY_BUCKETS_MS)
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_thread(self):
+        # Started on first use, so a gunicorn master that forks workers never owns it;
+        # a forked child notices the pid change and starts its own
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.SimpleQueue()
+                    self._thread = threading.Thread(target=self._run, name="microbatch", daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+    def predict_proba(self, row, model_set=None):
+        """(n_models, 1) probabilities for one (1, n_features) row, scored in a shared batch.
+
+        model_set pins the models (an ensemble.ModelSet), so a row queued
+        just before a reload is still scored by the set its request started with.
+        """
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((time.perf_counter(), row, model_set or self.engine.ensure_loaded().current, future))
+        return future.result()
+
+    def _collect(self, under_load):
+        batch = [self._queue.get()]
+        deadline = batch[0][0] + self.max_wait
+        while len(batch) < self.max_rows:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if not under_load or remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        under_load = False
+        while True:
+            batch = self._collect(under_load)
+            under_load = len(batch) > 1
+            started = time.perf_counter()
+            for queued, _, _, _ in batch:
+                self.queue_delay_ms.observe((started - queued) * 1000)
+            self.batch_size.observe(len(batch))
+            # Normally one group; two only for a batch that straddles a model swap
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[2]), []).append(item)
+            for items in groups.values():
+                self._score(items)
+
+    def _score(self, items):
+        try:
+            probs = self.engine.predict_proba(np.vstack([row for _, row, _, _ in items]), items[0][2])
+        except Exception as e:
+            for _, _, _, future in items:
+                future.set_exception(e)
+            return
+        for i, (_, _, _, future) in enumerate(items):
+            future.set_result(probs[:, i:i + 1])
+
+    def stats(self):
+        return {"max_rows": self.max_rows, "max_wait_ms": self.max_wait * 1000,
+                "batch_size": self.batch_size.snapshot(), "queue_delay_ms": self.queue_delay_ms.snapshot()}
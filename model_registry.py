@@ -0,0 +1,72 @@
+"""Immutable model snapshots behind an atomically swappable reference.
+
+Request threads never see models half-loaded or half-replaced: everything
+a prediction needs is bundled into one snapshot object that is never
+modified after it is published. A reader takes the current snapshot once
+(registry.get(), a single attribute read) and uses only that for the rest
+of the request. A writer builds a complete new snapshot off to the side and
+publishes it with registry.swap(); requests already holding the old one
+finish with it, and later ones get the new one. No lock is taken on the
+read path, so gthread workers can run many request threads per process.
+"""
+import math
+import threading
+import time
+
+import numpy as np
+
+
+class Registry:
+    """Holds the current snapshot; get() to read it, swap() to replace it."""
+
+    def __init__(self, current=None):
+        self._current = current
+        self.generation = 0   # number of swaps so far
+        self.swapped_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        return self._current
+
+    def swap(self, snapshot):
+        """Publishes snapshot and returns the one it replaced."""
+        with self._lock:
+            previous, self._current = self._current, snapshot
+            self.generation += 1
+            self.swapped_at = time.time()
+        return previous
+
+
+def _frozen(values):
+    array = np.array(values, dtype=np.float64)
+    array.flags.writeable = False
+    return array
+
+
+class LogisticSnapshot:
+    """A fitted StandardScaler + LogisticRegression pair with its fast-path parameters.
+
+    The estimators are kept for the pandas reference path (predict_frame);
+    probability() needs only the read-only arrays. stats, if known, holds
+    the pair's test-set figures (metrics_manifest.stats_from_scores()).
+    """
+
+    def __init__(self, model, scaler, feature_columns, accuracy, stats=None):
+        self.model = model
+        self.scaler = scaler
+        self.feature_columns = tuple(feature_columns)
+        self.accuracy = accuracy
+        self.stats = stats
+        self.mean = _frozen(scaler.mean_)
+        self.scale = _frozen(scaler.scale_)
+        self.coef = _frozen(model.coef_[0])
+        self.intercept = float(model.intercept_[0])
+
+    def probability(self, row):
+        """P(class 1) for one unscaled row in feature_columns order."""
+        z = float(np.dot((row - self.mean) / self.scale, self.coef)) + self.intercept
+        # Numerically stable logistic sigmoid
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from artifacts import file_digest
+
+# Bump when the on-disk layout changes; older bundles are then recompiled
+FORMAT_VERSION = 3
+META_FILE = "meta.json"
+
+
+def save_bundle(directory, arrays, meta):
+    """Writes a model bundle: one .npy file per array plus meta.json.
+
+    .npy files are uncompressed with a 64-byte aligned header, so load_bundle
+    can memory-map them and every process reading the same bundle shares the
+    pages through the OS page cache. The bundle is written into a temp
+    directory and renamed into place, so readers never see a partial bundle.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".bundle-")
+    try:
+        shapes = {}
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            np.save(os.path.join(tmp_dir, f"{key}.npy"), array, allow_pickle=False)
+            shapes[key] = {"dtype": array.dtype.str, "shape": list(array.shape)}
+        meta = dict(meta, format=FORMAT_VERSION, arrays=shapes)
+        with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+            json.dump(meta, f, indent=2, sort_keys=True)
+        os.chmod(tmp_dir, 0o755)
+
+        old_dir = None
+        if os.path.exists(directory):
+            old_dir = tempfile.mkdtemp(dir=parent, prefix=".old-")
+            os.rmdir(old_dir)
+            os.replace(directory, old_dir)
+        os.replace(tmp_dir, directory)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    finally:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def read_meta(directory):
+    """Returns the bundle's meta.json, or None if there is no usable bundle."""
+    try:
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("format") == FORMAT_VERSION else None
+
+
+def sources_current(meta, base_dir, required=()):
+    """True if every file in meta["sources"] still has its recorded digest and all required files are listed."""
+    sources = meta.get("sources") or {}
+    if any(f not in sources for f in required):
+        return False
+    try:
+        return all(file_digest(os.path.join(base_dir, f)) == digest for f, digest in sources.items())
+    except OSError:
+        return False
+
+
+def load_bundle(directory, mmap=True):
+    """Loads (arrays, meta) from a bundle; arrays are read-only memory maps unless mmap=False."""
+    meta = read_meta(directory)
+    if meta is None:
+        raise FileNotFoundError(f"no model bundle in {directory}")
+    arrays = {}
+    for key, spec in meta["arrays"].items():
+        use_mmap = mmap and int(np.prod(spec["shape"])) > 0  # empty files cannot be mapped
+        array = np.load(os.path.join(directory, f"{key}.npy"), mmap_mode="r" if use_mmap else None,
+                        allow_pickle=False)
+        if array.dtype.str != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise ValueError(f"{directory}/{key}.npy does not match meta.json")
+        arrays[key] = array
+    return arrays, meta
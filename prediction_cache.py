@@ -0,0 +1,161 @@
+"""Caches ensemble predictions per canonical input vector.
+
+Form inputs are few and small integers (age in years, 1-3 levels, 0/1
+flags, whole mmHg, cm and kg), and refreshes and "Restart Analysis" resubmit
+the same form, so the same input vector arrives again and again. The key is
+the raw inputs as floats in RAW_COLUMNS order, with the form defaults filled
+in. "55", 55 and 55.0 give the same key, and BMI and pulse pressure need no
+place in it because they are derived from the rest. The key also includes
+the engine's model version, so a cached answer never outlives the models
+that produced it.
+
+PredictionCache is a bounded LRU with a time-to-live, private to the
+process. When HEARTMATE_CACHE_SHARED names a file, a SharedCache (SQLite,
+a local stand-in for Redis) sits behind it: every gunicorn worker reads and
+fills the same table, so a form answered by one worker is a hit on all
+of them.
+
+    HEARTMATE_CACHE_SIZE=4096     entries per process (0 disables the cache)
+    HEARTMATE_CACHE_TTL=3600      seconds an answer stays valid
+    HEARTMATE_CACHE_SHARED=path   SQLite file shared by the workers
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_SIZE = int(os.environ.get("HEARTMATE_CACHE_SIZE", "4096"))
+CACHE_TTL = float(os.environ.get("HEARTMATE_CACHE_TTL", "3600"))
+CACHE_SHARED = os.environ.get("HEARTMATE_CACHE_SHARED")
+
+
+def record_key(record, columns, defaults, version=""):
+    """Canonical key of one record: version plus the float value of each column."""
+    values = []
+    for col in columns:
+        value = record.get(col, defaults.get(col))
+        if value is None:
+            raise KeyError(f"missing column '{col}'")
+        values.append(repr(float(value) + 0.0))  # + 0.0 folds -0.0 into 0.0
+    return version + ":" + ",".join(values)
+
+
+class SharedCache:
+    """Key -> JSON value table in SQLite, shared by every process that opens the same file.
+
+    Entries expire after ttl seconds. Past maxsize rows, the least recently
+    stored ones are deleted, checked every PRUNE_EVERY writes.
+    """
+    PRUNE_EVERY = 256
+
+    def __init__(self, path, ttl=CACHE_TTL, maxsize=65536):
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self._writes = 0
+        self._conn().execute("CREATE TABLE IF NOT EXISTS predictions "
+                             "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)")
+
+    def _conn(self):
+        # One connection per thread; after a fork the child opens its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute("SELECT value, expires FROM predictions WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                     (key, json.dumps(value), time.time() + self.ttl))
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM predictions WHERE expires < ?", (time.time(),))
+            conn.execute("DELETE FROM predictions WHERE rowid IN (SELECT rowid FROM predictions "
+                         "ORDER BY expires LIMIT max(0, (SELECT count(*) FROM predictions) - ?))",
+                         (self.maxsize,))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM predictions")
+
+
+class PredictionCache:
+    """Thread-safe LRU of prediction results with a TTL, optionally backed by a SharedCache."""
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL, shared=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared
+        self._entries = OrderedDict()  # key -> (expires, value)
+        self._lock = threading.Lock()
+        self.hits = self.shared_hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+        value = self.shared.get(key) if self.shared is not None else None
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        self._store(key, value)
+        with self._lock:
+            self.shared_hits += 1
+        return value
+
+    def put(self, key, value):
+        self._store(key, value)
+        if self.shared is not None:
+            self.shared.put(key, value)
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "size": len(self._entries), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "shared_hits": self.shared_hits, "misses": self.misses,
+                "evictions": self.evictions, "expirations": self.expirations,
+                "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+                "shared": self.shared.path if self.shared is not None else None,
+            }
+
+
+def from_env():
+    """The cache configured by the HEARTMATE_CACHE_* variables, or None when it is disabled."""
+    if CACHE_SIZE <= 0:
+        return None
+    shared = SharedCache(CACHE_SHARED, CACHE_TTL) if CACHE_SHARED else None
+    return PredictionCache(CACHE_SIZE, CACHE_TTL, shared)
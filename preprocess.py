@@ -0,0 +1,225 @@
+"""Streaming version of cardio_preprocess1.ipynb: cardio_train.csv -> cardio_train_cleaned.csv.
+
+    python preprocess.py                                  # the files in this folder
+    python preprocess.py raw.csv cleaned.csv --chunksize 200000
+
+Same steps as the notebook, applied one chunk of rows at a time:
+1. drop `id` and de-duplicate the remaining columns (first occurrence wins)
+2. age_years = int(age / 365), replacing `age`
+3. fill missing values with the column mean
+4. drop rows with ap_lo > ap_hi
+5. add BMI and pulse_pressure
+
+Duplicates are found through 128-bit row hashes kept in a DigestSet, so
+memory is one chunk plus 16 bytes per distinct row, not the whole file. The
+output is byte-identical to the notebook's: a column is written as int64
+or float64 exactly as pd.read_csv would have inferred it for the whole file.
+
+The pipeline makes one pass when it can. Two cases need a second pass:
+- a later chunk turns an integer column into a float
+- a value is missing, so the fill needs the mean of the whole column
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RAW_FILE = os.path.join(BASE_DIR, "cardio_train.csv")
+CLEAN_FILE = os.path.join(BASE_DIR, "cardio_train_cleaned.csv")
+CHUNK_ROWS = 100_000
+
+
+class DigestSet:
+    """A set of 128-bit digests held as (hi, lo) uint64 runs sorted by hi.
+
+    New digests form a new run, and runs of similar size are merged
+    (like a binary counter), so inserting n digests costs O(n log n)
+    and lookups search a handful of sorted arrays.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(hi) for hi, _ in self.runs)
+
+    def _seen(self, hi, lo):
+        """Membership mask for digests sorted by hi (sorted needles keep the searches cache-friendly)."""
+        seen = np.zeros(len(hi), dtype=bool)
+        for run_hi, run_lo in self.runs:
+            start = np.searchsorted(run_hi, hi)
+            pos = np.minimum(start, len(run_hi) - 1)
+            match = run_hi[pos] == hi
+            seen |= match & (run_lo[pos] == lo)
+            # Distinct digests almost never share a hi word; check the rest of such ranges one by one
+            after = np.minimum(start + 1, len(run_hi) - 1)
+            for i in np.flatnonzero(match & (start + 1 < len(run_hi)) & (run_hi[after] == hi)):
+                stop = np.searchsorted(run_hi, hi[i], side="right")
+                seen[i] |= bool((run_lo[start[i]:stop] == lo[i]).any())
+        return seen
+
+    def add_new(self, digests):
+        """Adds an (n, 2) uint64 digest array; returns the mask of rows not seen before.
+
+        Within digests, only the first occurrence of a repeated row counts as new.
+        """
+        hi, lo = digests[:, 0], digests[:, 1]
+        order = np.lexsort((np.arange(len(hi)), lo, hi))
+        repeat = np.zeros(len(hi), dtype=bool)
+        repeat[order[1:]] = (hi[order[1:]] == hi[order[:-1]]) & (lo[order[1:]] == lo[order[:-1]])
+        new = ~repeat
+        new[order] &= ~self._seen(hi[order], lo[order])
+
+        if new.any():
+            # Runs only need to be sorted by hi; lookups compare lo within equal-hi ranges
+            run_hi, run_lo = hi[new], lo[new]
+            run_order = np.argsort(run_hi, kind="stable")
+            self.runs.append((run_hi[run_order], run_lo[run_order]))
+            while len(self.runs) > 1 and len(self.runs[-2][0]) <= 2 * len(self.runs[-1][0]):
+                (hi_a, lo_a), (hi_b, lo_b) = self.runs.pop(), self.runs.pop()
+                merged_hi = np.concatenate((hi_b, hi_a))
+                # Timsort finds the two sorted runs and merges them in linear time
+                merged = np.argsort(merged_hi, kind="stable")
+                self.runs.append((merged_hi[merged], np.concatenate((lo_b, lo_a))[merged]))
+        return new
+
+
+def _mix64(x):
+    """splitmix64's finaliser, a bijective mix of uint64 arrays (wrapping arithmetic)."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def row_digests(frame):
+    """(n, 2) uint64 digests of each row's values (NaN and -0.0 canonicalised).
+
+    Two independently seeded lanes fold the columns' bit patterns through
+    _mix64, giving a 128-bit hash computed a column at a time in NumPy.
+    """
+    values = frame.to_numpy(dtype=np.float64) + 0.0
+    values[np.isnan(values)] = np.nan
+    bits = values.view(np.uint64)
+    digests = np.empty((len(values), 2), dtype=np.uint64)
+    for lane, seed in enumerate((0x9E3779B97F4A7C15, 0xD1B54A32D192ED03)):
+        seed = np.uint64(seed)
+        h = np.full(len(values), seed, dtype=np.uint64)
+        for column in bits.T:
+            h = _mix64((h * np.uint64(31)) ^ _mix64(column ^ seed))
+        digests[:, lane] = h
+    return digests
+
+
+def clean_chunk(chunk, digests, fill=None):
+    """Applies the notebook's steps to one chunk; fill maps column -> value for missing cells."""
+    chunk = chunk.drop(columns=["id"])
+    chunk = chunk[digests.add_new(row_digests(chunk))]
+
+    if chunk["age"].isna().any():
+        raise ValueError("rows without an age cannot be converted to age_years")
+    chunk["age_years"] = (chunk["age"] / 365).astype(int)
+    chunk = chunk.drop(columns=["age"])
+    if fill:
+        chunk = chunk.fillna(fill)
+
+    chunk = chunk[chunk["ap_lo"] <= chunk["ap_hi"]].copy()
+    chunk["BMI"] = chunk["weight"] / ((chunk["height"] / 100) ** 2)
+    chunk["pulse_pressure"] = chunk["ap_hi"] - chunk["ap_lo"]
+    return chunk
+
+
+def run_pass(raw_path, out_path, chunksize, dtypes=None, fill=None):
+    """One pass over raw_path, writing out_path.
+
+    Returns (stats, valid). valid is False when a later chunk turned an
+    integer column into a float, or when values were missing and no fill
+    values were given.
+    """
+    import pandas as pd
+
+    digests = DigestSet()
+    float_columns, missing = set(), False
+    stats = {"raw_rows": 0, "rows": 0}
+    valid = True
+
+    reader = pd.read_csv(raw_path, sep=";", chunksize=chunksize, dtype=dtypes)
+    with open(out_path, "w", newline="") as out:
+        for i, chunk in enumerate(reader):
+            first = i == 0
+            for column, dtype in chunk.dtypes.items():
+                if dtype.kind == "f" and column not in float_columns:
+                    float_columns.add(column)
+                    valid &= first  # earlier chunks already wrote this column as integers
+            if chunk.isna().any().any():
+                missing = True
+                valid &= fill is not None
+            stats["raw_rows"] += len(chunk)
+
+            cleaned = clean_chunk(chunk, digests, fill)
+            for column in float_columns & set(cleaned.columns):
+                cleaned[column] = cleaned[column].astype(np.float64)
+            cleaned.to_csv(out, header=first, index=False)
+            stats["rows"] += len(cleaned)
+
+    stats.update(distinct_rows=len(digests), float_columns=sorted(float_columns), missing=missing)
+    return stats, valid
+
+
+def column_means(raw_path, chunksize, dtypes):
+    """Column means over the de-duplicated rows, as the notebook's fillna uses them."""
+    import pandas as pd
+
+    digests = DigestSet()
+    sums, counts = {}, {}
+    for chunk in pd.read_csv(raw_path, sep=";", chunksize=chunksize, dtype=dtypes):
+        chunk = chunk.drop(columns=["id"])
+        chunk = chunk[digests.add_new(row_digests(chunk))]
+        chunk["age_years"] = (chunk["age"] / 365).astype(int)
+        chunk = chunk.drop(columns=["age"])
+        for column in chunk.columns:
+            sums[column] = sums.get(column, 0.0) + float(chunk[column].sum())
+            counts[column] = counts.get(column, 0) + int(chunk[column].count())
+    return {column: sums[column] / counts[column] for column in sums if counts[column]}
+
+
+def preprocess(raw_path=RAW_FILE, out_path=CLEAN_FILE, chunksize=CHUNK_ROWS):
+    """Cleans raw_path into out_path (replaced atomically); returns a stats dict."""
+    start = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(out_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".csv.tmp")
+    os.close(fd)
+    try:
+        stats, valid = run_pass(raw_path, tmp_path, chunksize)
+        stats["passes"] = 1
+        if not valid:
+            dtypes = {column: np.float64 for column in stats["float_columns"]}
+            fill = column_means(raw_path, chunksize, dtypes) if stats["missing"] else None
+            stats, _ = run_pass(raw_path, tmp_path, chunksize, dtypes, fill)
+            stats["passes"] = 3 if fill else 2
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("raw", nargs="?", default=RAW_FILE)
+    parser.add_argument("out", nargs="?", default=CLEAN_FILE)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS, help="rows read per chunk")
+    args = parser.parse_args()
+
+    stats = preprocess(args.raw, args.out, args.chunksize)
+    print(f"{stats['raw_rows']:,} raw rows -> {stats['distinct_rows']:,} distinct -> "
+          f"{stats['rows']:,} written to {args.out} in {stats['seconds']}s ({stats['passes']} pass(es))")
+
+
+if __name__ == "__main__":
+    main()
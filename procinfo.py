@@ -0,0 +1,31 @@
+import os
+import resource
+
+# Fields reported by memory_info(), in bytes
+MEMORY_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def memory_info(pid="self"):
+    """Resident memory of a process, split into shared and private pages.
+
+    Reads /proc/<pid>/smaps_rollup (Linux). Pss is the fair share of pages
+    shared with other processes (e.g. forked gunicorn workers), so summing
+    Pss over the master and workers gives the real footprint. Elsewhere only
+    the peak RSS of the current process is available.
+    """
+    path = f"/proc/{pid}/smaps_rollup"
+    if not os.path.exists(path):
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return {"Rss": rss, "Pss": rss}
+
+    info = {}
+    with open(path) as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in MEMORY_FIELDS:
+                info[key] = int(value.split()[0]) * 1024
+    return info
+
+
+def format_memory(info):
+    return " ".join(f"{key.lower()}={info[key] / 2**20:.1f}MB" for key in MEMORY_FIELDS if key in info)
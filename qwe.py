@@ -1,79 +1,159 @@
 import os
 import numpy as np
-import pandas as pd
 from flask import Flask, request, render_template_string
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score
-from sklearn.datasets import make_classification
+
+import hot_reload
+from artifacts import artifact_path, load_or_train, load_saved
+from dataset import load_frame
+from model_registry import LogisticSnapshot, Registry
+from warmup import WARMUP_ROWS, synthetic_records
 
 # ================= MODEL LOGIC (ModelManager) =================
 
 class ModelManager:
+    """Shared by every request thread: the model lives in an immutable LogisticSnapshot
+    that train() replaces as a whole and predict() only ever reads."""
+
     def __init__(self):
-        self.model = None
-        self.scaler = None
-        self.accuracy = 0.0
-        self.feature_columns = []
-        self.coefs = []
+        self.registry = Registry()  # current LogisticSnapshot, None until a model is loaded
         self.is_synthetic = False
 
+    @property
+    def accuracy(self):
+        current = self.registry.get()
+        return current.accuracy if current is not None else 0.0
+
+    @property
+    def feature_columns(self):
+        current = self.registry.get()
+        return list(current.feature_columns) if current is not None else []
+
+    @property
+    def coefs(self):
+        current = self.registry.get()
+        return current.coef.tolist() if current is not None else []
+
+    # Hyperparameters are part of the artifact fingerprint: changing them retrains
+    ARTIFACT_NAME = "qwe_lr"
+    TRAIN_PARAMS = {"test_size": 0.3, "random_state": 0, "max_iter": 68766, "class_weight": "balanced"}
+
     def train(self):
+        """Loads the saved model, retraining only if the CSV or TRAIN_PARAMS changed."""
         file_path = "cardio_train_cleaned.csv"
         
-        if os.path.exists(file_path):
-            try:
-                df = pd.read_csv(file_path)
-                X = df.drop("cardio", axis=1)
-                y = df["cardio"]
-                self.feature_columns = X.columns.tolist()
-            except Exception as e:
-                self.create_synthetic_data()
-                return
-        else:
+        if not os.path.exists(file_path):
+            self.create_synthetic_data()
+            return
+        try:
+            state = load_or_train(self.ARTIFACT_NAME, file_path, self.TRAIN_PARAMS, lambda: self._fit(file_path))
+        except Exception as e:
+            print(f"Training error: {e}")
             self.create_synthetic_data()
             return
 
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=0)
+        self.registry.swap(LogisticSnapshot(state["model"], state["scaler"], state["feature_columns"],
+                                            state["accuracy"]))
+
+    def load_artifact(self):
+        """The snapshot of the saved artifact, e.g. one retrained by another process (hot_reload.py)."""
+        state = load_saved(self.ARTIFACT_NAME, self.TRAIN_PARAMS)
+        return LogisticSnapshot(state["model"], state["scaler"], state["feature_columns"], state["accuracy"])
+
+    def validate(self, snapshot, records):
+        """Scores records with snapshot; raises ValueError unless it fits the form and returns probabilities."""
+        current = self.registry.get()
+        # The synthetic fallback's columns say nothing about what the form sends
+        if current is not None and not self.is_synthetic \
+                and set(snapshot.feature_columns) != set(current.feature_columns):
+            raise ValueError(f"model expects columns {list(snapshot.feature_columns)}")
+        for record in records:
+            values = dict(record, BMI=record["weight"] / ((record["height"] / 100) ** 2),
+                          pulse_pressure=record["ap_hi"] - record["ap_lo"])
+            row = np.fromiter((values.get(col, 0) for col in snapshot.feature_columns), dtype=np.float64,
+                              count=len(snapshot.feature_columns))
+            prob = snapshot.probability(row)
+            if not 0.0 <= prob <= 1.0:
+                raise ValueError(f"model returned {prob} for a synthetic patient")
+
+    def _fit(self, file_path):
+        # Training-only imports: a warm start loads the saved model and never needs them
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.metrics import accuracy_score
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+
+        params = self.TRAIN_PARAMS
+        df = load_frame(file_path)
+        X = df.drop("cardio", axis=1)
+        y = df["cardio"]
 
-        self.scaler = StandardScaler()
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=params["test_size"], random_state=params["random_state"])
 
-        self.model = LogisticRegression(max_iter=68766, class_weight="balanced")
-        self.model.fit(X_train_scaled, y_train)
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+
+        model = LogisticRegression(max_iter=params["max_iter"], class_weight=params["class_weight"])
+        model.fit(X_train_scaled, y_train)
         
-        preds = self.model.predict(X_test_scaled)
-        self.accuracy = accuracy_score(y_test, preds) * 100
-        self.coefs = self.model.coef_[0].tolist()
+        preds = model.predict(X_test_scaled)
+        return {
+            "model": model,
+            "scaler": scaler,
+            "feature_columns": X.columns.tolist(),
+            "accuracy": accuracy_score(y_test, preds) * 100,
+        }
 
     def create_synthetic_data(self):
+        from sklearn.datasets import make_classification
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+
         self.is_synthetic = True
-        self.feature_columns = [
+        feature_columns = [
             "age_years", "gender", "height", "weight", "ap_hi", "ap_lo",
             "cholesterol", "gluc", "smoke", "alco", "active", "BMI", "pulse_pressure"
         ]
-        X, y = make_classification(n_samples=1000, n_features=len(self.feature_columns), random_state=0)
+        X, y = make_classification(n_samples=1000, n_features=len(feature_columns), random_state=0)
         
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2)
-        self.scaler = StandardScaler()
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        self.model = LogisticRegression()
-        self.model.fit(X_train_scaled, y_train)
-        self.accuracy = 86.42 
-        self.coefs = np.random.rand(len(self.feature_columns)).tolist()
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        model = LogisticRegression()
+        model.fit(X_train_scaled, y_train)
+        self.registry.swap(LogisticSnapshot(model, scaler, feature_columns, 86.42))
 
     def predict(self, input_data):
+        """Same probability as predict_frame(), computed with NumPy on a single preallocated row."""
+        current = self.registry.get()  # one snapshot for the whole call, even if a new one is swapped in
         try:
+            if current is None:
+                raise RuntimeError("no model loaded")
+            cols = current.feature_columns
+            row = np.fromiter((input_data.get(col, 0) for col in cols), dtype=np.float64, count=len(cols))
+            return current.probability(row)
+        except Exception as e:
+            print(f"Prediction error: {e}")
+            return 0.5
+
+    def predict_frame(self, input_data):
+        """Original pandas-based path, kept as the reference for benchmarks/bench_model_manager.py."""
+        import pandas as pd
+
+        current = self.registry.get()
+        try:
+            if current is None:
+                raise RuntimeError("no model loaded")
             df = pd.DataFrame([input_data])
-            for col in self.feature_columns:
+            for col in current.feature_columns:
                 if col not in df.columns:
                     df[col] = 0 
                     
-            df = df[self.feature_columns]
-            scaled_data = self.scaler.transform(df)
-            prob = self.model.predict_proba(scaled_data)[0][1]
+            df = df[list(current.feature_columns)]
+            scaled_data = current.scaler.transform(df)
+            prob = current.model.predict_proba(scaled_data)[0][1]
             return float(prob)
         except Exception as e:
             print(f"Prediction error: {e}")
@@ -249,5 +329,25 @@ def home():
             result = f"Input Error: {str(e)}"
 
     return render_template_string(HTML_TEMPLATE, result=result, acc=f"{manager.accuracy:.2f}")
+
+# Hot reload (hot_reload.py): an artifact retrained by another process replaces the model
+# without a restart; a reload that fails its checks keeps the current model in service
+def models_swapped(new, old):
+    # The saved artifact always holds a model trained on the real data
+    manager.is_synthetic = False
+
+reloader = hot_reload.Reloader(manager.registry, manager.load_artifact,
+                               lambda snapshot: manager.validate(snapshot, synthetic_records(WARMUP_ROWS)),
+                               lambda: [artifact_path(ModelManager.ARTIFACT_NAME)], on_swap=models_swapped)
+
+@app.before_request
+def start_model_watcher():
+    # Per worker, on its first request
+    if hot_reload.WATCH:
+        reloader.start()
+
+# Off unless HEARTMATE_ADMIN_TOKEN is set
+hot_reload.add_admin_route(app, reloader)
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""Precomputed ensemble probabilities over the predict form's input space.
+
+    python risk_grid.py                 # build, or rebuild if the models changed
+    python risk_grid.py --workers 4     # build the age slabs in parallel
+
+The ai_app1 form can only submit 73 ages, two genders, three cholesterol and
+three glucose levels and active 0/1 (smoke and alco keep their defaults of 0).
+Those axes are enumerated exactly. Systolic and diastolic pressure and BMI are
+bucketed into the grid nodes of AXES; a node's height is the median height of
+its gender in the dataset, and its weight is whatever gives its BMI. Every
+model's P(cardio=1) at every node is stored as a uint16 fraction of 65535 in
+a model_store bundle under artifacts/risk_grid/, memory-mapped by every worker.
+
+Modes (HEARTMATE_RISK_GRID):
+- exact (default): the table is not used; every request runs the live models
+- nearest: the probabilities of the nearest node, one array index
+- interpolate: trilinear interpolation between the 8 surrounding nodes
+
+Both table modes are approximations: a record's height is taken at the
+reference height and its BP and BMI between nodes. A record outside the grid,
+or with inputs the form does not produce, is always scored by the live models.
+The table records the model version it was built from and is ignored once
+the models change.
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from artifacts import ARTIFACT_DIR
+from model_store import load_bundle, read_meta, save_bundle
+
+GRID_DIR = os.path.join(ARTIFACT_DIR, "risk_grid")
+GRID_MODE = os.environ.get("HEARTMATE_RISK_GRID", "exact")
+MODES = ("exact", "nearest", "interpolate")
+
+# column -> (first node, step, number of nodes), in table axis order. The first
+# five are exact: a record must sit on one of their nodes. The rest are bucketed.
+AXES = {
+    "age_years": (18, 1, 73),
+    "gender": (1, 1, 2),
+    "cholesterol": (1, 1, 3),
+    "gluc": (1, 1, 3),
+    "active": (0, 1, 2),
+    "ap_hi": (80, 10, 13),
+    "ap_lo": (50, 10, 8),
+    "BMI": (16, 2, 16),
+}
+EXACT_AXES = ("age_years", "gender", "cholesterol", "gluc", "active")
+# Inputs the form never sends; the table is built with these values
+FIXED = {"smoke": 0, "alco": 0}
+SCALE = 65535
+
+
+def axis_values(axis):
+    start, step, n = axis
+    return start + step * np.arange(n, dtype=np.float64)
+
+
+def reference_heights(data_path=None):
+    """Median height per gender in the cleaned dataset."""
+    from dataset import DATA_FILE, load_columns
+
+    columns = load_columns(data_path or DATA_FILE, ["gender", "height"])
+    return {int(g): float(np.median(columns["height"][columns["gender"] == g])) for g in (1, 2)}
+
+
+def slab_matrix(age, axes, heights):
+    """Raw feature rows of every node with age_years == age, in table order."""
+    from ensemble import feature_matrix
+
+    names = list(axes)[1:]
+    grids = np.meshgrid(*(axis_values(axes[name]) for name in names), indexing="ij")
+    columns = {name: grid.ravel() for name, grid in zip(names, grids)}
+    n_rows = columns["gender"].size
+    height = np.where(columns["gender"] == 1, heights[1], heights[2])
+    columns.update(age_years=np.full(n_rows, float(age)), height=height,
+                   weight=columns.pop("BMI") * (height / 100) ** 2, **FIXED)
+    return feature_matrix(columns, n_rows)
+
+
+_engine = None
+
+
+def _score_slab(age, axes, heights):
+    """Pool task: uint16 probabilities of one age slab, shape (..., n_models)."""
+    global _engine
+    if _engine is None:
+        from ensemble import EnsembleEngine
+        _engine = EnsembleEngine().load()
+    probs = _engine.predict_proba(slab_matrix(age, axes, heights))
+    shape = [axis[2] for axis in list(axes.values())[1:]] + [probs.shape[0]]
+    return np.rint(probs.T * SCALE).astype(np.uint16).reshape(shape)
+
+
+def build(engine, directory=GRID_DIR, axes=AXES, workers=1):
+    """Scores every node with engine's models and writes the table bundle; returns its directory."""
+    start = time.perf_counter()
+    heights = reference_heights()
+    ages = axis_values(axes["age_years"])
+    shape = [axis[2] for axis in axes.values()] + [len(engine.models)]
+    table = np.empty(shape, dtype=np.uint16)
+
+    if workers > 1:
+        # Workers load their own engine from the same compiled bundles (shared page cache)
+        with ProcessPoolExecutor(workers, mp_context=get_context("forkserver")) as pool:
+            for i, slab in enumerate(pool.map(_score_slab, ages, [axes] * len(ages), [heights] * len(ages))):
+                table[i] = slab
+    else:
+        global _engine
+        _engine = engine
+        for i, age in enumerate(ages):
+            table[i] = _score_slab(age, axes, heights)
+
+    meta = {
+        "kind": "risk_grid", "model_version": engine.version, "model_ids": engine.model_ids,
+        "axes": {name: list(axis) for name, axis in axes.items()}, "fixed": FIXED,
+        "reference_heights": heights, "scale": SCALE,
+        "build_seconds": round(time.perf_counter() - start, 3),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    save_bundle(directory, {"probs": table}, meta)
+    return directory
+
+
+class RiskGrid:
+    """Answers records from the table; lookup returns None for anything it cannot answer."""
+
+    def __init__(self, arrays, meta, mode="interpolate"):
+        if mode not in ("nearest", "interpolate"):
+            raise ValueError(f"unknown risk grid mode '{mode}'")
+        self.probs = arrays["probs"]
+        self.meta = meta
+        self.mode = mode
+        self.axes = {name: tuple(axis) for name, axis in meta["axes"].items()}
+        self.fixed = meta["fixed"]
+        self.defaults = dict(self.fixed, active=1)
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()  # request threads count hits and misses concurrently
+
+    def _position(self, name, value):
+        """Fractional node position of value along an axis, or None outside it."""
+        start, step, n = self.axes[name]
+        t = (value - start) / step
+        return t if 0 <= t <= n - 1 else None
+
+    def lookup(self, record):
+        """(n_models, 1) probabilities for record, or None if it must go to the live models."""
+        probs = self._lookup(record)
+        with self._lock:
+            if probs is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return probs
+
+    def _lookup(self, record):
+        """lookup() without the hit/miss counting."""
+        try:
+            values = {name: float(record.get(name, self.defaults.get(name))) for name in
+                      ("age_years", "gender", "cholesterol", "gluc", "active", "ap_hi", "ap_lo",
+                       "height", "weight", "smoke", "alco")}
+        except (TypeError, ValueError):
+            values = None
+        if values is None or any(values[name] != value for name, value in self.fixed.items()):
+            return None
+        values["BMI"] = values["weight"] / ((values["height"] / 100) ** 2)
+
+        index = []
+        for name in EXACT_AXES:
+            t = self._position(name, values[name])
+            if t is None or t != int(t):
+                return None
+            index.append(int(t))
+        positions = [self._position(name, values[name]) for name in ("ap_hi", "ap_lo", "BMI")]
+        if any(t is None for t in positions):
+            return None
+
+        cell = self.probs[tuple(index)]
+        if self.mode == "nearest":
+            probs = cell[tuple(int(t + 0.5) for t in positions)]
+            return (probs / SCALE)[:, None]
+
+        # Trilinear: weight the 8 corners of the surrounding box by their closeness
+        lower = [min(int(t), self.axes[name][2] - 2) for t, name in zip(positions, ("ap_hi", "ap_lo", "BMI"))]
+        frac = [t - low for t, low in zip(positions, lower)]
+        box = cell[lower[0]:lower[0] + 2, lower[1]:lower[1] + 2, lower[2]:lower[2] + 2].astype(np.float64)
+        for f in frac:
+            box = box[0] * (1 - f) + box[1] * f
+        return (box / SCALE)[:, None]
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {"mode": self.mode, "hits": hits, "misses": misses, "model_version": self.meta["model_version"]}
+
+
+def open_grid(engine, mode=GRID_MODE, directory=GRID_DIR):
+    """The table for engine's models (an EnsembleEngine or a ModelSet) in mode, or None (exact mode, no table or a stale one)."""
+    if mode == "exact":
+        return None
+    meta = read_meta(directory)
+    if meta is None:
+        print(f"No risk grid in {directory}; run risk_grid.py. Using the live models")
+        return None
+    if meta["model_version"] != engine.version or meta["model_ids"] != engine.model_ids:
+        print("Risk grid was built for other models; run risk_grid.py. Using the live models")
+        return None
+    arrays, meta = load_bundle(directory, mmap=True)
+    return RiskGrid(arrays, meta, mode)
+
+
+def main():
+    from ensemble import EnsembleEngine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1, help="processes scoring age slabs")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the table is current")
+    args = parser.parse_args()
+
+    engine = EnsembleEngine().load()
+    meta = read_meta(GRID_DIR)
+    if not args.force and meta is not None and meta["model_version"] == engine.version:
+        print(f"{GRID_DIR} is current")
+        return
+    n_nodes = int(np.prod([axis[2] for axis in AXES.values()]))
+    print(f"Scoring {n_nodes:,} nodes with {len(engine.models)} models...")
+    path = build(engine, GRID_DIR, workers=args.workers)
+    print(f"Wrote {path} in {read_meta(path)['build_seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
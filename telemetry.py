@@ -0,0 +1,140 @@
+"""Low-overhead histograms for the serving hot path, and their Prometheus exposition."""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from procinfo import memory_info
+
+
+class Histogram:
+    """Counts observations into fixed buckets (upper bounds, like Prometheus "le").
+
+    observe() is a bisect plus two additions under a lock, so it is cheap
+    enough to call per request and per stage.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def snapshot(self):
+        """{"count", "sum", "buckets": [[upper bound, cumulative count], ...]} with "+Inf" last."""
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative, running = [], 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            running += count
+            cumulative.append([bound, running])
+        return {"count": running, "sum": round(total, 6), "buckets": cumulative}
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None when empty or past the last bucket)."""
+        snap = self.snapshot()
+        if not snap["count"]:
+            return None
+        rank = q * snap["count"]
+        for bound, running in snap["buckets"]:
+            if running >= rank:
+                return None if bound == "+Inf" else bound
+        return None
+
+
+# Bucket bounds (ms) for per-stage timings: from a dict lookup to a slow model call
+STAGE_BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class StageTimings:
+    """One Histogram (ms) per named stage, created on first use."""
+
+    def __init__(self, buckets=STAGE_BUCKETS_MS):
+        self.buckets = buckets
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, ms):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, Histogram(self.buckets))
+        histogram.observe(ms)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self):
+        return {stage: histogram.snapshot() for stage, histogram in sorted(self.histograms.items())}
+
+
+# --- Prometheus text exposition (format 0.0.4) ---
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def _number(value):
+    if value == "+Inf":
+        return value
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsText:
+    """Collects metric families and renders them for a Prometheus scrape."""
+
+    def __init__(self):
+        self.lines = []
+        self._declared = set()
+
+    def _declare(self, name, kind, help):
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {name} {help}")
+            self.lines.append(f"# TYPE {name} {kind}")
+
+    def gauge(self, name, value, labels=None, help=""):
+        self._declare(name, "gauge", help)
+        self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def counter(self, name, value, labels=None, help=""):
+        name += "_total"
+        self._declare(name, "counter", help)
+        self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name, snapshot, labels=None, help="", scale=1.0):
+        """Adds a Histogram.snapshot(); scale converts its units (0.001 turns ms into seconds)."""
+        self._declare(name, "histogram", help)
+        labels = labels or {}
+        for bound, running in snapshot["buckets"]:
+            le = bound if bound == "+Inf" else round(bound * scale, 9)
+            self.lines.append(f"{name}_bucket{_labels(dict(labels, le=_number(le)))} {running}")
+        self.lines.append(f"{name}_sum{_labels(labels)} {_number(round(snapshot['sum'] * scale, 9))}")
+        self.lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+
+    def process_memory(self):
+        """Resident memory of this process (procinfo.memory_info), labelled with its pid."""
+        pid = os.getpid()
+        for kind, value in memory_info().items():
+            self.gauge("heartmate_process_memory_bytes", value, {"pid": pid, "kind": kind.lower()},
+                       "Memory of the worker process that answered the scrape")
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
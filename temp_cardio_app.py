@@ -1,34 +1,74 @@
 from flask import Flask, request
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score
+import numpy as np
+
+import hot_reload
+from artifacts import artifact_path, load_or_train, load_saved
+from dataset import load_frame
+from model_registry import LogisticSnapshot, Registry
+from warmup import WARMUP_ROWS, synthetic_records
 
 # ================= TRAIN MODEL =================
+# Trained once and cached under artifacts/; retrained only when the CSV or these params change
+
+DATA_FILE = "cardio_train_cleaned.csv"
+ARTIFACT_NAME = "temp_cardio_app_lr"
+TRAIN_PARAMS = {"test_size": 0.2, "random_state": 2, "max_iter": 5000, "class_weight": "balanced"}
+
+
+def train_model():
+    # Training-only imports: a warm start loads the saved model and never needs them
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    df = load_frame(DATA_FILE)
+
+    X = df.drop("cardio", axis=1)
+    y = df["cardio"]
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TRAIN_PARAMS["test_size"], random_state=TRAIN_PARAMS["random_state"]
+    )
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
 
-df = pd.read_csv("cardio_train_cleaned.csv")
+    model = LogisticRegression(
+        max_iter=TRAIN_PARAMS["max_iter"],
+        class_weight=TRAIN_PARAMS["class_weight"]
+    )
+    model.fit(X_train_scaled, y_train)
 
-X = df.drop("cardio", axis=1)
-y = df["cardio"]
+    accuracy = accuracy_score(y_test, model.predict(X_test_scaled)) * 100
+    return {"model": model, "scaler": scaler, "feature_columns": X.columns.tolist(), "accuracy": accuracy}
 
-feature_columns = X.columns.tolist()
 
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=2
-)
+def snapshot_of(state):
+    return LogisticSnapshot(state["model"], state["scaler"], state["feature_columns"], state["accuracy"])
 
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
 
-model = LogisticRegression(
-    max_iter=5000,
-    class_weight="balanced"
-)
-model.fit(X_train_scaled, y_train)
+def load_artifact():
+    """The snapshot of the saved artifact, e.g. one retrained by another process (hot_reload.py)"""
+    return snapshot_of(load_saved(ARTIFACT_NAME, TRAIN_PARAMS))
 
-accuracy = accuracy_score(y_test, model.predict(X_test_scaled)) * 100
+
+def validate(snapshot, records):
+    """Scores records with snapshot; raises ValueError unless it fits the form and returns probabilities"""
+    if set(snapshot.feature_columns) != set(registry.get().feature_columns):
+        raise ValueError(f"model expects columns {list(snapshot.feature_columns)}")
+    for record in records:
+        values = dict(record, BMI=record["weight"] / ((record["height"] / 100) ** 2),
+                      pulse_pressure=record["ap_hi"] - record["ap_lo"])
+        row = np.array([values[col] for col in snapshot.feature_columns], dtype=np.float64)
+        prob = snapshot.probability(row)
+        if not 0.0 <= prob <= 1.0:
+            raise ValueError(f"model returned {prob} for a synthetic patient")
+
+
+# The model, scaler, columns and accuracy are swapped as one snapshot, never one by one
+registry = Registry(snapshot_of(load_or_train(ARTIFACT_NAME, DATA_FILE, TRAIN_PARAMS, train_model)))
 
 # ================= FLASK APP =================
 
@@ -37,6 +77,7 @@ app = Flask(__name__)
 @app.route("/", methods=["GET", "POST"])
 def home():
     result = ""
+    current = registry.get()  # one snapshot for the whole request, even if a reload swaps in another
 
     if request.method == "POST":
         age_years = float(request.form["age_years"])
@@ -54,7 +95,7 @@ def home():
         bmi = weight / ((height / 100) ** 2)
         pulse_pressure = ap_hi - ap_lo
 
-        input_df = pd.DataFrame([{
+        values = {
             "age_years": age_years,
             "gender": gender,
             "height": height,
@@ -68,12 +109,11 @@ def home():
             "active": active,
             "BMI": bmi,
             "pulse_pressure": pulse_pressure
-        }])
-
-        input_df = input_df[feature_columns]
-        input_scaled = scaler.transform(input_df)
+        }
 
-        prob = model.predict_proba(input_scaled)[0][1]
+        # Same scaler and coefficients as sklearn, applied with NumPy: no DataFrame per request
+        row = np.array([values[col] for col in current.feature_columns], dtype=np.float64)
+        prob = current.probability(row)
 
         if prob >= 0.6:
             result = f"High Risk ({prob*100:.2f}%)"
@@ -174,11 +214,26 @@ def home():
 
 <!-- OUTPUT -->
 <h3>{result}</h3>
-<p>Model Accuracy: {accuracy:.2f}%</p>
+<p>Model Accuracy: {current.accuracy:.2f}%</p>
 
 </body>
 </html>
 """
 
+# Hot reload (hot_reload.py): an artifact retrained by another process replaces the model
+# without a restart; a reload that fails its checks keeps the current model in service
+reloader = hot_reload.Reloader(registry, load_artifact,
+                               lambda snapshot: validate(snapshot, synthetic_records(WARMUP_ROWS)),
+                               lambda: [artifact_path(ARTIFACT_NAME)])
+
+@app.before_request
+def start_model_watcher():
+    # Per worker, on its first request
+    if hot_reload.WATCH:
+        reloader.start()
+
+# Off unless HEARTMATE_ADMIN_TOKEN is set
+hot_reload.add_admin_route(app, reloader)
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -1,33 +1,70 @@
 import os
 import json
+import threading
+import time
 import numpy as np
-import pandas as pd
 from flask import Flask, request, render_template_string
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score
-from sklearn.datasets import make_classification
-import joblib
+
+import hot_reload
+from artifacts import artifact_path, load_or_train, load_saved
+from dataset import load_frame
+from metrics_manifest import SIGMOID_X, SIGMOID_Y, stats_from_scores, test_scores
+from model_registry import LogisticSnapshot, Registry
+from telemetry import PROMETHEUS_CONTENT_TYPE, MetricsText, StageTimings
+from warmup import WARMUP_ROWS, WarmUp, synthetic_records
 
 class ModelManager:
+    """Shared by every request thread: the model lives in an immutable LogisticSnapshot
+    that train() and warm_up() replace as a whole and predict() only ever reads."""
+
     def __init__(self):
-        self.model = None
-        self.scaler = None
-        self.accuracy = 0.0
-        self.feature_columns = []
-        self.model_path = 'cardio_model.pkl'
-        self.scaler_path = 'scaler.pkl'
+        self.registry = Registry()  # current LogisticSnapshot, None until a model is loaded
+        self.stages = StageTimings()  # ms per stage of predict() and the /predict route, served on /metrics
+        self.errors = 0  # predictions that failed and fell back to 0.5
+        self._errors_lock = threading.Lock()
+        self.load_seconds = 0.0
+
+    @property
+    def accuracy(self):
+        current = self.registry.get()
+        return current.accuracy if current is not None else 0.0
+
+    @property
+    def feature_columns(self):
+        current = self.registry.get()
+        return list(current.feature_columns) if current is not None else []
+
+    # Hyperparameters are part of the artifact fingerprint: changing them retrains
+    ARTIFACT_NAME = "temp_cardio_whole_app_lr"
+    TRAIN_PARAMS = {"test_size": 0.2, "random_state": 42, "max_iter": 2000, "solver": "liblinear"}
 
     def train(self):
-        """Unified training function to reach 75%+ accuracy"""
+        """Loads the saved model, retraining only if the CSV or TRAIN_PARAMS changed"""
         file_path = "cardio_train_cleaned.csv"
         
         if not os.path.exists(file_path):
             print("Data file not found!")
             return
 
-        df = pd.read_csv(file_path)
+        start = time.perf_counter()
+        state = load_or_train(self.ARTIFACT_NAME, file_path, self.TRAIN_PARAMS,
+                              lambda: self._fit(file_path))
+        self.registry.swap(LogisticSnapshot(state["model"], state["scaler"], state["feature_columns"],
+                                            state["accuracy"], state["stats"]))
+        self.load_seconds = time.perf_counter() - start
+        
+        print(f"Model ready! Accuracy: {self.accuracy:.2f}%")
+
+    def _fit(self, file_path):
+        """Unified training function to reach 75%+ accuracy"""
+        # Training-only imports: a warm start loads the saved model and never needs them
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.metrics import accuracy_score
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+
+        params = self.TRAIN_PARAMS
+        df = load_frame(file_path)
 
         # --- Feature Engineering for higher accuracy ---
         if 'BMI' not in df.columns:
@@ -37,34 +74,93 @@ class ModelManager:
 
         X = df.drop("cardio", axis=1)
         y = df["cardio"]
-        self.feature_columns = X.columns.tolist()
 
         # Split 80/20 for better stability
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=params["test_size"], random_state=params["random_state"])
 
-        self.scaler = StandardScaler()
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
 
         # Logistic Regression with improved parameters
-        self.model = LogisticRegression(max_iter=2000, solver='liblinear')
-        self.model.fit(X_train_scaled, y_train)
-        
-        preds = self.model.predict(X_test_scaled)
-        self.accuracy = accuracy_score(y_test, preds) * 100
+        model = LogisticRegression(max_iter=params["max_iter"], solver=params["solver"])
+        model.fit(X_train_scaled, y_train)
         
-        # Save files so Predict can use them
-        joblib.dump(self.model, self.model_path)
-        joblib.dump(self.scaler, self.scaler_path)
+        preds = model.predict(X_test_scaled)
+        accuracy = accuracy_score(y_test, preds) * 100
+        # What /model-stats shows: this model's own test-set figures
+        scores = test_scores(y_test, preds, model.predict_proba(X_test_scaled)[:, 1],
+                             {"coefficients": dict(zip(X.columns, model.coef_[0].tolist()))})
         
-        print(f"Training Complete! Accuracy: {self.accuracy:.2f}%")
+        print(f"Training Complete! Accuracy: {accuracy:.2f}%")
+        # load_or_train() saves this as the ARTIFACT_NAME artifact, the one file warm-up and hot reloads read
+        return {"model": model, "scaler": scaler, "feature_columns": X.columns.tolist(), "accuracy": accuracy,
+                "stats": stats_from_scores(scores)}
+
+    def load_artifact(self):
+        """The snapshot of the saved artifact, e.g. one retrained by another process (hot_reload.py)"""
+        state = load_saved(self.ARTIFACT_NAME, self.TRAIN_PARAMS)
+        return LogisticSnapshot(state["model"], state["scaler"], state["feature_columns"], state["accuracy"],
+                                state["stats"])
+
+    def validate(self, snapshot, records):
+        """Scores records with snapshot; raises ValueError unless it fits the form and returns probabilities"""
+        current = self.registry.get()
+        if current is not None and set(snapshot.feature_columns) != set(current.feature_columns):
+            raise ValueError(f"model expects columns {list(snapshot.feature_columns)}")
+        for record in records:
+            prob = snapshot.probability(self._feature_row(record, snapshot.feature_columns))
+            if not 0.0 <= prob <= 1.0:
+                raise ValueError(f"model returned {prob} for a synthetic patient")
+
+    def _feature_row(self, input_data, cols):
+        values = dict(input_data)
+        # Ensure engineered features exist in prediction input
+        if 'BMI' not in values:
+            values['BMI'] = values['weight'] / ((values['height'] / 100) ** 2)
+        if 'pulse_pressure' not in values:
+            values['pulse_pressure'] = values['ap_hi'] - values['ap_lo']
+        return np.fromiter((values[col] for col in cols), dtype=np.float64, count=len(cols))
+
+    def warm_up(self, records):
+        """Loads the saved model if train() did not, and runs records through predict()"""
+        if self.registry.get() is None:
+            self.registry.swap(self.load_artifact())
+        errors = self.errors
+        for record in records:
+            self.predict(record)
+        if self.errors != errors:
+            raise RuntimeError("predictions failed during warm-up")
 
     def predict(self, input_data):
-        """Uses the trained model to predict on new data"""
+        """Uses the trained model to predict on new data (NumPy fast path, same result as predict_frame)"""
+        current = self.registry.get()  # one snapshot for the whole call, even if a new one is swapped in
         try:
-            if self.model is None:
-                self.model = joblib.load(self.model_path)
-                self.scaler = joblib.load(self.scaler_path)
+            if current is None:
+                raise RuntimeError("no model loaded")
+
+            start = time.perf_counter()
+            row = self._feature_row(input_data, current.feature_columns)
+            features_done = time.perf_counter()
+            prob = current.probability(row)
+            self.stages.observe("features", (features_done - start) * 1000)
+            self.stages.observe("model", (time.perf_counter() - features_done) * 1000)
+            return prob
+        except Exception as e:
+            with self._errors_lock:
+                self.errors += 1
+            print(f"Prediction error: {e}")
+            return 0.5
+
+    def predict_frame(self, input_data):
+        """Original pandas-based path, kept as the reference for benchmarks/bench_model_manager.py"""
+        import pandas as pd
+
+        current = self.registry.get()
+        try:
+            if current is None:
+                raise RuntimeError("no model loaded")
 
             df = pd.DataFrame([input_data])
 
@@ -75,10 +171,10 @@ class ModelManager:
                 df['pulse_pressure'] = df['ap_hi'] - df['ap_lo']
             
             # Match the exact column order from training
-            df = df[self.feature_columns]
+            df = df[list(current.feature_columns)]
             
-            scaled_data = self.scaler.transform(df)
-            prob = self.model.predict_proba(scaled_data)[0][1]
+            scaled_data = current.scaler.transform(df)
+            prob = current.model.predict_proba(scaled_data)[0][1]
             return float(prob)
         except Exception as e:
             print(f"Prediction error: {e}")
@@ -456,6 +552,7 @@ def predict():
     
     if request.method == "POST":
         try:
+            parse_start = time.perf_counter()
             data = {
                 "age_years": float(request.form["age_years"]),
                 "height": float(request.form["height"]),
@@ -472,6 +569,7 @@ def predict():
             
             data["BMI"] = data["weight"] / ((data["height"] / 100) ** 2)
             data["pulse_pressure"] = data["ap_hi"] - data["ap_lo"]
+            manager.stages.observe("parse", (time.perf_counter() - parse_start) * 1000)
             
             prob = manager.predict(data)
             prob_val = prob * 100
@@ -604,7 +702,8 @@ def predict():
         </div>
     </div>
     """
-    return render_template_string(BASE_LAYOUT, content=content, title="Predict Risk")
+    with manager.stages.time("render"):
+        return render_template_string(BASE_LAYOUT, content=content, title="Predict Risk")
 
 @app.route("/disclaimer")
 def disclaimer():
@@ -639,21 +738,61 @@ def disclaimer():
     """
     return render_template_string(BASE_LAYOUT, content=content, title="Disclaimer")
 
+# Shown while no model is loaded
+LR_STATS_FALLBACK = {
+    "accuracy": 72.14, "precision": 0.74, "recall": 0.71, "f1": 0.72, "roc_auc": None, "roc": None,
+    "tn": 38, "fp": 12, "fn": 16, "tp": 34,
+    "features": ["Age", "Cholesterol", "Systolic BP", "BMI", "Glucose", "Physical Activity"],
+    "weights": [0.85, 1.2, 1.45, 0.9, 0.3, -0.5], "weight_kind": "coefficients",
+}
+_model_stats_page = None  # (snapshot, page rendered from its stats)
+
 @app.route("/model-stats")
 def model_stats():
-    # --- 1. STATIC DATA PREPARATION ---
-    static_features = ["Age", "Cholesterol", "Systolic BP", "BMI", "Glucose", "Physical Activity"]
-    static_coefs = [0.85, 1.2, 1.45, 0.9, 0.3, -0.5]
-    
-    labels_js = json.dumps(static_features)
-    data_js = json.dumps(static_coefs)
-    
-    x_range = np.linspace(-6, 6, 40).tolist()
-    y_sigmoid = [1 / (1 + np.exp(-x)) for x in x_range]
-    
-    accuracy_val = 72.14
-    precision, recall, f1_score = 0.74, 0.71, 0.72
-    tn, fp, fn, tp = 38, 12, 16, 34 
+    # The page depends only on the served model's test-set figures, so it is rendered once per
+    # snapshot; a reload or retrain swaps in a new snapshot and the next request re-renders it
+    global _model_stats_page
+    snapshot = manager.registry.get()
+    cached = _model_stats_page
+    if cached is None or cached[0] is not snapshot:
+        stats = snapshot.stats if snapshot is not None else LR_STATS_FALLBACK
+        cached = _model_stats_page = (snapshot, render_model_stats(stats))
+    return cached[1]
+
+def render_model_stats(stats):
+    labels_js = json.dumps(stats["features"])
+    data_js = json.dumps(stats["weights"])
+
+    accuracy_val = stats["accuracy"]
+    precision, recall, f1_score = stats["precision"], stats["recall"], round(stats["f1"], 2)
+    tn, fp, fn, tp = stats["tn"], stats["fp"], stats["fn"], stats["tp"]
+    n_test = tn + fp + fn + tp
+    roc = stats["roc"]
+    auc_row = f'<div class="d-flex justify-content-between mt-2"><span>ROC AUC:</span><span class="text-light">{stats["roc_auc"]:.3f}</span></div>' if stats["roc_auc"] is not None else ""
+    roc_card = """
+        <div class="row g-4 mb-4">
+            <div class="col-12">
+                <div class="card shadow border-0 p-4">
+                    <h5 class="fw-bold mb-3"><i class="fas fa-chart-line me-2 text-primary"></i>ROC Curve (test set)</h5>
+                    <div style="height: 300px;"><canvas id="rocChart"></canvas></div>
+                </div>
+            </div>
+        </div>""" if roc else ""
+    roc_script = f"""
+        new Chart(document.getElementById('rocChart'), {{
+            type: 'line',
+            data: {{
+                labels: {json.dumps(roc["fpr"])},
+                datasets: [{{
+                    label: 'True positive rate',
+                    data: {json.dumps(roc["tpr"])},
+                    borderColor: '#0d6efd',
+                    fill: false,
+                    pointRadius: 0
+                }}]
+            }},
+            options: {{ maintainAspectRatio: false, scales: {{ y: {{ min: 0, max: 1 }} }} }}
+        }});""" if roc else ""
 
     content = f"""
     <div class="container section-padding">
@@ -674,16 +813,17 @@ def model_stats():
                     </div>
                     <hr class="border-secondary">
                     <div class="small">
-                        <div class="d-flex justify-content-between mb-2"><span>Precision:</span><span class="text-info">{precision*100}%</span></div>
-                        <div class="d-flex justify-content-between mb-2"><span>Recall:</span><span class="text-warning">{recall*100}%</span></div>
+                        <div class="d-flex justify-content-between mb-2"><span>Precision:</span><span class="text-info">{precision*100:.1f}%</span></div>
+                        <div class="d-flex justify-content-between mb-2"><span>Recall:</span><span class="text-warning">{recall*100:.1f}%</span></div>
                         <div class="d-flex justify-content-between"><span>F1-Score:</span><span class="text-success">{f1_score}</span></div>
+                        {auc_row}
                     </div>
                 </div>
             </div>
 
             <div class="col-md-8">
                 <div class="card shadow border-0 h-100 p-4">
-                    <h5 class="fw-bold mb-3"><i class="fas fa-chart-bar me-2 text-primary"></i>Feature Impact Scale</h5>
+                    <h5 class="fw-bold mb-3"><i class="fas fa-chart-bar me-2 text-primary"></i>Feature Impact Scale <small class="text-muted">({stats["weight_kind"]})</small></h5>
                     <div style="height: 300px;"><canvas id="featureChart"></canvas></div>
                 </div>
             </div>
@@ -692,7 +832,7 @@ def model_stats():
         <div class="row g-4 mb-4">
             <div class="col-md-6">
                 <div class="card shadow border-0 p-4 h-100">
-                    <h5 class="fw-bold mb-4"><i class="fas fa-th me-2 text-primary"></i>Confusion Matrix (N=100)</h5>
+                    <h5 class="fw-bold mb-4"><i class="fas fa-th me-2 text-primary"></i>Confusion Matrix (N={n_test:,})</h5>
                     <div class="table-responsive">
                         <table class="table table-bordered text-center align-middle">
                             <thead class="table-light">
@@ -714,6 +854,7 @@ def model_stats():
                 </div>
             </div>
         </div>
+        {roc_card}
     </div>
     """
 
@@ -736,10 +877,10 @@ def model_stats():
         new Chart(document.getElementById('sigmoidChart'), {{
             type: 'line',
             data: {{
-                labels: {json.dumps([round(x,1) for x in x_range])},
+                labels: {json.dumps(SIGMOID_X)},
                 datasets: [{{
                     label: 'Probability',
-                    data: {json.dumps(y_sigmoid)},
+                    data: {json.dumps(SIGMOID_Y)},
                     borderColor: '#ff4757',
                     fill: false,
                     tension: 0.4,
@@ -748,6 +889,7 @@ def model_stats():
             }},
             options: {{ maintainAspectRatio: false, scales: {{ y: {{ min: 0, max: 1 }} }} }}
         }});
+        {roc_script}
     </script>
     """
     return render_template_string(BASE_LAYOUT, content=content, scripts=scripts, title="Model Stats")
@@ -816,6 +958,57 @@ def resources():
     """
     return render_template_string(BASE_LAYOUT, content=content, title="Resources")
 
+@app.route("/metrics")
+def metrics():
+    # Prometheus text format; each worker process reports its own figures
+    out = MetricsText()
+    for stage, snapshot in manager.stages.snapshot().items():
+        out.histogram("heartmate_stage_duration_seconds", snapshot, {"stage": stage},
+                      "Time spent in each stage of a prediction request", scale=0.001)
+    out.gauge("heartmate_model_load_seconds", round(manager.load_seconds, 6), {"model": "lr"},
+              "Time it took to load each model")
+    out.counter("heartmate_prediction_errors", manager.errors,
+                help="Predictions that failed and answered the 0.5 fallback")
+    out.counter("heartmate_model_reloads", reloader.reloads, help="Model reloads that went into service")
+    out.counter("heartmate_model_reload_failures", reloader.failures,
+                help="Model reloads rejected before the swap; the previous model stayed in service")
+    out.process_memory()
+    return app.response_class(out.text(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+def warm_up():
+    records = synthetic_records(WARMUP_ROWS)
+    manager.warm_up(records)
+    client = app.test_client()
+    for path in ("/", "/predict", "/disclaimer", "/model-stats", "/about", "/contact", "/resources"):
+        client.get(path)
+    client.post("/predict", data=records[0])
+    manager.stages = StageTimings()  # /metrics reports real traffic only
+
+warmup = WarmUp(warm_up)
+
+@app.route("/healthz")
+def healthz():
+    # Readiness probe: 200 once the model is loaded and every page has been rendered once
+    return json.dumps(warmup.status()), 200 if warmup.ready else 503, {"Content-Type": "application/json"}
+
+# Hot reload (hot_reload.py): a retrained artifact, e.g. written by running this module
+# in another process after the CSV changed, replaces the model without a restart
+reloader = hot_reload.Reloader(manager.registry, manager.load_artifact,
+                               lambda snapshot: manager.validate(snapshot, synthetic_records(WARMUP_ROWS)),
+                               lambda: [artifact_path(ModelManager.ARTIFACT_NAME)])
+
+@app.before_request
+def start_model_watcher():
+    # Per worker, on its first real request after warm-up
+    if hot_reload.WATCH and warmup.ready:
+        reloader.start()
+
+# Off unless HEARTMATE_ADMIN_TOKEN is set
+hot_reload.add_admin_route(app, reloader)
+
+# Warmed up at import (the last route is registered above), before gunicorn lets the worker take requests
+warmup.run()
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
 # if __name__ == "__main__":
@@ -0,0 +1,72 @@
+"""ai_app1 routes and warm-up, through the Flask test client."""
+import threading
+
+import ai_app1
+import microbatch
+
+
+def test_warm_up_does_not_start_the_microbatch_thread(monkeypatch):
+    # gunicorn forks its workers from the process that warmed up; a thread started there is lost
+    monkeypatch.setattr(ai_app1.engine, "batcher", microbatch.MicroBatcher(ai_app1.engine))
+    ai_app1.warm_up()
+    assert not [t for t in threading.enumerate() if t.name == "microbatch"]
+
+
+FORM = {"age": "50", "gender": "1", "hi": "140", "lo": "90", "chol": "2", "gluc": "1", "active": "1",
+        "height": "170", "weight": "80"}
+RECORD = {"age_years": 50, "gender": 1, "height": 170, "weight": 80, "ap_hi": 140, "ap_lo": 90,
+          "cholesterol": 2, "gluc": 1, "active": 1}
+
+
+def post_form(**changes):
+    return ai_app1.app.test_client().post("/result", data=dict(FORM, **changes))
+
+
+def post_batch(**changes):
+    return ai_app1.app.test_client().post("/api/v1/predict/batch", json=[RECORD, dict(RECORD, **changes)])
+
+
+def test_result_scores_a_valid_form():
+    assert post_form().status_code == 200
+
+
+def test_result_rejects_values_the_models_cannot_score():
+    for field, value, message in [
+        ("height", "0", "'height' must be greater than 0"),
+        ("weight", "nan", "'weight' must be a finite number"),
+        ("hi", "inf", "'hi' must be a finite number"),
+        ("age", "fifty", "'age' must be a number"),
+        ("gender", "1.5", "'gender' must be a whole number"),
+        ("chol", "", "'chol' must be a whole number"),
+    ]:
+        response = post_form(**{field: value})
+        assert response.status_code == 400, (field, value)
+        assert message in response.get_data(as_text=True)
+
+
+def test_batch_scores_valid_records():
+    response = post_batch()
+    assert response.status_code == 200
+    assert response.get_json()["count"] == 2
+
+
+def test_batch_rejects_values_the_models_cannot_score():
+    for column, value, message in [
+        ("height", 0, "row 2, column 'height': must be greater than 0"),
+        ("weight", float("nan"), "row 2, column 'weight': must be a finite number"),
+        ("ap_hi", "high", "column 'ap_hi' must be numeric"),
+        ("gender", 1.5, "row 2, column 'gender': must be a whole number"),
+        ("active", True, "column 'active' must be numeric, not true/false"),
+        ("cholesterol", False, "column 'cholesterol' must be numeric, not true/false"),
+    ]:
+        response = post_batch(**{column: value})
+        assert response.status_code == 400, (column, value)
+        assert response.get_json()["error"] == message
+
+
+def test_batch_reports_a_missing_column():
+    record = dict(RECORD)
+    del record["ap_lo"]
+    response = ai_app1.app.test_client().post("/api/v1/predict/batch", json=[record])
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "missing column 'ap_lo'"
@@ -0,0 +1,60 @@
+"""The ASGI adapter: request bodies arriving in chunks, and the body size cap."""
+import asyncio
+import json
+
+from flask import Flask, request
+
+from asgi import AsgiAdapter
+
+echo = Flask(__name__)
+
+
+@echo.route("/echo", methods=["POST"])
+def echo_body():
+    return request.get_data()
+
+
+def serve(adapter, chunks, headers=(), path="/echo"):
+    """Sends one POST whose body arrives as chunks; returns (status, body)."""
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "query_string": b"", "http_version": "1.1",
+             "headers": [(name.encode(), value.encode()) for name, value in headers]}
+    asyncio.run(adapter(scope, receive, send))
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_chunked_body_reaches_the_app():
+    # Transfer-Encoding: chunked, so no Content-Length header
+    status, body = serve(AsgiAdapter(echo), [b'{"a": ', b"1, ", b'"b": 2}'],
+                         headers=[("content-type", "application/json"), ("transfer-encoding", "chunked")])
+    assert status == 200
+    assert json.loads(body) == {"a": 1, "b": 2}
+
+
+def test_chunked_batch_is_scored():
+    from ai_app1 import app
+
+    record = {"age_years": 50, "gender": 1, "height": 170, "weight": 80, "ap_hi": 140, "ap_lo": 90,
+              "cholesterol": 2, "gluc": 1, "active": 1}
+    payload = json.dumps([record, dict(record, age_years=60)]).encode()
+    status, body = serve(AsgiAdapter(app), [payload[:40], payload[40:]], path="/api/v1/predict/batch",
+                         headers=[("content-type", "application/json"), ("transfer-encoding", "chunked")])
+    assert status == 200, body
+    assert json.loads(body)["count"] == 2
+
+
+def test_body_over_the_cap_is_rejected():
+    adapter = AsgiAdapter(echo, max_body=10)
+    assert serve(adapter, [b"12345", b"67890"])[0] == 200
+    assert serve(adapter, [b"12345", b"67890", b"1"])[0] == 413
+    assert serve(adapter, [b"1"], headers=[("content-length", "11")])[0] == 413
+    assert adapter.too_large == 2
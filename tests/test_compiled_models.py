@@ -0,0 +1,114 @@
+"""Compiled evaluators against the sklearn models they are exported from."""
+import time
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from compile_models import PARITY_KINDS, PARITY_TOLERANCE, check_parity
+from compiled_models import KNNModel, export_knn, export_model
+
+
+def cardio_like(n=800, seed=0):
+    """Age in whole years, blood pressure in steps of 10 and three categorical columns, like the cardio features.
+
+    The coarse values give duplicate rows and equal distances, as in the real data.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(30, 66, n), 10 * rng.integers(10, 17, n),
+        rng.integers(1, 3, n), rng.integers(1, 4, n), rng.integers(0, 2, n),
+    ]).astype(np.float64)
+    logit = 0.08 * (X[:, 0] - 50) + 0.05 * (X[:, 1] - 130) + 0.6 * (X[:, 3] - 2)
+    y = (logit + rng.normal(0, 1, n) > 0).astype(int)
+    return X, y
+
+
+ESTIMATORS = {
+    "tree": [lambda: DecisionTreeClassifier(max_depth=6, random_state=0),
+             lambda: RandomForestClassifier(n_estimators=10, max_depth=5, random_state=0)],
+    "linear": [lambda: LogisticRegression()],
+    "gaussian_nb": [lambda: GaussianNB()],
+}
+
+
+@pytest.mark.parametrize("kind, make", [(kind, make) for kind in PARITY_KINDS for make in ESTIMATORS[kind]])
+def test_parity_with_predict_proba(kind, make):
+    X, y = cardio_like()
+    scaler = StandardScaler().fit(X)
+    estimator = make().fit(scaler.transform(X), y)
+    arrays, meta = export_model(estimator, scaler)
+    assert meta["kind"] == kind
+
+    error = check_parity(arrays, meta, lambda rows: estimator.predict_proba(scaler.transform(rows))[:, 1], scaler)
+    assert error <= PARITY_TOLERANCE
+
+
+def test_knn_matches_sklearn_except_for_tie_breaking():
+    """KNN is left out of PARITY_KINDS: the neighbours may differ where distances tie.
+
+    Among points at the same distance, the compiled model keeps the lowest
+    index of its KD-tree order, the same in every search path. sklearn breaks
+    such ties in whatever order its own search visits the points. On the
+    cardio training set that changes P(1) for about 2% of training points
+    (101-112 of the first 5,000, depending on the sklearn version):
+    duplicates and points equidistant from others. Everywhere else the
+    answers agree, and every disagreement must be explained by a tie at the
+    k-th distance.
+    """
+    X, y = cardio_like()
+    scaler = StandardScaler().fit(X)
+    Xs = scaler.transform(X)
+    k = 5
+    sklearn_knn = KNeighborsClassifier(n_neighbors=k).fit(Xs, y)
+    model = KNNModel(*export_knn(Xs, y == 1, k, scaler))
+    assert "group_start" in model.arrays  # the categorical columns form search groups
+
+    queries = np.vstack([Xs, Xs[:200] + 0.01])
+    compiled = model.predict_proba(queries)
+    expected = sklearn_knn.predict_proba(queries)[:, 1]
+
+    dist = np.sort(((queries[:, None, :] - Xs[None]) ** 2).sum(axis=2), axis=1)
+    tied = np.isclose(dist[:, k - 1], dist[:, k], rtol=1e-9, atol=1e-12)
+    differs = np.abs(compiled - expected) > 1e-12
+    assert tied.any()
+    assert not np.any(differs & ~tied)
+    assert differs.mean() < 0.1
+
+    # Every search path breaks the ties the same way
+    np.testing.assert_array_equal(model.predict_proba_brute(queries), compiled)
+    np.testing.assert_array_equal(model.predict_proba_tree(queries[:100]), compiled[:100])
+    np.testing.assert_array_equal(np.hstack([model.predict_proba(q[None, :]) for q in queries[:50]]), compiled[:50])
+
+
+def best_seconds(fn, *args, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def test_knn_grouped_search_stays_fast():
+    """The grouped search backs the 10k-row batch target: it must stay far ahead of brute force.
+
+    Measured as a ratio so the test does not depend on the machine. Here the
+    grouped search is about 18x faster; sorting whole distance rows per group,
+    as it used to, was 8x.
+    """
+    X, y = cardio_like(n=30000)
+    scaler = StandardScaler().fit(X)
+    Xs = scaler.transform(X)
+    model = KNNModel(*export_knn(Xs, y == 1, 5, scaler))
+    queries = Xs[:3000] + 0.003
+
+    np.testing.assert_array_equal(model.predict_proba_grouped(queries), model.predict_proba_brute(queries))
+    grouped = best_seconds(model.predict_proba_grouped, queries)
+    brute = best_seconds(model.predict_proba_brute, queries)
+    assert grouped * 12 < brute, f"grouped {grouped:.3f}s, brute force {brute:.3f}s"
@@ -0,0 +1,61 @@
+"""Majority voting and the prediction cache in front of EnsembleEngine."""
+import numpy as np
+
+from ensemble import EnsembleEngine, majority_vote
+from prediction_cache import PredictionCache, SharedCache
+
+RECORD = {"age_years": 50, "gender": 1, "height": 170, "weight": 80, "ap_hi": 140, "ap_lo": 90,
+          "cholesterol": 2, "gluc": 1, "active": 1}
+
+
+def test_majority_vote_counts_risk_votes():
+    probs = np.array([[0.9, 0.2, 0.51], [0.8, 0.1, 0.51], [0.1, 0.9, 0.0]])
+    labels, votes, mean = majority_vote(probs)
+    assert labels.tolist() == [1, 0, 1]  # the third row wins 2 of 3 votes with a mean of 0.34
+    assert votes.tolist() == [2, 1, 2]
+    assert np.allclose(mean, probs.mean(axis=0))
+
+
+def test_majority_vote_breaks_ties_on_the_mean_probability():
+    probs = np.array([[0.9, 0.6, 0.75], [0.2, 0.1, 0.25]])
+    labels, votes, _ = majority_vote(probs)
+    assert votes.tolist() == [1, 1, 1]
+    assert labels.tolist() == [1, 0, 0]  # means 0.55, 0.35 and exactly 0.5, which is not risk
+
+
+def test_majority_vote_without_models():
+    labels, votes, mean = majority_vote(np.empty((0, 2)))
+    assert labels.tolist() == [0, 0] and votes.tolist() == [0, 0] and mean.tolist() == [0.0, 0.0]
+
+
+def test_repeated_record_is_answered_from_the_cache():
+    engine = EnsembleEngine(cache=PredictionCache(maxsize=8, ttl=60))
+    first = engine.predict(RECORD)
+    # Strings and floats of the same values share the key
+    again = engine.predict(dict(RECORD, age_years="50", height=170.0))
+    assert not first["cached"] and again["cached"]
+    assert again["score"] == first["score"] and again["probs"] == first["probs"]
+    assert engine.predict(RECORD, use_cache=False)["cached"] is False
+    assert engine.cache.stats()["hits"] == 1
+
+
+def test_cache_keys_follow_the_model_version():
+    engine = EnsembleEngine(cache=PredictionCache(maxsize=8, ttl=60))
+    engine.predict(RECORD)
+    engine.registry.swap(engine.build_model_set())
+    assert engine.predict(RECORD)["cached"]  # same files, same version
+    engine.cache.clear()
+    assert not engine.predict(RECORD)["cached"]
+
+
+def test_shared_cache_answers_for_every_process(tmp_path):
+    # Two engines stand in for two gunicorn workers opening the same file
+    path = str(tmp_path / "predictions.sqlite")
+    first = EnsembleEngine(cache=PredictionCache(maxsize=8, ttl=60, shared=SharedCache(path)))
+    second = EnsembleEngine(cache=PredictionCache(maxsize=8, ttl=60, shared=SharedCache(path)))
+    scored = first.predict(RECORD)
+    shared = second.predict(RECORD)
+    assert shared["cached"] and shared["score"] == scored["score"]
+    assert second.cache.stats()["shared_hits"] == 1
+    assert second.predict(RECORD)["cached"]
+    assert second.cache.stats()["hits"] == 1  # now held in the process as well
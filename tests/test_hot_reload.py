@@ -0,0 +1,71 @@
+"""Reloader: swapping snapshots in, keeping the old one on failure, and the /admin/reload route."""
+from flask import Flask
+
+import hot_reload
+from model_registry import Registry
+
+
+def make_reloader(tmp_path, build, check=lambda snapshot: None, on_swap=None):
+    watched = tmp_path / "model.bin"
+    watched.write_text("1")
+    return hot_reload.Reloader(Registry("old"), build, check, lambda: [str(watched)],
+                               on_swap=on_swap, interval=0.01), watched
+
+
+def test_reload_swaps_in_the_checked_snapshot(tmp_path):
+    swaps, checked = [], []
+    reloader, _ = make_reloader(tmp_path, lambda: "new", checked.append,
+                                on_swap=lambda new, old: swaps.append((new, old)))
+    report = reloader.reload("test")
+    assert report["ok"] and report["generation"] == 1
+    assert reloader.registry.get() == "new"
+    assert checked == ["new"] and swaps == [("new", "old")]
+    assert reloader.stats()["reloads"] == 1 and reloader.last_success is report
+
+
+def test_failed_check_keeps_the_snapshot_in_service(tmp_path):
+    def reject(snapshot):
+        raise ValueError("model returned nan")
+
+    swaps = []
+    reloader, _ = make_reloader(tmp_path, lambda: "broken", reject, on_swap=lambda new, old: swaps.append(new))
+    report = reloader.reload("test")
+    assert not report["ok"] and report["error"] == "model returned nan"
+    assert reloader.registry.get() == "old" and reloader.registry.generation == 0
+    assert swaps == [] and reloader.failures == 1 and reloader.last_success is None
+
+
+def test_poll_waits_until_the_files_stop_changing(tmp_path):
+    reloader, watched = make_reloader(tmp_path, lambda: "new")
+    assert reloader.poll() is None  # nothing changed
+    watched.write_text("22")
+    assert reloader.poll() is None  # changed; maybe still being copied
+    watched.write_text("333")
+    assert reloader.poll() is None  # changed again
+    assert reloader.poll()["ok"]    # unchanged since the last poll
+    assert reloader.registry.get() == "new"
+    assert reloader.poll() is None
+
+
+def test_admin_route(tmp_path, monkeypatch):
+    app = Flask(__name__)
+    reloader, _ = make_reloader(tmp_path, lambda: "new")
+    hot_reload.add_admin_route(app, reloader)
+    client = app.test_client()
+    triggered = []
+    monkeypatch.setattr(hot_reload, "request_reload", lambda: triggered.append(True))
+
+    monkeypatch.setattr(hot_reload, "ADMIN_TOKEN", "")
+    assert client.post("/admin/reload", headers={"Authorization": "Bearer "}).status_code == 404
+
+    monkeypatch.setattr(hot_reload, "ADMIN_TOKEN", "secret")
+    response = client.post("/admin/reload", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 403 and response.get_json() == {"error": "invalid admin token"}
+    assert triggered == [] and reloader.registry.get() == "old"
+
+    response = client.post("/admin/reload", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200 and response.get_json()["generation"] == 1
+    assert triggered == [True] and reloader.registry.get() == "new"
+
+    reloader.build = lambda: 1 / 0
+    assert client.post("/admin/reload", headers={"Authorization": "Bearer secret"}).status_code == 409
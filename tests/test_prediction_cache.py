@@ -0,0 +1,57 @@
+"""PredictionCache eviction and expiry, and the SQLite SharedCache behind it."""
+import time
+
+from ensemble import FORM_DEFAULTS, RAW_COLUMNS
+from prediction_cache import PredictionCache, SharedCache, record_key
+
+
+def test_record_key_is_canonical():
+    record = {"age_years": 50, "gender": 1, "height": 170, "weight": 80, "ap_hi": 140, "ap_lo": 90,
+              "cholesterol": 2, "gluc": 1}
+    key = record_key(record, RAW_COLUMNS, FORM_DEFAULTS, "v1")
+    assert record_key(dict(record, gender="1", height=170.0, smoke=-0.0, active=1), RAW_COLUMNS, FORM_DEFAULTS, "v1") == key
+    assert record_key(record, RAW_COLUMNS, FORM_DEFAULTS, "v2") != key
+    assert record_key(dict(record, weight=81), RAW_COLUMNS, FORM_DEFAULTS, "v1") != key
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(maxsize=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire():
+    cache = PredictionCache(maxsize=2, ttl=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_shared_cache_fills_other_processes(tmp_path):
+    path = str(tmp_path / "shared.sqlite")
+    worker_a = PredictionCache(maxsize=4, ttl=60, shared=SharedCache(path))
+    worker_b = PredictionCache(maxsize=4, ttl=60, shared=SharedCache(path))
+    worker_a.put("k", {"score": 42.0})
+    assert worker_b.get("k") == {"score": 42.0}
+    assert worker_b.stats()["shared_hits"] == 1
+    worker_a.clear()
+    assert worker_b.shared.get("k") is None
+
+
+def test_shared_cache_expires_and_prunes(tmp_path):
+    shared = SharedCache(str(tmp_path / "shared.sqlite"), ttl=60, maxsize=3)
+    shared.PRUNE_EVERY = 4
+    for i in range(4):
+        shared.put(str(i), i)
+    keys = [key for key, in shared._conn().execute("SELECT key FROM predictions")]
+    assert len(keys) == 3 and "3" in keys
+
+    expired = SharedCache(str(tmp_path / "expired.sqlite"), ttl=-1)
+    expired.put("k", 1)
+    assert expired.get("k") is None
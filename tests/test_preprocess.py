@@ -0,0 +1,68 @@
+"""preprocess.py against the notebook's in-memory pandas steps."""
+import os
+
+import numpy as np
+import pandas as pd
+
+import preprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def notebook_clean(raw_path, out_path):
+    """cardio_preprocess1.ipynb's cleaning, on the whole file at once."""
+    df = pd.read_csv(raw_path, sep=";")
+    df = df.drop(columns=["id"]).drop_duplicates()
+    df["age_years"] = (df["age"] / 365).astype(int)
+    df = df.drop(columns=["age"])
+    df = df.fillna(df.mean())
+    df = df[df["ap_lo"] <= df["ap_hi"]].copy()
+    df["BMI"] = df["weight"] / ((df["height"] / 100) ** 2)
+    df["pulse_pressure"] = df["ap_hi"] - df["ap_lo"]
+    df.to_csv(out_path, index=False)
+
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_matches_the_baseline_csv(tmp_path):
+    out = tmp_path / "cleaned.csv"
+    stats = preprocess.preprocess(os.path.join(ROOT, "cardio_train.csv"), str(out), chunksize=7000)
+    assert stats["passes"] == 1
+    assert read_bytes(out) == read_bytes(os.path.join(ROOT, "cardio_train_cleaned.csv"))
+
+
+def test_duplicates_across_chunks_match_drop_duplicates(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 3000
+    raw = pd.DataFrame({
+        "id": np.arange(n), "age": rng.integers(14000, 23000, n), "gender": rng.integers(1, 3, n),
+        "height": rng.integers(150, 191, n), "weight": rng.integers(50, 111, n),
+        "ap_hi": rng.integers(90, 180, n), "ap_lo": rng.integers(60, 120, n),
+        "cholesterol": rng.integers(1, 4, n), "gluc": rng.integers(1, 4, n), "smoke": rng.integers(0, 2, n),
+        "alco": rng.integers(0, 2, n), "active": rng.integers(0, 2, n), "cardio": rng.integers(0, 2, n),
+    })
+    # Copies of earlier rows under new ids, spread over every chunk
+    copies = raw.iloc[rng.integers(0, n, 800)].copy()
+    copies["id"] = np.arange(n, n + len(copies))
+    raw = pd.concat([raw, copies]).sample(frac=1, random_state=1).reset_index(drop=True)
+    raw["weight"] = raw["weight"].astype(object)
+    raw.loc[2500, "weight"] = 72.5   # an int column turns float in a later chunk
+    raw.loc[3100, "height"] = np.nan  # and a missing value needs the whole column's mean
+    raw_path, out, expected = tmp_path / "raw.csv", tmp_path / "out.csv", tmp_path / "expected.csv"
+    raw.to_csv(raw_path, sep=";", index=False)
+
+    stats = preprocess.preprocess(str(raw_path), str(out), chunksize=500)
+    notebook_clean(raw_path, expected)
+    assert stats["passes"] == 3 and stats["distinct_rows"] == len(raw.drop(columns=["id"]).drop_duplicates())
+    assert read_bytes(out) == read_bytes(expected)
+
+
+def test_digest_set_keeps_first_occurrences():
+    digests = preprocess.DigestSet()
+    batch = np.array([[1, 2], [3, 4], [1, 2], [1, 5]], dtype=np.uint64)
+    assert digests.add_new(batch).tolist() == [True, True, False, True]
+    assert digests.add_new(np.array([[3, 4], [6, 7], [6, 7]], dtype=np.uint64)).tolist() == [False, True, False]
+    assert len(digests) == 4
@@ -0,0 +1,43 @@
+"""RiskGrid lookups and their hit/miss counters."""
+import threading
+
+import numpy as np
+
+from risk_grid import FIXED, SCALE, RiskGrid
+
+AXES = {"age_years": (50, 1, 2), "gender": (1, 1, 2), "cholesterol": (1, 1, 3), "gluc": (1, 1, 3),
+        "active": (0, 1, 2), "ap_hi": (80, 10, 13), "ap_lo": (50, 10, 8), "BMI": (16, 2, 16)}
+ON_GRID = {"age_years": 50, "gender": 1, "height": 170, "weight": 80, "ap_hi": 140, "ap_lo": 90,
+           "cholesterol": 2, "gluc": 1}
+
+
+def make_grid(mode="nearest"):
+    probs = np.full(tuple(n for _, _, n in AXES.values()) + (2,), SCALE // 2, dtype=np.uint16)
+    meta = {"axes": {name: list(axis) for name, axis in AXES.items()}, "fixed": FIXED, "model_version": "v1"}
+    return RiskGrid({"probs": probs}, meta, mode)
+
+
+def test_lookup_answers_on_grid_records_only():
+    grid = make_grid("interpolate")
+    assert np.allclose(grid.lookup(ON_GRID), 0.5, atol=1e-4)
+    assert grid.lookup(dict(ON_GRID, age_years=50.5)) is None   # between exact nodes
+    assert grid.lookup(dict(ON_GRID, smoke=1)) is None          # an input the form never sends
+    assert grid.lookup(dict(ON_GRID, ap_hi=300)) is None        # off the grid
+    assert grid.stats() == {"mode": "interpolate", "hits": 1, "misses": 3, "model_version": "v1"}
+
+
+def test_counters_are_exact_under_concurrent_lookups():
+    grid = make_grid()
+    off_grid = dict(ON_GRID, ap_hi=300)
+
+    def work():
+        for _ in range(2000):
+            grid.lookup(ON_GRID)
+            grid.lookup(off_grid)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert (grid.stats()["hits"], grid.stats()["misses"]) == (16000, 16000)
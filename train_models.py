@@ -0,0 +1,271 @@
+"""Trains the six ensemble models in one run, in parallel.
+
+    python train_models.py                          # the notebooks' grid searches, every core
+    python train_models.py --workers 4 --no-search  # the notebooks' fixed parameters
+    python train_models.py --out /tmp/models        # write somewhere other than this folder
+
+The cleaned dataset is loaded once (dataset.py), split once and scaled by a
+single StandardScaler. The scaled train/test matrices go into shared memory,
+and every fit -- each grid-search fold as well as each final fit -- is one
+task in a process pool. Workers attach to the shared arrays instead of
+receiving a copy with every task, so adding workers costs no extra data
+memory, and the wall-clock time is bounded by the slowest model's final fit
+rather than by the sum of all fits.
+
+The split is the one logistic_reg, decision_tree, naive_bays and
+rendom_forest use (test_size=0.2, random_state=0), so those models come out
+as their notebooks fit them. SVM.ipynb and KNN.ipynb used a different split;
+here they share this one. Grid-search folds are cut from the scaled training
+matrix, the same for every candidate.
+
+Writes the files listed in ensemble.MODEL_ARTIFACTS (each model next to a copy
+of the shared scaler; svm.pkl as a scaler + LogisticRegression Pipeline), then
+MANIFEST_FILE (see metrics_manifest.py) with the test metrics and timings
+of the run. The manifest is written last and is what a watching ai_app1
+worker reloads on (hot_reload.py), so it never loads a half-written run.
+"""
+import argparse
+import importlib
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+from artifacts import file_digest, save_atomic
+from dataset import DATA_FILE, load_frame
+from ensemble import BASE_DIR, FEATURE_COLUMNS, MODEL_ARTIFACTS
+from metrics_manifest import MANIFEST_FILE, MANIFEST_VERSION, test_scores, write_manifest
+
+SPLIT = {"test_size": 0.2, "random_state": 0}
+
+# model id -> estimator, the notebook's fixed parameters, and the grid its notebook searched.
+# cv is the notebook's fold count; "shuffle" follows rendom_forest's KFold(shuffle=True, random_state=0).
+MODEL_SPECS = {
+    "rf": {"estimator": "sklearn.ensemble.RandomForestClassifier",
+           "params": {"n_estimators": 100, "criterion": "entropy", "max_depth": 10, "random_state": 0},
+           "grid": {"n_estimators": [50, 100, 200], "max_depth": [10, 20, None], "criterion": ["gini", "entropy"]},
+           "cv": 5, "shuffle": True},
+    "knn": {"estimator": "sklearn.neighbors.KNeighborsClassifier",
+            "params": {"n_neighbors": 5},
+            "grid": {"n_neighbors": [3, 5, 7, 9]}, "cv": 5},
+    "svm": {"estimator": "sklearn.linear_model.LogisticRegression",
+            "params": {"max_iter": 1000},
+            "grid": {"C": [0.1, 1, 10]}, "cv": 3},
+    "lr": {"estimator": "sklearn.linear_model.LogisticRegression", "params": {"max_iter": 68742}},
+    "dt": {"estimator": "sklearn.tree.DecisionTreeClassifier",
+           "params": {"criterion": "entropy", "max_depth": 10, "random_state": 0}},
+    "nb": {"estimator": "sklearn.naive_bayes.GaussianNB", "params": {}},
+}
+
+# Set in each worker by _attach
+_shared = {}
+
+
+def _estimator(spec, params):
+    module, name = spec["estimator"].rsplit(".", 1)
+    return getattr(importlib.import_module(module), name)(**params)
+
+
+def share_arrays(arrays):
+    """Copies arrays into new shared-memory blocks; returns (blocks, specs for _attach)."""
+    blocks, specs = [], {}
+    for name, values in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, values.dtype, buffer=block.buf)[...] = values
+        blocks.append(block)
+        specs[name] = (block.name, values.shape, values.dtype.str)
+    return blocks, specs
+
+
+def _attach(specs, scaler, out_dir):
+    """Pool initializer: maps the shared arrays and pins BLAS/OpenMP to one thread per worker."""
+    from threadpoolctl import threadpool_limits
+
+    for name, (block_name, shape, dtype) in specs.items():
+        # Workers share the parent's resource tracker, which unlinks the blocks if the parent dies
+        block = shared_memory.SharedMemory(name=block_name)
+        _shared[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        _shared[name + "_block"] = block
+    _shared.update(scaler=scaler, out_dir=out_dir, limits=threadpool_limits(1))
+
+
+def _score_fold(model_id, params, eval_idx):
+    """(accuracy, seconds) of one grid candidate on one fold of the training matrix."""
+    start = time.perf_counter()
+    X, y = _shared["X_train"], _shared["y_train"]
+    train = np.ones(len(y), dtype=bool)
+    train[eval_idx] = False
+    model = _estimator(MODEL_SPECS[model_id], params).fit(X[train], y[train])
+    return float(model.score(X[eval_idx], y[eval_idx])), time.perf_counter() - start
+
+
+def _fit_final(model_id, params):
+    """Fits on the whole training matrix, writes the model file; returns (test metrics, seconds)."""
+    task_start = start = time.perf_counter()
+    model = _estimator(MODEL_SPECS[model_id], params).fit(_shared["X_train"], _shared["y_train"])
+    fit_seconds = time.perf_counter() - start
+
+    X_test, y_test = _shared["X_test"], _shared["y_test"]
+    start = time.perf_counter()
+    proba = model.predict_proba(X_test)[:, 1]
+    pred = model.classes_[(proba > 0.5).astype(int)]
+    predict_ms = (time.perf_counter() - start) * 1000 / len(y_test)
+
+    if hasattr(model, "coef_"):
+        weights = {"coefficients": dict(zip(FEATURE_COLUMNS, model.coef_[0].tolist()))}
+    elif hasattr(model, "feature_importances_"):
+        weights = {"feature_importances": dict(zip(FEATURE_COLUMNS, model.feature_importances_.tolist()))}
+    else:
+        weights = {}
+
+    model_file, scaler_file = MODEL_ARTIFACTS[model_id]
+    if scaler_file is None:
+        from sklearn.pipeline import Pipeline
+        model = Pipeline([("scaler", _shared["scaler"]), ("logreg", model)])
+    else:
+        # Written together with its model, so the files on disk never pair
+        # this run's scaler with the previous run's model for long
+        save_atomic(_shared["scaler"], os.path.join(_shared["out_dir"], scaler_file))
+    save_atomic(model, os.path.join(_shared["out_dir"], model_file))
+
+    scores = {
+        **test_scores(y_test, pred, proba, weights),
+        "fit_seconds": round(fit_seconds, 3),
+        "predict_ms_per_row": round(predict_ms, 6),
+    }
+    return scores, time.perf_counter() - task_start
+
+
+def fold_indices(spec, y):
+    """Evaluation indices of each fold, as GridSearchCV(cv=...) would cut them."""
+    from sklearn.model_selection import KFold, StratifiedKFold
+
+    if spec.get("shuffle"):
+        folds = KFold(n_splits=spec["cv"], shuffle=True, random_state=0)
+    else:
+        folds = StratifiedKFold(n_splits=spec["cv"])
+    return [eval_idx.astype(np.int32) for _, eval_idx in folds.split(np.zeros(len(y)), y)]
+
+
+def load_data(path=DATA_FILE):
+    """(X_train, X_test, y_train, y_test, scaler) with both matrices scaled by the train-fitted scaler."""
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    df = load_frame(path, columns=FEATURE_COLUMNS + ["cardio"])
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    y = df["cardio"].to_numpy(dtype=np.int64)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, **SPLIT)
+    scaler = StandardScaler().fit(X_train)
+    return scaler.transform(X_train), scaler.transform(X_test), y_train, y_test, scaler
+
+
+def train_all(out_dir=BASE_DIR, workers=None, search=True, model_ids=None, data_path=DATA_FILE):
+    """Trains model_ids (default: all), writes their files and the manifest; returns the manifest."""
+    from sklearn import __version__ as sklearn_version
+    from sklearn.model_selection import ParameterGrid
+
+    start = time.perf_counter()
+    model_ids = list(model_ids or MODEL_SPECS)
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+
+    X_train, X_test, y_train, y_test, scaler = load_data(data_path)
+    load_seconds = time.perf_counter() - start
+
+    blocks, specs = share_arrays({"X_train": X_train, "X_test": X_test, "y_train": y_train, "y_test": y_test})
+    results = {model_id: {"params": dict(MODEL_SPECS[model_id]["params"]), "cv": None} for model_id in model_ids}
+    try:
+        # forkserver workers start from a clean interpreter, so they hold no copy of the
+        # parent's arrays and inherit no BLAS/OpenMP thread state; the data reaches them
+        # only through the shared blocks
+        with ProcessPoolExecutor(workers, mp_context=get_context("forkserver"),
+                                 initializer=_attach, initargs=(specs, scaler, out_dir)) as pool:
+            pending, fold_scores = {}, {}
+            # The grid searches go first: they are most of the work and their
+            # final fits can only start once every fold is scored
+            for model_id in model_ids:
+                spec = MODEL_SPECS[model_id]
+                if search and "grid" in spec:
+                    candidates = [dict(spec["params"], **grid) for grid in ParameterGrid(spec["grid"])]
+                    folds = fold_indices(spec, y_train)
+                    fold_scores[model_id] = np.full((len(candidates), len(folds)), np.nan)
+                    results[model_id]["cv"] = {"folds": len(folds), "candidates": candidates}
+                    for c, params in enumerate(candidates):
+                        for f, eval_idx in enumerate(folds):
+                            pending[pool.submit(_score_fold, model_id, params, eval_idx)] = ("fold", model_id, (c, f))
+            for model_id in model_ids:
+                if results[model_id]["cv"] is None:
+                    pending[pool.submit(_fit_final, model_id, results[model_id]["params"])] = ("final", model_id, None)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task, model_id, cell = pending.pop(future)
+                    if task == "final":
+                        results[model_id]["metrics"], seconds = future.result()
+                        results[model_id]["task_seconds"] = round(seconds, 3)
+                        print(f"{model_id}: accuracy {results[model_id]['metrics']['accuracy']:.4f} "
+                              f"({time.perf_counter() - start:.1f}s)")
+                        continue
+                    scores = fold_scores[model_id]
+                    scores[cell], seconds = future.result()
+                    cv = results[model_id]["cv"]
+                    cv["task_seconds"] = cv.get("task_seconds", 0.0) + seconds
+                    if not np.isnan(scores).any():
+                        # Highest mean fold accuracy; ties go to the earlier candidate, like GridSearchCV
+                        means = scores.mean(axis=1)
+                        best = int(np.argmax(means))
+                        cv.update(best_score=float(means[best]), mean_scores=means.tolist(),
+                                  task_seconds=round(cv["task_seconds"], 3))
+                        results[model_id]["params"] = cv.pop("candidates")[best]
+                        cv["candidates"] = len(means)
+                        pending[pool.submit(_fit_final, model_id, results[model_id]["params"])] = ("final", model_id, None)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "data": {"file": os.path.basename(data_path), "sha256": file_digest(data_path),
+                 "train_rows": len(y_train), "test_rows": len(y_test), "features": FEATURE_COLUMNS},
+        "split": SPLIT,
+        "search": search,
+        "workers": workers,
+        "sklearn": sklearn_version,
+        "load_seconds": round(load_seconds, 3),
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        # Summed over every task; with enough workers the wall time approaches the longest model's share
+        "task_seconds": round(sum((r["cv"] or {}).get("task_seconds", 0.0) + r["task_seconds"]
+                                  for r in results.values()), 3),
+        "models": {},
+    }
+    for model_id in model_ids:
+        model_file, scaler_file = MODEL_ARTIFACTS[model_id]
+        manifest["models"][model_id] = dict(results[model_id], estimator=MODEL_SPECS[model_id]["estimator"],
+                                            file=model_file, scaler=scaler_file)
+    write_manifest(manifest, os.path.join(out_dir, MANIFEST_FILE))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=BASE_DIR, help="folder for the model files and the manifest")
+    parser.add_argument("--workers", type=int, default=None, help="pool size (default: every core)")
+    parser.add_argument("--no-search", dest="search", action="store_false",
+                        help="skip the grid searches and fit the notebooks' fixed parameters")
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_SPECS), help="only these model ids")
+    parser.add_argument("--data", default=DATA_FILE, help="cleaned CSV to train on")
+    args = parser.parse_args()
+
+    manifest = train_all(args.out, args.workers, args.search, args.models, args.data)
+    print(f"Trained {len(manifest['models'])} models with {manifest['workers']} worker(s) in "
+          f"{manifest['wall_seconds']}s; manifest: {os.path.join(args.out, MANIFEST_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Worker warm-up and readiness.
+
+A process that has just loaded its models still pays for first-use work
+on its first requests: template compilation, lazily loaded artifacts,
+NumPy and sklearn code paths and buffers touched for the first time. A
+WarmUp runs an app's warm-up function once per process (at start-up, before
+traffic) and reports the result on the app's /healthz endpoint, which only
+answers 200 once warm-up has finished. A load balancer probing /healthz
+therefore never routes requests to a cold worker during a rolling restart.
+
+    HEARTMATE_WARMUP_ROWS=32    synthetic patients run through every model
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+WARMUP_ROWS = int(os.environ.get("HEARTMATE_WARMUP_ROWS", "32"))
+
+
+def synthetic_records(n, seed=0):
+    """n plausible patient records (raw form fields) spread over the form's ranges."""
+    rng = np.random.default_rng(seed)
+    height = rng.integers(150, 191, n)
+    ap_lo = rng.integers(60, 111, n)
+    return [{
+        "age_years": float(rng.integers(30, 66)), "gender": int(rng.integers(1, 3)),
+        "height": float(height[i]), "weight": float(rng.integers(50, 111)),
+        "ap_hi": float(ap_lo[i] + rng.integers(30, 71)), "ap_lo": float(ap_lo[i]),
+        "cholesterol": int(rng.integers(1, 4)), "gluc": int(rng.integers(1, 4)),
+        "smoke": int(rng.integers(0, 2)), "alco": int(rng.integers(0, 2)), "active": int(rng.integers(0, 2)),
+    } for i in range(n)]
+
+
+class WarmUp:
+    """Runs a warm-up function once per process and tracks readiness.
+
+    state is "cold", "warming", "ready" or "failed". A forked gunicorn worker
+    inherits the state together with the warmed-up memory of its master.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.state = "cold"
+        self.seconds = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def run(self):
+        """Warms up now unless that already happened; failures are recorded, not raised."""
+        with self._lock:
+            if self.state in ("ready", "failed"):
+                return self
+            self.state = "warming"
+            start = time.perf_counter()
+            try:
+                self.fn()
+            except Exception as e:
+                self.state, self.error = "failed", str(e)
+                print(f"Warm-up failed: {e}")
+                return self
+            self.seconds = time.perf_counter() - start
+            self.state = "ready"
+            print(f"Warm-up finished in {self.seconds:.2f}s")
+        return self
+
+    def start(self):
+        """Warms up on a background thread (for processes that skipped the start-up warm-up)."""
+        if self.state == "cold":
+            threading.Thread(target=self.run, name="warmup", daemon=True).start()
+
+    def status(self):
+        return {"status": self.state,
+                "warmup_seconds": round(self.seconds, 3) if self.seconds is not None else None,
+                "error": self.error}